@@ -9,7 +9,8 @@ import django_rq
 import redis
 from django_rq import get_connection
 from rq.command import send_stop_job_command
-from rq.exceptions import InvalidJobOperation
+from rq.exceptions import InvalidJobOperation, NoSuchJobError
+from rq.job import Job
 from rq.registry import StartedJobRegistry
 
 logger = logging.getLogger(__name__)
@@ -58,10 +59,11 @@ def redis_hget(key1, key2):
     return _redis.hget(key1, key2)
 
 
-def redis_set(key, value, ttl=None):
+def redis_set(key, value, ttl=None, nx=False):
+    """Set the value, with nx=True only if the key doesn't exist: returns None if it exists already"""
     if not redis_healthcheck():
         return
-    return _redis.set(key, value, ex=ttl)
+    return _redis.set(key, value, ex=ttl, nx=nx)
 
 
 def redis_hset(key1, key2, value):
@@ -70,6 +72,47 @@ def redis_hset(key1, key2, value):
     return _redis.hset(key1, key2, value)
 
 
+def redis_incr(key):
+    if not redis_healthcheck():
+        return
+    return _redis.incr(key)
+
+
+def redis_lpop_many(key, count):
+    """Pop up to count values from the head of the list under the key in one transaction"""
+    if not redis_healthcheck():
+        return
+    pipeline = _redis.pipeline()
+    pipeline.lrange(key, 0, count - 1)
+    pipeline.ltrim(key, count, -1)
+    values, _ = pipeline.execute()
+    return values
+
+
+def redis_lpush_list(key, values, ttl=None):
+    """Put values back to the head of the list under the key keeping their order"""
+    if not redis_healthcheck() or not values:
+        return
+    pipeline = _redis.pipeline()
+    pipeline.lpush(key, *reversed(values))
+    if ttl:
+        pipeline.expire(key, ttl)
+    return pipeline.execute()
+
+
+def redis_set_list(key, values, ttl=None):
+    """Replace the list under the key with values"""
+    if not redis_healthcheck():
+        return
+    pipeline = _redis.pipeline()
+    pipeline.delete(key)
+    if values:
+        pipeline.rpush(key, *values)
+        if ttl:
+            pipeline.expire(key, ttl)
+    return pipeline.execute()
+
+
 def redis_delete(key):
     if not redis_healthcheck():
         return
@@ -141,6 +184,20 @@ def is_job_on_worker(job_id, queue_name):
     return job_id in ids
 
 
+def get_job_status(job_id):
+    """
+    Get status of job by id
+    :param job_id: Job ID
+    :return: rq JobStatus (queued, scheduled, started, finished, ...) or None if job is not found
+    """
+    if not job_id or not redis_healthcheck():
+        return None
+    try:
+        return Job.fetch(job_id, connection=_redis).get_status()
+    except NoSuchJobError:
+        return None
+
+
 def delete_job_by_id(queue, id):
     """
     Delete job by id from queue
@@ -484,14 +484,52 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = int(get_env('DATA_UPLOAD_MAX_MEMORY_SIZE', 250 * 1
 DATA_UPLOAD_MAX_NUMBER_FILES = int(get_env('DATA_UPLOAD_MAX_NUMBER_FILES', 100))
 TASKS_MAX_NUMBER = 1000000
 TASKS_MAX_FILE_SIZE = DATA_UPLOAD_MAX_MEMORY_SIZE
+# Background imports of uploaded files are parsed and committed in batches of this size with bounded memory
+IMPORT_STREAMING = get_bool_env('IMPORT_STREAMING', False)
+IMPORT_BATCH_SIZE = int(get_env('IMPORT_BATCH_SIZE', 1000))
 
 TASK_LOCK_TTL = int(get_env('TASK_LOCK_TTL', default=86400))
+# Expired task locks are deleted by the background sweeper every TASK_LOCK_SWEEP_INTERVAL seconds
+# (`manage.py sweep_task_locks` by cron or with --schedule on rq); 0 deletes them inline in set_lock/release_lock
+TASK_LOCK_SWEEP_INTERVAL = int(get_env('TASK_LOCK_SWEEP_INTERVAL', default=0))
+TASK_LOCK_SWEEP_BATCH_SIZE = int(get_env('TASK_LOCK_SWEEP_BATCH_SIZE', default=1000))
 
 LABEL_STREAM_HISTORY_LIMIT = int(get_env('LABEL_STREAM_HISTORY_LIMIT', default=100))
 
 RANDOM_NEXT_TASK_SAMPLE_SIZE = int(get_env('RANDOM_NEXT_TASK_SAMPLE_SIZE', 50))
+# Next task queue engine keeps prefetched task candidates per user and sampling context:
+# '' - sample tasks from DB on every request,
+# 'projects.functions.task_queue.MemoryTaskQueue' - in process memory,
+# 'projects.functions.task_queue.RedisTaskQueue' - in redis, shared between workers
+NEXT_TASK_QUEUE_ENGINE = get_env('NEXT_TASK_QUEUE_ENGINE', '')
+NEXT_TASK_QUEUE_SIZE = int(get_env('NEXT_TASK_QUEUE_SIZE', 50))
+NEXT_TASK_QUEUE_TTL = int(get_env('NEXT_TASK_QUEUE_TTL', 60))
+# candidates are popped from the buffer in batches of this size and validated with one query per batch
+NEXT_TASK_QUEUE_POP_SIZE = int(get_env('NEXT_TASK_QUEUE_POP_SIZE', 10))
+# next task candidates are checked for locks in windows of this size, one query per window
+NEXT_TASK_LOCK_CHECK_WINDOW = int(get_env('NEXT_TASK_LOCK_CHECK_WINDOW', 100))
 
 TASK_API_PAGE_SIZE_MAX = int(get_env('TASK_API_PAGE_SIZE_MAX', 0)) or None
+# Task list totals (total, total_annotations, total_predictions) are cached in redis for this number of seconds,
+# the cache is invalidated on task, annotation and prediction changes; 0 disables the cache
+TASK_API_TOTALS_CACHE_TTL = int(get_env('TASK_API_TOTALS_CACHE_TTL', 600))
+# Compiled data manager view plans (filtered task query and evaluated fields) are kept in process memory,
+# LRU with this number of plans; 0 disables the cache
+DATA_MANAGER_VIEW_PLAN_CACHE_SIZE = int(get_env('DATA_MANAGER_VIEW_PLAN_CACHE_SIZE', 1000))
+# Missing predictions of viewed tasks are retrieved by a background job, the same tasks aren't queued again
+# for this number of seconds while the job is pending
+PREDICTIONS_WARMING_TTL = int(get_env('PREDICTIONS_WARMING_TTL', 300))
+# Task counters changed by annotation and prediction saves inside a transaction are recounted once on commit,
+# disabled it recounts them right after each save
+TASK_COUNTERS_FLUSH_ON_COMMIT = get_bool_env('TASK_COUNTERS_FLUSH_ON_COMMIT', True)
+# Project list counters are read from the denormalized ProjectCounters table instead of per-project subqueries
+PROJECT_COUNTERS_ENABLED = get_bool_env('PROJECT_COUNTERS_ENABLED', True)
+# Single task, annotation and prediction changes are appended to ProjectCountersDelta rows, readers add them
+# to the counters and they are compacted into the ProjectCounters row once this number of deltas is pending
+PROJECT_COUNTERS_COMPACT_THRESHOLD = int(get_env('PROJECT_COUNTERS_COMPACT_THRESHOLD', 100))
+# Annotation and draft label counters are appended to ProjectSummaryDelta rows, the summary folds them in on read
+# and compacts them into its JSON fields once this number of deltas is pending
+PROJECT_SUMMARY_COMPACT_THRESHOLD = int(get_env('PROJECT_SUMMARY_COMPACT_THRESHOLD', 100))
 
 # Email backend
 FROM_EMAIL = get_env('FROM_EMAIL', 'Label Studio <hello@labelstud.io>')
@@ -631,6 +669,25 @@ COLLECT_ANALYTICS = get_bool_env('COLLECT_ANALYTICS', get_bool_env('collect_anal
 SVG_SECURITY_CLEANUP = get_bool_env('SVG_SECURITY_CLEANUP', False)
 
 ML_BLOCK_LOCAL_IP = get_bool_env('ML_BLOCK_LOCAL_IP', False)
+# Training triggered by annotation saves is queued with this delay, saves made meanwhile don't queue another job
+ML_TRAINING_DEBOUNCE = int(get_env('ML_TRAINING_DEBOUNCE', 0))
+# ML backend API clients are shared in the process per backend url, auth and timeout to keep connections alive,
+# LRU with this number of clients; 0 creates a client per request
+ML_API_CLIENT_POOL_SIZE = int(get_env('ML_API_CLIENT_POOL_SIZE', 100))
+# Connected state and setup result of ML backends are reused for predictions during this number of seconds,
+# changes of the backend config or project label config check the state again; 0 disables the cache
+ML_BACKEND_STATE_CACHE_TTL = int(get_env('ML_BACKEND_STATE_CACHE_TTL', 60))
+# ML backend predictions are requested in chunks of this number of tasks, with this number of concurrent requests
+ML_PREDICT_CHUNK_SIZE = int(get_env('ML_PREDICT_CHUNK_SIZE', 100))
+ML_PREDICT_CONCURRENCY = int(get_env('ML_PREDICT_CONCURRENCY', 4))
+# Failed prediction requests are retried with exponential backoff starting from this number of seconds,
+# chunks failed after retries are split in halves
+ML_PREDICT_RETRIES = int(get_env('ML_PREDICT_RETRIES', 2))
+ML_PREDICT_RETRY_BACKOFF = float(get_env('ML_PREDICT_RETRY_BACKOFF', 1.0))
+# Background prediction jobs of one project running at once, the next jobs of the project wait for them
+ML_PREDICTION_JOBS_PER_PROJECT = int(get_env('ML_PREDICTION_JOBS_PER_PROJECT', 1))
+# Prediction jobs without progress for this number of seconds are considered lost and fail, freeing their slots
+ML_PREDICTION_JOB_STALE_TIMEOUT = int(get_env('ML_PREDICTION_JOB_STALE_TIMEOUT', 3600))
 
 RQ_LONG_JOB_TIMEOUT = int(get_env('RQ_LONG_JOB_TIMEOUT', 36000))
 
@@ -641,7 +698,20 @@ BATCH_JOB_RETRY_TIMEOUT = int(get_env('BATCH_JOB_RETRY_TIMEOUT', 60))
 FUTURE_SAVE_TASK_TO_STORAGE = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE', default=False)
 FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = get_bool_env('FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT', default=True)
 STORAGE_IN_PROGRESS_TIMER = float(get_env('STORAGE_IN_PROGRESS_TIMER', 5.0))
+STORAGE_SYNC_BATCH_SIZE = int(get_env('STORAGE_SYNC_BATCH_SIZE', 100))
+STORAGE_SYNC_MAX_WORKERS = int(get_env('STORAGE_SYNC_MAX_WORKERS', 8))
+STORAGE_INCREMENTAL_SYNC = get_bool_env('STORAGE_INCREMENTAL_SYNC', False)
+# seconds between full listings when incremental sync is enabled
+STORAGE_FULL_SYNC_INTERVAL = int(get_env('STORAGE_FULL_SYNC_INTERVAL', 24 * 60 * 60))
+REDIS_STORAGE_SCAN_COUNT = int(get_env('REDIS_STORAGE_SCAN_COUNT', 1000))
 STORAGE_EXPORT_CHUNK_SIZE = int(get_env('STORAGE_EXPORT_CHUNK_SIZE', 100))
+STORAGE_EXPORT_MAX_WORKERS = int(get_env('STORAGE_EXPORT_MAX_WORKERS', 8))
+# presigned URLs are reused until STORAGE_PRESIGNED_URL_CACHE_MARGIN seconds before they expire,
+# they are kept in process memory and optionally in redis to share them between workers
+STORAGE_PRESIGNED_URL_CACHE = get_bool_env('STORAGE_PRESIGNED_URL_CACHE', True)
+STORAGE_PRESIGNED_URL_CACHE_REDIS = get_bool_env('STORAGE_PRESIGNED_URL_CACHE_REDIS', False)
+STORAGE_PRESIGNED_URL_CACHE_MAX_SIZE = int(get_env('STORAGE_PRESIGNED_URL_CACHE_MAX_SIZE', 10000))
+STORAGE_PRESIGNED_URL_CACHE_MARGIN = int(get_env('STORAGE_PRESIGNED_URL_CACHE_MARGIN', 10))
 
 USE_NGINX_FOR_EXPORT_DOWNLOADS = get_bool_env('USE_NGINX_FOR_EXPORT_DOWNLOADS', False)
 
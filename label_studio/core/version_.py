@@ -0,0 +1,4 @@
+info = {"message": "[user-025] Run retrieve predictions action as background ML prediction jobs", "commit": "35f31aa4494177ded734d3f030c0888ccb2e6514", "date": "2026/10/19 02:55:57", "branch": "", "version": "35f31aa+dirty"}
+
+# This file is automatically generated by version.py
+# Do not include it to git!
@@ -17,12 +17,14 @@ from core.utils.common import retry_database_locked, timeit
 from core.utils.exceptions import LabelStudioValidationErrorSentryIgnored
 from core.utils.params import bool_from_request, list_of_strings_from_request
 from csp.decorators import csp
+from data_manager.functions import bump_project_data_version
 from django.conf import settings
 from django.db import transaction
 from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
 from django.utils.decorators import method_decorator
 from drf_yasg.utils import swagger_auto_schema
-from projects.models import Project, ProjectImport, ProjectReimport
+from io_storages.utils import get_presigned_url_cache_ttl
+from projects.models import Project, ProjectCounters, ProjectImport, ProjectReimport
 from ranged_fileresponse import RangedFileResponse
 from rest_framework import generics, status
 from rest_framework.exceptions import ValidationError
@@ -428,6 +430,8 @@ class ImportPredictionsAPI(generics.CreateAPIView):
             )
         predictions_obj = Prediction.objects.bulk_create(predictions, batch_size=settings.BATCH_SIZE)
         start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=tasks_ids))
+        ProjectCounters.recalculate_on_commit(project.id)
+        bump_project_data_version(project.id)
         return Response({'created': len(predictions_obj)}, status=status.HTTP_201_CREATED)
 
 
@@ -781,13 +785,14 @@ class PresignAPIMixin:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
         url = resolved['url']
-        max_age = 0
-        if resolved.get('presign_ttl'):
-            max_age = resolved.get('presign_ttl') * 60
+        # the browser may reuse the redirect while the presigned url is valid
+        max_age = resolved.get('max_age')
+        if max_age is None and resolved.get('presign_ttl'):
+            max_age = get_presigned_url_cache_ttl(resolved['presign_ttl'])
 
         # Proxy to presigned url
         response = HttpResponseRedirect(redirect_to=url, status=status.HTTP_303_SEE_OTHER)
-        response.headers['Cache-Control'] = f'no-store, max-age={max_age}'
+        response.headers['Cache-Control'] = f'private, max-age={max_age}' if max_age else 'no-store'
 
         return response
 
@@ -1,12 +1,15 @@
 import logging
 import time
 import traceback
+from itertools import islice
 from typing import Callable, Optional
 
 from core.utils.common import load_func
 from django.conf import settings
 from django.db import transaction
-from projects.models import ProjectImport, ProjectReimport
+from projects.models import ProjectCounters, ProjectImport, ProjectReimport
+from rest_framework.exceptions import ValidationError
+from tasks.models import Task
 from users.models import User
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -35,6 +38,9 @@ def async_import_background(
 
     user = User.objects.get(id=user_id)
 
+    if settings.IMPORT_STREAMING and project_import.commit_to_project and project_import.file_upload_ids:
+        return async_import_background_streaming(project_import, user)
+
     start = time.time()
     project = project_import.project
     tasks = None
@@ -98,6 +104,98 @@ def async_import_background(
     project_import.save()
 
 
+def async_import_background_streaming(project_import, user):
+    """Import uploaded files batch by batch: tasks are parsed incrementally, validated and committed
+    in batches of settings.IMPORT_BATCH_SIZE, so memory is bounded by the batch size instead of file sizes.
+    project_import counters are saved after each batch to show the progress.
+    If any batch fails, tasks of the already committed batches are removed, so the import is all or nothing.
+    """
+    start = time.time()
+    project = project_import.project
+    stats = {}
+    recalculate_stats_counts = {'task_count': 0, 'annotation_count': 0, 'prediction_count': 0}
+    task_ids = [] if project_import.return_task_ids else None
+
+    try:
+        tasks_iter = FileUpload.iter_tasks_from_uploaded_files(project, project_import.file_upload_ids, stats=stats)
+        while batch := list(islice(tasks_iter, settings.IMPORT_BATCH_SIZE)):
+            task_count = recalculate_stats_counts['task_count'] + len(batch)
+            if task_count > settings.TASKS_MAX_NUMBER:
+                raise ValidationError(
+                    f'Maximum task number is {settings.TASKS_MAX_NUMBER}, current task number is {task_count}'
+                )
+            if project_import.preannotated_from_fields:
+                batch = reformat_predictions(batch, project_import.preannotated_from_fields)
+
+            with transaction.atomic():
+                serializer = ImportApiSerializer(data=batch, many=True, context={'project': project})
+                serializer.is_valid(raise_exception=True)
+                tasks = serializer.save(project_id=project.id)
+                # counters and is_labeled of the new tasks, project level states are updated once after all batches
+                project._update_tasks_counters_and_is_labeled([task.id for task in tasks])
+            project.summary.update_data_columns(tasks)
+
+            recalculate_stats_counts['task_count'] += len(tasks)
+            recalculate_stats_counts['annotation_count'] += len(serializer.db_annotations)
+            recalculate_stats_counts['prediction_count'] += len(serializer.db_predictions)
+            if task_ids is not None:
+                task_ids += [task.id for task in tasks]
+
+            project_import.task_count = recalculate_stats_counts['task_count']
+            project_import.annotation_count = recalculate_stats_counts['annotation_count']
+            project_import.prediction_count = recalculate_stats_counts['prediction_count']
+            project_import.duration = time.time() - start
+            project_import.save(update_fields=['task_count', 'annotation_count', 'prediction_count', 'duration'])
+            logger.info(f'Import {project_import.id}: {project_import.task_count} tasks imported')
+
+        if not recalculate_stats_counts['task_count']:
+            raise ValidationError('load_tasks: No tasks added')
+    except Exception:
+        _rollback_streaming_import(project_import)
+        raise
+
+    # webhooks are sent once the whole import is committed, tasks are loaded again batch by batch
+    imported = project.tasks.filter(file_upload_id__in=project_import.file_upload_ids).order_by('id')
+    last_id = 0
+    while tasks := list(imported.filter(id__gt=last_id)[: settings.IMPORT_BATCH_SIZE]):
+        emit_webhooks_for_instance(user.active_organization, project, WebhookAction.TASKS_CREATED, tasks)
+        last_id = tasks[-1].id
+
+    project.update_tasks_counters_and_task_states(
+        tasks_queryset=[],
+        maximum_annotations_changed=False,
+        overlap_cohort_percentage_changed=False,
+        tasks_number_changed=True,
+        recalculate_stats_counts=recalculate_stats_counts,
+    )
+    logger.info('Tasks bulk_update finished (async streaming import)')
+
+    project_import.duration = time.time() - start
+    project_import.found_formats = dict(stats['found_formats'])
+    project_import.data_columns = list(stats['data_columns'])
+    if task_ids is not None:
+        project_import.task_ids = task_ids
+    project_import.status = ProjectImport.Status.COMPLETED
+    project_import.save()
+
+
+def _rollback_streaming_import(project_import):
+    """Remove tasks committed by the failed streaming import along with their data columns in project summary"""
+    from data_manager.functions import bump_project_data_version
+
+    project = project_import.project
+    tasks = project.tasks.filter(file_upload_id__in=project_import.file_upload_ids)
+    if not tasks.exists():
+        return
+    logger.info(f'Import {project_import.id} failed, removing {project_import.task_count} imported tasks')
+    project.summary.remove_data_columns(tasks.only('data').iterator())
+    Task.delete_tasks_without_signals(tasks)
+    ProjectCounters.recalculate_on_commit(project.id)
+    bump_project_data_version(project.id)
+    project_import.task_count = project_import.annotation_count = project_import.prediction_count = 0
+    project_import.save(update_fields=['task_count', 'annotation_count', 'prediction_count'])
+
+
 def set_import_background_failure(job, connection, type, value, _):
     import_id = job.args[0]
     ProjectImport.objects.filter(id=import_id).update(
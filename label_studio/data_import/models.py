@@ -1,10 +1,12 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import io
 import logging
 import os
 import uuid
 from collections import Counter
 
+import numpy as np
 import pandas as pd
 
 try:
@@ -12,6 +14,11 @@ try:
 except:  # noqa: E722
     import json
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 from core.feature_flags import flag_set
 from django.conf import settings
 from django.db import models
@@ -101,14 +108,61 @@ class FileUpload(models.Model):
             tasks = json.loads(raw_data.decode('utf8'))
         if isinstance(tasks, dict):
             tasks = [tasks]
-        tasks_formatted = []
-        for i, task in enumerate(tasks):
-            if not task.get('data'):
-                task = {'data': task}
-            if not isinstance(task['data'], dict):
-                raise ValidationError('Task item should be dict')
-            tasks_formatted.append(task)
-        return tasks_formatted
+        return [self._format_json_task(task) for task in tasks]
+
+    @staticmethod
+    def _format_json_task(task):
+        if not task.get('data'):
+            task = {'data': task}
+        if not isinstance(task['data'], dict):
+            raise ValidationError('Task item should be dict')
+        return task
+
+    def iter_tasks_list_from_json(self):
+        """Parse JSON array items one by one instead of loading the whole file"""
+        logger.debug('Iterate tasks list from JSON file {}'.format(self.file.name))
+        with self.file.open('rb') as f:
+            head = f.read(1024).lstrip(b'\xef\xbb\xbf \t\r\n')
+            f.seek(0)
+            if ijson is None or not head.startswith(b'['):
+                # a single task as dict, it's small enough to be loaded at once
+                yield from self.read_tasks_list_from_json()
+                return
+            for task in ijson.items(f, 'item', use_float=True):
+                yield self._format_json_task(task)
+
+    def _read_csv_dtypes(self, sep=','):
+        """Column dtypes of the whole CSV file like read_tasks_list_from_csv infers them:
+        int and float chunks of a column make it float, any other mix makes it object
+        """
+        dtypes = {}
+        with self.file.open() as f:
+            for chunk in pd.read_csv(f, sep=sep, chunksize=settings.IMPORT_BATCH_SIZE):
+                for column, dtype in chunk.dtypes.items():
+                    current = dtypes.setdefault(column, dtype)
+                    if current == dtype:
+                        continue
+                    if current.kind in 'iuf' and dtype.kind in 'iuf':
+                        dtypes[column] = np.dtype('float64')
+                    else:
+                        dtypes[column] = np.dtype('object')
+        return dtypes
+
+    def iter_tasks_list_from_csv(self, sep=','):
+        """Read CSV in chunks with dtypes found over the whole file,
+        so a column has the same value types in all batches
+        """
+        logger.debug('Iterate tasks list from CSV file {}'.format(self.file.name))
+        dtypes = self._read_csv_dtypes(sep)
+        with self.file.open() as f:
+            for chunk in pd.read_csv(f, sep=sep, dtype=dtypes, chunksize=settings.IMPORT_BATCH_SIZE):
+                for task in chunk.fillna('').to_dict('records'):
+                    yield {'data': task}
+
+    def iter_tasks_list_from_txt(self):
+        logger.debug('Iterate tasks list from text file {}'.format(self.file.name))
+        for line in io.TextIOWrapper(self.file.open('rb'), encoding='utf-8'):
+            yield {'data': {settings.DATA_UNDEFINED_NAME: line.rstrip('\r\n')}}
 
     def read_task_from_hypertext_body(self):
         logger.debug('Read 1 task from hypertext file {}'.format(self.file.name))
@@ -158,6 +212,60 @@ class FileUpload(models.Model):
             raise ValidationError('Failed to parse input file ' + self.file.name + ': ' + str(exc))
         return tasks
 
+    def iter_tasks(self, file_as_tasks_list=True):
+        """Streaming version of read_tasks: tasks lists (JSON, CSV, TSV, TXT) are parsed incrementally"""
+        file_format = self.format
+        if file_format == '.json':
+            tasks = self.iter_tasks_list_from_json()
+        elif file_format == '.csv' and file_as_tasks_list:
+            tasks = self.iter_tasks_list_from_csv()
+        elif file_format == '.tsv' and file_as_tasks_list:
+            tasks = self.iter_tasks_list_from_csv('\t')
+        elif file_format == '.txt' and file_as_tasks_list:
+            tasks = self.iter_tasks_list_from_txt()
+        else:
+            # single asset per file
+            yield from self.read_tasks(file_as_tasks_list)
+            return
+
+        try:
+            yield from tasks
+        except Exception as exc:
+            raise ValidationError('Failed to parse input file ' + self.file.name + ': ' + str(exc))
+
+    @classmethod
+    def iter_tasks_from_uploaded_files(cls, project, file_upload_ids=None, files_as_tasks_list=True, stats=None):
+        """Streaming version of load_tasks_from_uploaded_files, memory usage doesn't depend on file sizes
+        :param stats: dict to collect found_formats and data_columns while iterating
+        """
+        stats = {} if stats is None else stats
+        fileformats = stats.setdefault('found_formats', Counter())
+        common_data_fields = stats.setdefault('data_columns', set())
+
+        file_uploads = FileUpload.objects.filter(project=project)
+        if file_upload_ids:
+            file_uploads = file_uploads.filter(id__in=file_upload_ids)
+        for file_upload in file_uploads.iterator():
+            first = True
+            for task in file_upload.iter_tasks(files_as_tasks_list):
+                if first:
+                    # data keys are compared by the first task of each file, like in load_tasks_from_uploaded_files
+                    new_data_fields = set(task['data'].keys())
+                    if not common_data_fields:
+                        common_data_fields |= new_data_fields
+                    elif not common_data_fields.intersection(new_data_fields):
+                        raise ValidationError(
+                            _old_vs_new_data_keys_inconsistency_message(
+                                new_data_fields, common_data_fields, file_upload.file.name
+                            )
+                        )
+                    else:
+                        common_data_fields &= new_data_fields
+                    first = False
+                task['file_upload_id'] = file_upload.id
+                yield task
+            fileformats[file_upload.format] += 1
+
     @classmethod
     def load_tasks_from_uploaded_files(
         cls, project, file_upload_ids=None, formats=None, files_as_tasks_list=True, trim_size=None
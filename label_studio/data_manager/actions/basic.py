@@ -6,10 +6,11 @@ from datetime import datetime
 from core.permissions import AllPermissions
 from core.redis import start_job_async_or_sync
 from core.utils.common import load_func
-from data_manager.functions import evaluate_predictions
+from data_manager.functions import bump_project_data_version
 from django.conf import settings
-from projects.models import Project
-from tasks.functions import update_tasks_counters
+from ml.models import MLBackendPredictionJob
+from projects.models import Project, ProjectCounters
+from tasks.functions import coalesce_task_counters, mark_task_counters_dirty
 from tasks.models import Annotation, AnnotationDraft, Prediction, Task
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -19,13 +20,22 @@ logger = logging.getLogger(__name__)
 
 
 def retrieve_tasks_predictions(project, queryset, **kwargs):
-    """Retrieve predictions by tasks ids
+    """Retrieve predictions by tasks ids in a background job of the project ML backend
 
     :param project: project instance
     :param queryset: filtered tasks db queryset
     """
-    evaluate_predictions(queryset)
-    return {'processed_items': queryset.count(), 'detail': 'Retrieved ' + str(queryset.count()) + ' predictions'}
+    ml_backend = project.ml_backend
+    if ml_backend is None:
+        return {'processed_items': 0, 'detail': 'No ML backend connected to the project'}
+
+    task_ids = list(queryset.values_list('id', flat=True))
+    job = MLBackendPredictionJob.create(ml_backend, task_ids)
+    return {
+        'processed_items': len(task_ids),
+        'detail': f'Retrieving predictions for {len(task_ids)} tasks in background job {job.id}',
+        'prediction_job': job.id,
+    }
 
 
 def delete_tasks(project, queryset, **kwargs):
@@ -45,6 +55,7 @@ def delete_tasks(project, queryset, **kwargs):
     if count == project_count:
         start_job_async_or_sync(Task.delete_tasks_without_signals_from_task_ids, tasks_ids_list)
         project.summary.reset()
+        ProjectCounters.reset(project.id)
 
     # delete only specific tasks
     else:
@@ -89,15 +100,19 @@ def delete_tasks_annotations(project, queryset, **kwargs):
     drafts = AnnotationDraft.objects.filter(task__id__in=task_ids)
     project.summary.remove_created_drafts_and_labels(drafts)
 
-    annotations.delete()
-    drafts.delete()  # since task-level annotation drafts will not have been deleted by CASCADE
+    # draft signals refresh task aggregates, they're flushed once per task with the counters at the end of the block
+    with coalesce_task_counters():
+        annotations.delete()
+        drafts.delete()  # since task-level annotation drafts will not have been deleted by CASCADE
+        # Update tasks counters and is_labeled with a single UPDATE per batch of tasks
+        mark_task_counters_dirty(real_task_ids)
     emit_webhooks_for_instance(project.organization, project, WebhookAction.ANNOTATIONS_DELETED, annotations_ids)
     request = kwargs['request']
 
     tasks = Task.objects.filter(id__in=real_task_ids)
     tasks.update(updated_at=datetime.now(), updated_by=request.user)
-    # Update tasks counter and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-    project.update_tasks_counters_and_is_labeled(tasks_queryset=real_task_ids)
+    ProjectCounters.recalculate_on_commit(project.id)
+    bump_project_data_version(project.id)
 
     # LSE postprocess
     postprocess = load_func(settings.DELETE_TASKS_ANNOTATIONS_POSTPROCESS)
@@ -116,10 +131,12 @@ def delete_tasks_predictions(project, queryset, **kwargs):
     """
     task_ids = queryset.values_list('id', flat=True)
     predictions = Prediction.objects.filter(task__id__in=task_ids)
-    real_task_ids = set(list(predictions.values_list('task__id', flat=True)))
     count = predictions.count()
-    predictions.delete()
-    start_job_async_or_sync(update_tasks_counters, Task.objects.filter(id__in=real_task_ids))
+    # prediction signals mark their tasks, counters are recounted once after deleting
+    with coalesce_task_counters():
+        predictions.delete()
+    ProjectCounters.recalculate_on_commit(project.id)
+    bump_project_data_version(project.id)
     return {'processed_items': count, 'detail': 'Deleted ' + str(count) + ' predictions'}
 
 
@@ -129,6 +146,7 @@ def async_project_summary_recalculation(tasks_ids_list, project_id):
     project.summary.remove_created_annotations_and_labels(Annotation.objects.filter(task__in=queryset))
     project.summary.remove_data_columns(queryset)
     Task.delete_tasks_without_signals(queryset)
+    ProjectCounters.recalculate_on_commit(project_id)
 
 
 actions = [
@@ -139,9 +157,8 @@ actions = [
         'order': 90,
         'dialog': {
             'title': 'Retrieve Predictions',
-            'text': 'Send the selected tasks to all ML backends connected to the project.'
-            'This operation might be abruptly interrupted due to a timeout. '
-            'The recommended way to get predictions is to update tasks using the Label Studio API.'
+            'text': 'Send the selected tasks to the ML backend connected to the project. '
+            'Predictions are retrieved in a background job. '
             'Please confirm your action.',
             'type': 'confirm',
         },
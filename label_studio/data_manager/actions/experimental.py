@@ -7,8 +7,10 @@ import random
 import ujson as json
 from core.permissions import AllPermissions
 from core.utils.db import fast_first
-from data_manager.functions import DataManagerException
+from data_manager.functions import DataManagerException, bump_project_data_version
 from django.conf import settings
+from projects.models import ProjectCounters
+from tasks.functions import update_task_counters
 from tasks.models import Annotation, Task
 from tasks.serializers import TaskSerializerBulk
 
@@ -47,8 +49,10 @@ def propagate_annotations(project, queryset, **kwargs):
 
     db_annotations = Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
     TaskSerializerBulk.post_process_annotations(user, db_annotations, 'propagated_annotation')
-    # Update counters for tasks and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-    project.update_tasks_counters_and_is_labeled(tasks_queryset=Task.objects.filter(id__in=tasks))
+    # Update counters for tasks and is_labeled with a single UPDATE per batch of tasks
+    update_task_counters(tasks)
+    ProjectCounters.recalculate_on_commit(project.id)
+    bump_project_data_version(project.id)
     return {
         'response_code': 200,
         'detail': f'Created {len(db_annotations)} annotations',
@@ -167,7 +171,7 @@ def add_data_field(project, queryset, **kwargs):
     value = cast[value_type](value)
 
     if value_type == 'Expression':
-        add_expression(queryset, size, value, value_name)
+        tasks = add_expression(queryset, size, value, value_name)
 
     else:
 
@@ -190,6 +194,9 @@ def add_data_field(project, queryset, **kwargs):
             )
 
     project.summary.update_data_columns([queryset.first()])
+    # bulk writes skip task signals, so all new values are registered for numeric ordering
+    written = tasks if value_type == 'Expression' else [{value_name: value}]
+    project.summary.update_data_column_types(written, columns=[value_name])
     return {'response_code': 200, 'detail': f'Updated {size} tasks'}
 
 
@@ -267,6 +274,7 @@ def add_expression(queryset, size, value, value_name):
         raise Exception('Undefined expression, you can use: ' + add_data_field_examples)
 
     Task.objects.bulk_update(tasks, fields=['data'], batch_size=1000)
+    return tasks
 
 
 def add_data_field_form(user, project):
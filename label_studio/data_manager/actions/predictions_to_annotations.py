@@ -3,7 +3,10 @@
 import logging
 
 from core.permissions import AllPermissions
+from data_manager.functions import bump_project_data_version
 from django.utils.timezone import now
+from projects.models import ProjectCounters
+from tasks.functions import update_task_counters
 from tasks.models import Annotation, Prediction, Task
 from tasks.serializers import TaskSerializerBulk
 from webhooks.models import WebhookAction
@@ -56,8 +59,10 @@ def predictions_to_annotations(project, queryset, **kwargs):
         emit_webhooks_for_instance(
             user.active_organization, project, WebhookAction.ANNOTATIONS_CREATED, db_annotations
         )
-        # Update counters for tasks and is_labeled. It should be a single operation as counters affect bulk is_labeled update
-        project.update_tasks_counters_and_is_labeled(Task.objects.filter(id__in=tasks_ids))
+        # Update counters for tasks and is_labeled with a single UPDATE per batch of tasks
+        update_task_counters(set(tasks_ids))
+        ProjectCounters.recalculate_on_commit(project.id)
+        bump_project_data_version(project.id)
     return {'response_code': 200, 'detail': f'Created {count} annotations'}
 
 
@@ -1,6 +1,10 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import base64
+import json
 import logging
+from datetime import datetime
+from functools import partial
 
 from asgiref.sync import async_to_sync, sync_to_async
 from core.feature_flags import flag_set
@@ -8,7 +12,12 @@ from core.permissions import ViewClassPermission, all_permissions
 from core.utils.common import int_from_request, load_func
 from core.utils.params import bool_from_request
 from data_manager.actions import get_all_actions, perform_action
-from data_manager.functions import evaluate_predictions, get_prepare_params, get_prepared_queryset
+from data_manager.functions import (
+    get_prepare_params,
+    get_prepared_queryset,
+    get_task_totals_cached,
+    warm_predictions,
+)
 from data_manager.managers import get_fields_for_evaluation
 from data_manager.models import View
 from data_manager.prepare_params import filters_schema, ordering_schema, prepare_params_schema
@@ -19,6 +28,10 @@ from data_manager.serializers import (
     ViewSerializer,
 )
 from django.conf import settings
+from django.core.paginator import Paginator as DjangoPaginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import ExpressionWrapper, F, Q
+from django.db.models.expressions import OrderBy
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
@@ -27,10 +40,12 @@ from projects.models import Project
 from projects.serializers import ProjectSerializer
 from rest_framework import generics, viewsets
 from rest_framework.decorators import action
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
-from tasks.models import Annotation, Prediction, Task
+from tasks.models import Annotation, Task
 
 logger = logging.getLogger(__name__)
 
@@ -203,6 +218,15 @@ class ViewAPI(viewsets.ModelViewSet):
         return View.objects.filter(project__organization=self.request.user.active_organization).order_by('order', 'id')
 
 
+class TaskPaginator(DjangoPaginator):
+    """Django paginator with precalculated object count"""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.__dict__['count'] = count
+
+
 class TaskPagination(PageNumberPagination):
     page_size = 100
     page_size_query_param = 'page_size'
@@ -210,18 +234,22 @@ class TaskPagination(PageNumberPagination):
     total_predictions = 0
     max_page_size = settings.TASK_API_PAGE_SIZE_MAX
 
+    def set_totals(self, totals):
+        self.total_predictions = totals['total_predictions']
+        self.total_annotations = totals['total_annotations']
+        # total is already counted, don't let django paginator run COUNT(*) again
+        self.django_paginator_class = partial(TaskPaginator, count=totals['total'])
+
     @async_to_sync
     async def async_paginate_queryset(self, queryset, request, view=None):
-        predictions_count_qs = Prediction.objects.filter(task_id__in=queryset)
-        self.total_predictions = await sync_to_async(predictions_count_qs.count, thread_sensitive=True)()
-
-        annotations_count_qs = Annotation.objects.filter(task_id__in=queryset, was_cancelled=False)
-        self.total_annotations = await sync_to_async(annotations_count_qs.count, thread_sensitive=True)()
+        project_id = getattr(getattr(view, 'project', None), 'id', None)
+        totals = await sync_to_async(get_task_totals_cached, thread_sensitive=True)(queryset, project_id)
+        self.set_totals(totals)
         return await sync_to_async(super().paginate_queryset, thread_sensitive=True)(queryset, request, view)
 
     def sync_paginate_queryset(self, queryset, request, view=None):
-        self.total_predictions = Prediction.objects.filter(task_id__in=queryset).count()
-        self.total_annotations = Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count()
+        project_id = getattr(getattr(view, 'project', None), 'id', None)
+        self.set_totals(get_task_totals_cached(queryset, project_id))
         return super().paginate_queryset(queryset, request, view)
 
     def paginate_queryset(self, queryset, request, view=None):
@@ -241,6 +269,136 @@ class TaskPagination(PageNumberPagination):
         )
 
 
+class TaskCursorPagination(BasePagination):
+    """Keyset pagination for the task list
+
+    The opaque cursor stores the value of the active ordering key and the task id of the last row,
+    so every page is a range scan instead of OFFSET + COUNT(*). Totals are available at /api/dm/totals/.
+    Pass an empty `cursor` query param to request the first page.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = settings.TASK_API_PAGE_SIZE_MAX
+    invalid_cursor_message = 'Invalid cursor'
+
+    @staticmethod
+    def get_ordering(queryset):
+        """Extract ordering key and direction applied by data_manager.managers.apply_ordering"""
+        order_by = queryset.query.order_by
+        if not order_by:
+            return 'id', True
+
+        first = order_by[0]
+        if isinstance(first, str):
+            return first.lstrip('-'), not first.startswith('-')
+        if isinstance(first, OrderBy) and isinstance(first.expression, F):
+            return first.expression.name, not first.descending
+        raise NotFound('Cursor pagination is not supported for this ordering')
+
+    def encode_cursor(self, key, value, pk):
+        if isinstance(value, datetime):
+            # DjangoJSONEncoder truncates microseconds, but the keyset comparison must be exact
+            value = value.isoformat()
+        payload = json.dumps({'k': key, 'v': value, 'id': pk}, cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, key):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if cursor['k'] != key:
+                raise ValueError('ordering mismatch')
+            return cursor['v'], int(cursor['id'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size) if self.max_page_size else page_size
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    @staticmethod
+    def keyset_filter(value, pk, ascending, key_is_id):
+        """Rows strictly after (value, pk) in (key NULLS LAST, id) order"""
+        after = 'gt' if ascending else 'lt'
+        if key_is_id:
+            return Q(**{f'id__{after}': pk})
+        if value is None:
+            return Q(cursor_key__isnull=True, **{f'id__{after}': pk})
+        return (
+            Q(**{f'cursor_key__{after}': value})
+            | Q(cursor_key=value, **{f'id__{after}': pk})
+            | Q(cursor_key__isnull=True)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        field, ascending = self.get_ordering(queryset)
+        key_is_id = field in ('id', 'pk')
+        direction = '' if ascending else '-'
+        key = f'{direction}{field}'
+
+        if key_is_id:
+            queryset = queryset.order_by(f'{direction}id')
+        else:
+            key_order = F('cursor_key').asc(nulls_last=True) if ascending else F('cursor_key').desc(nulls_last=True)
+            # wrap annotations to compare by their output type, e.g. KeyTextTransform must be compared as text
+            annotation = queryset.query.annotations.get(field)
+            cursor_key = F(field) if annotation is None else ExpressionWrapper(F(field), annotation.output_field)
+            queryset = queryset.annotate(cursor_key=cursor_key).order_by(key_order, f'{direction}id')
+
+        cursor = self.decode_cursor(request, key)
+        if cursor is not None:
+            queryset = queryset.filter(self.keyset_filter(*cursor, ascending, key_is_id))
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[: page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+
+        self.next_cursor = None
+        if self.has_next:
+            last = page[-1]
+            value = last.id if key_is_id else last.cursor_key
+            self.next_cursor = self.encode_cursor(key, value, last.id)
+        return page
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                'next': self.get_next_link(),
+                'cursor': self.next_cursor,
+                'tasks': data,
+            }
+        )
+
+
+def get_project_from_request(request):
+    """Get project by `project` or `view` id from request params or payload"""
+    view_pk = int_from_request(request.GET, 'view', 0) or int_from_request(request.data, 'view', 0)
+    project_pk = int_from_request(request.GET, 'project', 0) or int_from_request(request.data, 'project', 0)
+    if project_pk:
+        return generics.get_object_or_404(Project, pk=project_pk)
+    elif view_pk:
+        view = generics.get_object_or_404(View, pk=view_pk)
+        return view.project
+    return None
+
+
 class TaskListAPI(generics.ListCreateAPIView):
     task_serializer_class = DataManagerTaskSerializer
     permission_required = ViewClassPermission(
@@ -251,6 +409,17 @@ class TaskListAPI(generics.ListCreateAPIView):
         DELETE=all_permissions.tasks_delete,
     )
     pagination_class = TaskPagination
+    cursor_pagination_class = TaskCursorPagination
+
+    @property
+    def paginator(self):
+        """Switch to keyset pagination when the client passes the `cursor` query param"""
+        if not hasattr(self, '_paginator'):
+            if self.cursor_pagination_class.cursor_query_param in self.request.query_params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
 
     @staticmethod
     def get_task_serializer_context(request, project):
@@ -281,21 +450,17 @@ class TaskListAPI(generics.ListCreateAPIView):
             'io_storages_redisimportstoragelink',
             'io_storages_s3importstoragelink',
             'file_upload',
+            'comment_authors',
         )
 
     def get(self, request):
         # get project
-        view_pk = int_from_request(request.GET, 'view', 0) or int_from_request(request.data, 'view', 0)
-        project_pk = int_from_request(request.GET, 'project', 0) or int_from_request(request.data, 'project', 0)
-        if project_pk:
-            project = generics.get_object_or_404(Project, pk=project_pk)
-            self.check_object_permissions(request, project)
-        elif view_pk:
-            view = generics.get_object_or_404(View, pk=view_pk)
-            project = view.project
-            self.check_object_permissions(request, project)
-        else:
+        project = get_project_from_request(request)
+        if project is None:
             return Response({'detail': 'Neither project nor view id specified'}, status=404)
+        self.check_object_permissions(request, project)
+        self.project = project
+
         # get prepare params (from view or from payload directly)
         prepare_params = get_prepare_params(request, project)
         queryset = self.get_task_queryset(request, prepare_params)
@@ -314,30 +479,33 @@ class TaskListAPI(generics.ListCreateAPIView):
             all_fields = None
         if page is not None:
             ids = [task.id for task in page]  # page is a list already
-            tasks = list(
-                self.prefetch(
-                    Task.prepared.annotate_queryset(
-                        Task.objects.filter(id__in=ids),
-                        fields_for_evaluation=fields_for_evaluation,
-                        all_fields=all_fields,
-                        request=request,
+
+            def fetch_page():
+                tasks = list(
+                    self.prefetch(
+                        Task.prepared.annotate_queryset(
+                            Task.objects.filter(id__in=ids),
+                            fields_for_evaluation=fields_for_evaluation,
+                            all_fields=all_fields,
+                            request=request,
+                        )
                     )
                 )
-            )
-            tasks_by_ids = {task.id: task for task in tasks}
-            # keep ids ordering
-            page = [tasks_by_ids[_id] for _id in ids]
+                tasks_by_ids = {task.id: task for task in tasks}
+                # keep ids ordering
+                return [tasks_by_ids[_id] for _id in ids]
+
+            page = fetch_page()
 
             # retrieve ML predictions if tasks don't have them
             if not review and project.evaluate_predictions_automatically:
-                # TODO MM TODO this needs a discussion, because I'd expect
-                # people to retrieve manually instead on DM load, plus it
-                # will slow down initial DM load
-                # if project.retrieve_predictions_automatically is deprecated now and no longer used
-                tasks_for_predictions = Task.objects.filter(id__in=ids, predictions__isnull=True)
-                evaluate_predictions(tasks_for_predictions)
-                [tasks_by_ids[_id].refresh_from_db() for _id in ids]
+                # missing predictions are retrieved in background, the page shows predictions that exist now,
+                # without redis they are retrieved right away and the page is fetched again at once
+                if warm_predictions(project, [task.id for task in page if not task.predictions.all()]):
+                    page = fetch_page()
 
+            # drafts and other per task relations of the page are loaded at once
+            self.task_serializer_class.load_page(page, context)
             if flag_set('fflag_fix_back_leap_24_tasks_api_optimization_05092023_short'):
                 serializer = self.task_serializer_class(
                     page,
@@ -350,7 +518,7 @@ class TaskListAPI(generics.ListCreateAPIView):
             return self.get_paginated_response(serializer.data)
         # all tasks
         if project.evaluate_predictions_automatically:
-            evaluate_predictions(queryset.filter(predictions__isnull=True))
+            warm_predictions(project, list(queryset.filter(predictions__isnull=True).values_list('id', flat=True)))
         queryset = Task.prepared.annotate_queryset(
             queryset, fields_for_evaluation=fields_for_evaluation, all_fields=all_fields, request=request
         )
@@ -358,6 +526,37 @@ class TaskListAPI(generics.ListCreateAPIView):
         return Response(serializer.data)
 
 
+@method_decorator(
+    name='get',
+    decorator=swagger_auto_schema(
+        tags=['Data Manager'],
+        x_fern_audiences=['internal'],
+        operation_summary='Get task list totals',
+        operation_description=(
+            'Retrieve the exact number of tasks, annotations and predictions for the filtered task list. '
+            'Use it together with cursor pagination of the task list, which does not return totals.'
+        ),
+        manual_parameters=[
+            openapi.Parameter(
+                name='project', type=openapi.TYPE_INTEGER, in_=openapi.IN_QUERY, description='Project ID'
+            ),
+            openapi.Parameter(name='view', type=openapi.TYPE_INTEGER, in_=openapi.IN_QUERY, description='View ID'),
+        ],
+    ),
+)
+class TaskTotalsAPI(APIView):
+    permission_required = all_permissions.tasks_view
+
+    def get(self, request):
+        project = get_project_from_request(request)
+        if project is None:
+            return Response({'detail': 'Neither project nor view id specified'}, status=404)
+        self.check_object_permissions(request, project)
+
+        queryset = get_prepared_queryset(request, project)
+        return Response(get_task_totals_cached(queryset, project.id))
+
+
 @method_decorator(
     name='get',
     decorator=swagger_auto_schema(
@@ -1,5 +1,6 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
 import logging
 from collections import OrderedDict
 from typing import Any, Iterable, Tuple
@@ -7,12 +8,15 @@ from urllib.parse import unquote
 
 import ujson as json
 from core.feature_flags import flag_set
+from core.redis import redis_connected, redis_delete, redis_get, redis_incr, redis_set, start_job_async_or_sync
 from core.utils.common import int_from_request
 from data_manager.models import View
 from data_manager.prepare_params import PrepareParams
 from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import transaction
 from rest_framework.generics import get_object_or_404
-from tasks.models import Task
+from tasks.models import Annotation, Prediction, Task
 
 TASKS = 'tasks:'
 logger = logging.getLogger(__name__)
@@ -328,6 +332,63 @@ def get_prepared_queryset(request, project):
     return queryset
 
 
+def get_task_totals(queryset):
+    """Count tasks, annotations and predictions for the filtered task queryset
+
+    :param queryset: filtered task queryset (e.g. from Task.prepared.only_filtered)
+    :return: dict with total, total_annotations and total_predictions
+    """
+    return {
+        'total': queryset.count(),
+        'total_annotations': Annotation.objects.filter(task_id__in=queryset, was_cancelled=False).count(),
+        'total_predictions': Prediction.objects.filter(task_id__in=queryset).count(),
+    }
+
+
+def _project_data_version_key(project_id):
+    return f'dm:project:{project_id}:data-version'
+
+
+def get_project_data_version(project_id):
+    """Version of project tasks, annotations and predictions, it's incremented on every change"""
+    version = redis_get(_project_data_version_key(project_id))
+    return int(version) if version else 0
+
+
+def bump_project_data_version(project_id):
+    """Invalidate cached task totals for the project after the current transaction is committed"""
+    if project_id is None or not settings.TASK_API_TOTALS_CACHE_TTL:
+        return
+    transaction.on_commit(lambda: redis_incr(_project_data_version_key(project_id)))
+
+
+def get_task_totals_cached(queryset, project_id):
+    """Get task totals from redis or count and cache them
+
+    Cache key is built from the project, the hash of the filtered SQL query and the project data version,
+    so scrolling the same view doesn't recount totals until tasks, annotations or predictions are changed.
+    """
+    if not settings.TASK_API_TOTALS_CACHE_TTL or not redis_connected():
+        return get_task_totals(queryset)
+
+    try:
+        sql = str(queryset.order_by().query)
+    except EmptyResultSet:
+        return get_task_totals(queryset)
+
+    filters_hash = hashlib.md5(sql.encode('utf-8')).hexdigest()
+    version = get_project_data_version(project_id)
+    key = f'dm:project:{project_id}:totals:{version}:{filters_hash}'
+
+    cached = redis_get(key)
+    if cached:
+        return json.loads(cached)
+
+    totals = get_task_totals(queryset)
+    redis_set(key, json.dumps(totals), ttl=settings.TASK_API_TOTALS_CACHE_TTL)
+    return totals
+
+
 def evaluate_predictions(tasks):
     """
     Call the given ML backend to retrieve predictions with the task queryset as an input.
@@ -345,6 +406,41 @@ def evaluate_predictions(tasks):
         return backend.predict_tasks(tasks=tasks)
 
 
+def _warm_predictions_job(project_id, task_ids, key=None):
+    try:
+        tasks = Task.objects.filter(project_id=project_id, id__in=task_ids, predictions__isnull=True)
+        evaluate_predictions(list(tasks.select_related('project')))
+    finally:
+        if key:
+            redis_delete(key)
+
+
+def warm_predictions(project, task_ids):
+    """
+    Retrieve predictions for the tasks without them in a background job,
+    so readers get the predictions that exist already instead of waiting for the ML backend.
+    Without redis predictions are retrieved right away.
+    :param project: Project of the tasks
+    :param task_ids: Ids of tasks without predictions
+    :return: True if predictions are retrieved right away and the tasks should be fetched again
+    """
+    if not task_ids:
+        return False
+
+    key = None
+    if redis_connected():
+        # the same page opened again while the job is pending doesn't queue it twice
+        ids_hash = hashlib.md5(json.dumps(sorted(task_ids)).encode('utf-8')).hexdigest()
+        key = f'ml:project:{project.id}:warm_predictions:{ids_hash}'
+        if not redis_set(key, 1, ttl=settings.PREDICTIONS_WARMING_TTL, nx=True):
+            return False
+        start_job_async_or_sync(_warm_predictions_job, project.id, list(task_ids), key=key, queue_name='low')
+        return False
+
+    _warm_predictions_job(project.id, list(task_ids))
+    return True
+
+
 def filters_ordering_selected_items_exist(data):
     return data.get('filters') or data.get('ordering') or data.get('selectedItems')
 
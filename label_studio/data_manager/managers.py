@@ -7,10 +7,13 @@ from typing import ClassVar
 
 import ujson as json
 from core.feature_flags import flag_set
-from core.utils.db import fast_first
+from core.utils.db import SQCount, fast_first
+from data_manager.plan_cache import view_plan_cache
 from data_manager.prepare_params import ConjunctionEnum
 from django.conf import settings
 from django.contrib.postgres.aggregates import ArrayAgg
+from django.contrib.postgres.fields import ArrayField
+from django.core.exceptions import FieldDoesNotExist, FieldError
 from django.db import models
 from django.db.models import (
     Aggregate,
@@ -29,6 +32,7 @@ from django.db.models import (
 )
 from django.db.models.fields.json import KeyTextTransform
 from django.db.models.functions import Cast, Coalesce, Concat
+from django.utils.timezone import now
 from pydantic import BaseModel
 
 from label_studio.core.utils.common import load_func
@@ -112,11 +116,19 @@ def get_fields_for_evaluation(prepare_params, user, skip_regular=True):
     if fields:
         from label_studio.data_manager.functions import TASKS
 
-        GET_ALL_COLUMNS = load_func(settings.DATA_MANAGER_GET_ALL_COLUMNS)
-        all_columns = GET_ALL_COLUMNS(Project.objects.get(id=prepare_params.project), user)
-        all_columns = set(
-            [TASKS + ('data.' if c.get('parent', None) == 'data' else '') + c['id'] for c in all_columns['columns']]
-        )
+        project = Project.objects.get(id=prepare_params.project)
+        key = view_plan_cache.make_key(project, user_id=getattr(user, 'id', None))
+        all_columns = view_plan_cache.get(key, 'columns')
+        if all_columns is None:
+            GET_ALL_COLUMNS = load_func(settings.DATA_MANAGER_GET_ALL_COLUMNS)
+            all_columns = GET_ALL_COLUMNS(project, user)
+            all_columns = frozenset(
+                [
+                    TASKS + ('data.' if c.get('parent', None) == 'data' else '') + c['id']
+                    for c in all_columns['columns']
+                ]
+            )
+            view_plan_cache.set(key, 'columns', all_columns)
         hidden = set(fields['explore']) & set(fields['labeling'])
         shown = all_columns - hidden
         shown = {c[len(TASKS) :] for c in shown} - {'data'}  # remove tasks:
@@ -135,6 +147,95 @@ def get_fields_for_evaluation(prepare_params, user, skip_regular=True):
     return result
 
 
+def get_data_column_types(project):
+    """Types of task.data column values recorded by ProjectSummary.update_data_columns,
+    they are loaded once per project instance, columns of projects not filled by the migration job yet are unknown
+    """
+    from projects.models import ProjectSummary
+
+    if not hasattr(project, '_data_column_types'):
+        project._data_column_types = (
+            ProjectSummary.objects.filter(project_id=project.id, data_column_types_ready=True)
+            .values_list('data_column_types', flat=True)
+            .first()
+            or {}
+        )
+    return project._data_column_types
+
+
+# python types of non-text model fields, filters only tell apart str and list values
+FIELD_VALUE_TYPES = {
+    models.BooleanField: 'bool',
+    models.IntegerField: 'int',
+    models.FloatField: 'float',
+    models.DateTimeField: 'datetime',
+}
+
+
+def get_static_field_value_type(queryset, field_name):
+    """Type name of values that doesn't depend on task rows: non-text and array Task fields or annotations,
+    None if the type can be found from the rows only
+    """
+    try:
+        annotation = queryset.query.annotations.get(field_name)
+        field = queryset.model._meta.get_field(field_name) if annotation is None else annotation.output_field
+    except (FieldDoesNotExist, FieldError):
+        return None
+
+    if isinstance(field, ArrayField):
+        return 'list'
+    for field_class, value_type in FIELD_VALUE_TYPES.items():
+        if isinstance(field, field_class):
+            return value_type
+    return None
+
+
+def search_documents_ready(project):
+    """Task search documents are built for all annotations and predictions of the project"""
+    from projects.models import ProjectSummary
+
+    if not hasattr(project, '_search_documents_ready'):
+        project._search_documents_ready = ProjectSummary.objects.filter(
+            project_id=project.id, search_documents_ready=True
+        ).exists()
+    return project._search_documents_ready
+
+
+def task_aggregates_ready(project):
+    """Task aggregates are built for all annotations, predictions and drafts of the project"""
+    from projects.models import ProjectSummary
+
+    if project is None:
+        return False
+    if not hasattr(project, '_task_aggregates_ready'):
+        project._task_aggregates_ready = ProjectSummary.objects.filter(
+            project_id=project.id, task_aggregates_ready=True
+        ).exists()
+    return project._task_aggregates_ready
+
+
+def get_field_value_type(queryset, field_name, project):
+    """Type name of field values used to build filters, task.data columns are taken from the type registry,
+    model fields and annotations from their field classes, the rest is resampled from the first queryset row
+    """
+    if field_name.startswith('data__'):
+        from projects.models import ProjectSummary
+
+        value_type = get_data_column_types(project).get(field_name[len('data__') :])
+        if value_type and value_type != ProjectSummary.MIXED_DATA_COLUMN_TYPE:
+            return value_type
+
+    value_type = get_static_field_value_type(queryset, field_name)
+    if value_type:
+        return value_type
+
+    view_plan_cache.mark_uncacheable(f'value type of {field_name} is sampled from tasks')
+    value_type = 'str'
+    if queryset.exists():
+        value_type = type(queryset.values_list(field_name, flat=True)[0]).__name__
+    return value_type
+
+
 def apply_ordering(queryset, ordering, project, request, view_data=None):
     if ordering:
 
@@ -158,15 +259,20 @@ def apply_ordering(queryset, ordering, project, request, view_data=None):
             json_field = field_name.replace('data__', '')
             numeric_ordering_applied = False
             if numeric_ordering is True:
-                queryset = queryset.annotate(
+                numeric_queryset = queryset.annotate(
                     ordering_field=Cast(KeyTextTransform(json_field, 'data'), output_field=FloatField())
                 )
-                # for non numeric values we need fallback to string ordering
-                try:
-                    queryset.first()
-                    numeric_ordering_applied = True
-                except Exception as e:
-                    logger.warning(f'Failed to apply numeric ordering for field {json_field}: {e}')
+                # registered numeric columns are cast without a trial query
+                if get_data_column_types(project).get(json_field) in ('int', 'float'):
+                    queryset, numeric_ordering_applied = numeric_queryset, True
+                else:
+                    # for non numeric values we need fallback to string ordering
+                    view_plan_cache.mark_uncacheable(f'numeric ordering by {json_field} is tried on tasks')
+                    try:
+                        numeric_queryset.first()
+                        queryset, numeric_ordering_applied = numeric_queryset, True
+                    except Exception as e:
+                        logger.warning(f'Failed to apply numeric ordering for field {json_field}: {e}')
             if not numeric_ordering_applied:
                 queryset = queryset.annotate(ordering_field=KeyTextTransform(json_field, 'data'))
             f = F('ordering_field').asc(nulls_last=True) if ascending else F('ordering_field').desc(nulls_last=True)
@@ -202,12 +308,16 @@ def cast_value(_filter):
 
 def add_result_filter(field_name, _filter, filter_expressions, project):
     from django.db.models.expressions import RawSQL
-    from tasks.models import Annotation, Prediction
+    from tasks.models import Annotation, Prediction, TaskSearchDocument
 
     _class = Annotation if field_name == 'annotations_results' else Prediction
 
+    # label values flattened into task search documents, they are indexed in contrast to raw result JSON
+    if _filter.operator in [Operator.CONTAINS, Operator.NOT_CONTAINS] and search_documents_ready(project):
+        text_field = 'annotations_text' if field_name == 'annotations_results' else 'predictions_text'
+        subquery = Q(id__in=TaskSearchDocument.search(project, text_field, _filter.value))
     # Annotation
-    if field_name == 'annotations_results':
+    elif field_name == 'annotations_results':
         subquery = Q(
             id__in=Annotation.objects.annotate(json_str=RawSQL('cast(result as text)', ''))
             .filter(Q(project=project) & Q(json_str__contains=_filter.value))
@@ -259,6 +369,30 @@ def add_user_filter(enabled, key, _filter, filter_expressions):
         return 'continue'
 
 
+def add_annotators_filter(enabled, _filter, filter_expressions):
+    """Annotators are filtered with EXISTS subqueries: a join on annotations returns a task once per
+    matching annotation when the queryset isn't grouped by aggregate annotations
+    """
+    from tasks.models import Annotation
+
+    if not enabled:
+        return
+    annotations = Annotation.objects.filter(task=OuterRef('pk'))
+    if _filter.operator == Operator.CONTAINS:
+        filter_expressions.append(Exists(annotations.filter(completed_by=int(_filter.value))))
+        return 'continue'
+    elif _filter.operator == Operator.NOT_CONTAINS:
+        filter_expressions.append(~Exists(annotations.filter(completed_by=int(_filter.value))))
+        return 'continue'
+    elif _filter.operator == Operator.EMPTY:
+        if cast_bool_from_str(_filter.value):
+            q = Exists(annotations.filter(completed_by__isnull=True)) | ~Exists(annotations)
+        else:
+            q = Exists(annotations.filter(completed_by__isnull=False))
+        filter_expressions.append(q)
+        return 'continue'
+
+
 def apply_filters(queryset, filters, project, request):
     if not filters:
         return queryset
@@ -266,6 +400,8 @@ def apply_filters(queryset, filters, project, request):
     # convert conjunction to orm statement
     filter_expressions = []
     custom_filter_expressions = load_func(settings.DATA_MANAGER_CUSTOM_FILTER_EXPRESSIONS)
+    preprocess_field_name = load_func(settings.PREPROCESS_FIELD_NAME)
+    preprocess_filter = load_func(settings.DATA_MANAGER_PREPROCESS_FILTER)
 
     for _filter in filters.items:
 
@@ -274,11 +410,9 @@ def apply_filters(queryset, filters, project, request):
             continue
 
         # django orm loop expression attached to column name
-        preprocess_field_name = load_func(settings.PREPROCESS_FIELD_NAME)
         field_name, _ = preprocess_field_name(_filter.filter, project.only_undefined_field)
 
         # filter pre-processing, value type conversion, etc..
-        preprocess_filter = load_func(settings.DATA_MANAGER_PREPROCESS_FILTER)
         _filter = preprocess_filter(_filter, field_name)
 
         # custom expressions for enterprise
@@ -288,7 +422,7 @@ def apply_filters(queryset, filters, project, request):
             continue
 
         # annotators
-        result = add_user_filter(field_name == 'annotators', 'annotations__completed_by', _filter, filter_expressions)
+        result = add_annotators_filter(field_name == 'annotators', _filter, filter_expressions)
         if result == 'continue':
             continue
 
@@ -361,9 +495,7 @@ def apply_filters(queryset, filters, project, request):
             _filter.value = 0
 
         # get type of annotated field
-        value_type = 'str'
-        if queryset.exists():
-            value_type = type(queryset.values_list(field_name, flat=True)[0]).__name__
+        value_type = get_field_value_type(queryset, field_name, project)
 
         if (value_type == 'list' or value_type == 'tuple') and 'equal' in _filter.operator:
             raise Exception('Not supported filter type')
@@ -470,10 +602,11 @@ def apply_filters(queryset, filters, project, request):
 
 
 class TaskQuerySet(models.QuerySet):
-    def prepared(self, prepare_params=None):
+    def prepared(self, prepare_params=None, project=None):
         """Apply filters, ordering and selected items to queryset
 
         :param prepare_params: prepare params with project, filters, orderings, etc
+        :param project: project instance of prepare_params.project if it's loaded already
         :return: ordered and filtered queryset
         """
         from projects.models import Project
@@ -483,7 +616,8 @@ class TaskQuerySet(models.QuerySet):
         if prepare_params is None:
             return queryset
 
-        project = Project.objects.get(pk=prepare_params.project)
+        if project is None:
+            project = Project.objects.get(pk=prepare_params.project)
         request = prepare_params.request
         queryset = apply_filters(queryset, prepare_params.filters, project, request)
         queryset = apply_ordering(queryset, prepare_params.ordering, project, request, view_data=prepare_params.data)
@@ -501,6 +635,34 @@ class TaskQuerySet(models.QuerySet):
 
         return queryset
 
+    def exclude_locked(self, user, project):
+        """Exclude tasks that Task.has_lock(user) considers locked, in one SQL statement for the whole queryset:
+        non-expired locks of other users plus counted annotations must be less than the task overlap.
+
+        With the agreement threshold of LSE projects the overlap depends on the task agreement,
+        which isn't available in SQL. Then only tasks locked for any agreement are excluded:
+        takes reach the overlap plus max_additional_annotators_assignable, or reach the overlap while
+        other users hold locks. Task.has_lock() decides for the rest when next_task locks the candidate.
+
+        :param user: user who is looking for a task
+        :param project: project of the tasks, its skip queue mode defines which annotations are counted
+        :return: queryset without locked tasks
+        """
+        from tasks.models import Annotation, TaskLock
+
+        exclude_q = self.model(project=project).get_lock_exclude_query(user)
+        locks = TaskLock.objects.filter(task=OuterRef('pk'), expire_at__gt=now()).exclude(user=user).values('id')
+        annotations = Annotation.objects.filter(task=OuterRef('pk')).exclude(exclude_q).values('id')
+        queryset = self.alias(lock_takes=SQCount(locks) + SQCount(annotations))
+
+        lse_project = getattr(project, 'lse_project', None)
+        if lse_project and lse_project.agreement_threshold is not None:
+            max_additional = lse_project.max_additional_annotators_assignable or 0
+            return queryset.alias(other_locks=SQCount(locks)).exclude(
+                Q(lock_takes__gte=F('overlap') + max_additional) | Q(other_locks__gt=0, lock_takes__gte=F('overlap'))
+            )
+        return queryset.filter(lock_takes__lt=F('overlap'))
+
 
 class GroupConcat(Aggregate):
     function = 'GROUP_CONCAT'
@@ -518,8 +680,14 @@ def newest_annotation_subquery() -> Subquery:
     return Subquery(newest_annotations.values('created_at'))
 
 
+def newest_annotation_created_at(queryset: TaskQuerySet):
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return F('aggregates__last_annotation_created_at')
+    return newest_annotation_subquery()
+
+
 def base_annotate_completed_at(queryset: TaskQuerySet) -> TaskQuerySet:
-    return queryset.annotate(completed_at=Case(When(is_labeled=True, then=newest_annotation_subquery())))
+    return queryset.annotate(completed_at=Case(When(is_labeled=True, then=newest_annotation_created_at(queryset))))
 
 
 def annotate_completed_at(queryset: TaskQuerySet) -> TaskQuerySet:
@@ -564,6 +732,8 @@ def annotated_completed_at_considering_agreement_threshold(queryset):
         # This project doesn't use task_agreement so don't consider it when determining completed_at
         return base_annotate_completed_at(queryset)
 
+    # agreement threshold is a project setting, it can change without changes in the view
+    view_plan_cache.mark_uncacheable('completed at depends on agreement threshold')
     queryset = get_tasks_agreement_queryset(queryset)
     max_additional_annotators_assignable = lse_project['max_additional_annotators_assignable']
 
@@ -575,7 +745,7 @@ def annotated_completed_at_considering_agreement_threshold(queryset):
                 Q(_agreement__gte=agreement_threshold)
                 | Q(annotation_count__gte=(F('overlap') + max_additional_annotators_assignable))
             ),
-            then=newest_annotation_subquery(),
+            then=newest_annotation_created_at(queryset),
         ),
         default=Value(None),
         output_field=DateTimeField(),
@@ -616,6 +786,8 @@ def annotate_predictions_results(queryset):
 
 
 def annotate_annotators(queryset):
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return queryset.annotate(annotators=F('aggregates__annotators'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             annotators=Coalesce(GroupConcat('annotations__completed_by'), Value(''), output_field=models.CharField())
@@ -625,15 +797,17 @@ def annotate_annotators(queryset):
 
 
 def annotate_predictions_score(queryset):
-    first_task = queryset.first()
-    if not first_task:
+    # model versions of the project can change without changes in the view
+    view_plan_cache.mark_uncacheable('predictions score depends on model versions')
+    project = getattr(queryset, 'project', None)
+    first_task = queryset.first() if project is None else None
+    if project is None and not first_task:
         return queryset
+    project = project or first_task.project
 
     # new approach with each ML backend contains it's version
-    if flag_set('ff_front_dev_1682_model_version_dropdown_070622_short', first_task.project.organization.created_by):
-        model_versions = list(
-            first_task.project.ml_backends.filter(project=first_task.project).values_list('model_version', flat=True)
-        )
+    if flag_set('ff_front_dev_1682_model_version_dropdown_070622_short', project.organization.created_by):
+        model_versions = list(project.ml_backends.filter(project=project).values_list('model_version', flat=True))
         if len(model_versions) == 0:
             return queryset.annotate(predictions_score=Avg('predictions__score'))
 
@@ -642,7 +816,7 @@ def annotate_predictions_score(queryset):
                 predictions_score=Avg('predictions__score', filter=Q(predictions__model_version__in=model_versions))
             )
     else:
-        model_version = first_task.project.model_version
+        model_version = project.model_version
         if model_version is None:
             return queryset.annotate(predictions_score=Avg('predictions__score'))
         else:
@@ -652,6 +826,8 @@ def annotate_predictions_score(queryset):
 
 
 def annotate_annotations_ids(queryset):
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return queryset.annotate(annotations_ids=F('aggregates__annotations_ids'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(annotations_ids=GroupConcat('annotations__id', output_field=models.CharField()))
     else:
@@ -659,6 +835,8 @@ def annotate_annotations_ids(queryset):
 
 
 def annotate_predictions_model_versions(queryset):
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return queryset.annotate(predictions_model_versions=F('aggregates__predictions_model_versions'))
     if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
         return queryset.annotate(
             predictions_model_versions=GroupConcat('predictions__model_version', output_field=models.CharField())
@@ -668,12 +846,16 @@ def annotate_predictions_model_versions(queryset):
 
 
 def annotate_avg_lead_time(queryset):
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return queryset.annotate(avg_lead_time=F('aggregates__avg_lead_time'))
     return queryset.annotate(avg_lead_time=Avg('annotations__lead_time'))
 
 
 def annotate_draft_exists(queryset):
     from tasks.models import AnnotationDraft
 
+    if task_aggregates_ready(getattr(queryset, 'project', None)):
+        return queryset.annotate(draft_exists=Coalesce(F('aggregates__draft_exists'), Value(False)))
     return queryset.annotate(draft_exists=Exists(AnnotationDraft.objects.filter(task=OuterRef('pk'))))
 
 
@@ -710,14 +892,15 @@ def update_annotation_map(obj):
 
 class PreparedTaskManager(models.Manager):
     @staticmethod
-    def annotate_queryset(queryset, fields_for_evaluation=None, all_fields=False, request=None):
+    def annotate_queryset(queryset, fields_for_evaluation=None, all_fields=False, request=None, project=None):
         annotations_map = get_annotations_map()
 
         if fields_for_evaluation is None:
             fields_for_evaluation = []
 
-        first_task = queryset.first()
-        project = None if first_task is None else first_task.project
+        if project is None:
+            first_task = queryset.first()
+            project = None if first_task is None else first_task.project
 
         # db annotations applied only if we need them in ordering or filters
         for field in annotations_map.keys():
@@ -746,13 +929,36 @@ class PreparedTaskManager(models.Manager):
         )
 
     def only_filtered(self, prepare_params=None):
+        """Tasks of the project with filters, ordering and selected items applied,
+        the compiled query is reused for the same view, user, label config and data columns
+        """
+        from projects.models import Project
+
         request = prepare_params.request
-        queryset = TaskQuerySet(self.model).filter(project=prepare_params.project)
-        fields_for_filter_ordering = get_fields_for_filter_ordering(prepare_params)
-        queryset = self.annotate_queryset(queryset, fields_for_evaluation=fields_for_filter_ordering, request=request)
-        return queryset.prepared(prepare_params=prepare_params)
+        project = Project.objects.get(pk=prepare_params.project)
+        key = view_plan_cache.make_key(project, prepare_params, getattr(getattr(request, 'user', None), 'id', None))
+        query = view_plan_cache.get(key, 'query')
+        if query is not None:
+            queryset = TaskQuerySet(self.model)
+            queryset.query = query.chain()
+            return queryset
+
+        with view_plan_cache.compiling() as plan:
+            queryset = TaskQuerySet(self.model).filter(project=prepare_params.project)
+            fields_for_filter_ordering = get_fields_for_filter_ordering(prepare_params)
+            queryset = self.annotate_queryset(
+                queryset, fields_for_evaluation=fields_for_filter_ordering, request=request, project=project
+            )
+            queryset = queryset.prepared(prepare_params=prepare_params, project=project)
+
+        if plan['cacheable']:
+            view_plan_cache.set(key, 'query', queryset.query.chain())
+        return queryset
 
 
 class TaskManager(models.Manager):
+    def get_queryset(self):
+        return TaskQuerySet(self.model, using=self._db)
+
     def for_user(self, user):
         return self.filter(project__organization=user.active_organization)
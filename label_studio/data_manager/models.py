@@ -1,8 +1,11 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+from data_manager.plan_cache import view_plan_cache
 from data_manager.prepare_params import PrepareParams
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
 
@@ -78,6 +81,12 @@ class View(ViewBaseModel, ProjectViewMixin):
         )
 
 
+@receiver([post_save, post_delete], sender=View)
+def invalidate_view_plans(sender, instance, **kwargs):
+    """Edited or deleted views don't match their old plans anymore, free them"""
+    view_plan_cache.invalidate_project(instance.project_id)
+
+
 class FilterGroup(models.Model):
     conjunction = models.CharField(_('conjunction'), max_length=1024, help_text='Type of conjunction')
     filters = models.ManyToManyField(
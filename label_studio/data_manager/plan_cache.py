@@ -0,0 +1,124 @@
+"""This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import ujson as json
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ViewPlanCache:
+    """Compiled data manager view plans: filtered task queries and project column sets
+
+    Plans are kept in process memory (LRU with DATA_MANAGER_VIEW_PLAN_CACHE_SIZE items).
+    Keys are built from the view filters, ordering, selected items and data, the project label config
+    and the project data columns, so edited views and changed configs never hit stale plans in any worker,
+    invalidation only frees plans of the project that can't be used anymore.
+    """
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(project, prepare_params=None, user_id=None) -> tuple:
+        """Plan key for the project, it loads project data columns, search documents and aggregates state in one query
+
+        :param project: project instance, its data column types are primed for filters compiled with it
+        :param prepare_params: filters, ordering, selected items and view data, None for project level plans
+        :param user_id: user who requests the plan, custom filters and columns can depend on it
+        """
+        from projects.models import ProjectSummary
+
+        summary = (
+            ProjectSummary.objects.filter(project_id=project.id)
+            .values(
+                'all_data_columns',
+                'common_data_columns',
+                'data_column_types',
+                'data_column_types_ready',
+                'search_documents_ready',
+                'task_aggregates_ready',
+            )
+            .first()
+            or {}
+        )
+        # column types of projects not filled by the migration job yet are unknown
+        project._data_column_types = (
+            summary.get('data_column_types_ready') and summary.get('data_column_types')
+        ) or {}
+        project._search_documents_ready = summary.get('search_documents_ready', False)
+        project._task_aggregates_ready = summary.get('task_aggregates_ready', False)
+
+        params = None
+        if prepare_params is not None:
+            params = prepare_params.model_dump(mode='json', exclude={'project', 'request'})
+        payload = json.dumps([params, project.label_config, summary], sort_keys=True)
+        return project.id, user_id, hashlib.md5(payload.encode()).hexdigest()
+
+    def get(self, key: tuple, kind: str) -> Optional[Any]:
+        if not settings.DATA_MANAGER_VIEW_PLAN_CACHE_SIZE:
+            return None
+
+        with self._lock:
+            plan = self._items.get((key, kind))
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end((key, kind))
+
+        logger.debug(f'View plan cache {"miss" if plan is None else "hit"}: {kind} for project {key[0]}')
+        return plan
+
+    def set(self, key: tuple, kind: str, plan: Any):
+        if not settings.DATA_MANAGER_VIEW_PLAN_CACHE_SIZE:
+            return
+
+        with self._lock:
+            self._items[(key, kind)] = plan
+            self._items.move_to_end((key, kind))
+            while len(self._items) > settings.DATA_MANAGER_VIEW_PLAN_CACHE_SIZE:
+                self._items.popitem(last=False)
+
+    @contextmanager
+    def compiling(self):
+        """Track the plan compiled in this block, it's cacheable until something reads task rows to build it"""
+        previous = getattr(self._local, 'plan', None)
+        plan = self._local.plan = {'cacheable': True}
+        try:
+            yield plan
+        finally:
+            self._local.plan = previous
+
+    def mark_uncacheable(self, reason: str):
+        """Query built from task rows can change with the rows, so it's not reused"""
+        plan = getattr(self._local, 'plan', None)
+        if plan is not None and plan['cacheable']:
+            plan['cacheable'] = False
+            logger.debug(f'View plan is not cacheable: {reason}')
+
+    def invalidate_project(self, project_id: int):
+        with self._lock:
+            for item_key in [item_key for item_key in self._items if item_key[0][0] == project_id]:
+                del self._items[item_key]
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._items)}
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+view_plan_cache = ViewPlanCache()
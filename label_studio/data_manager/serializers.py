@@ -1,6 +1,7 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import os
+from collections import defaultdict
 
 import ujson as json
 from data_manager.models import Filter, FilterGroup, View
@@ -9,7 +10,7 @@ from django.db import transaction
 from drf_yasg import openapi
 from projects.models import Project
 from rest_framework import serializers
-from tasks.models import Task
+from tasks.models import AnnotationDraft, Task
 from tasks.serializers import (
     AnnotationDraftSerializer,
     AnnotationSerializer,
@@ -391,8 +392,15 @@ class DataManagerTaskSerializer(TaskSerializer):
             result = [r for r in result if r is not None]
             if unique:
                 result = list(set(result))
-            result = round_floats(result)
-            output = json.dumps(result, ensure_ascii=False)[1:-1]  # remove brackets [ ]
+            # dump items one by one and stop at the char limit, the same as dumping the list without brackets [ ]
+            chunks, length = [], -1
+            for item in result:
+                if length >= self.CHAR_LIMITS:
+                    break
+                chunk = json.dumps(round_floats(item), ensure_ascii=False)
+                chunks.append(chunk)
+                length += len(chunk) + 1
+            output = ','.join(chunks)
 
         return output[: self.CHAR_LIMITS].replace(',"', ', "').replace('],[', '] [').replace('"', '')
 
@@ -454,14 +462,36 @@ class DataManagerTaskSerializer(TaskSerializer):
         if not isinstance(task, Task) or not self.context.get('drafts'):
             return []
 
-        drafts = task.drafts
-        if 'request' in self.context and hasattr(self.context['request'], 'user'):
-            user = self.context['request'].user
-            drafts = self.get_drafts_queryset(user, drafts)
+        if 'page_drafts' in self.context:
+            drafts = self.context['page_drafts'].get(task.id, [])
+        else:
+            drafts = task.drafts
+            if 'request' in self.context and hasattr(self.context['request'], 'user'):
+                user = self.context['request'].user
+                drafts = self.get_drafts_queryset(user, drafts)
 
         serializer_class = self.get_drafts_serializer()
         return serializer_class(drafts, many=True, read_only=True, default=True, context=self.context).data
 
+    @classmethod
+    def load_page(cls, tasks, context):
+        """Load per task relations of the page with one query per relation,
+        fields read them from the context instead of querying each task
+
+        :param tasks: Tasks of the page
+        :param context: Serializer context, it's updated with loaded relations
+        """
+        if context.get('drafts'):
+            drafts = AnnotationDraft.objects.filter(task_id__in=[task.id for task in tasks])
+            request = context.get('request')
+            if request is not None and hasattr(request, 'user'):
+                drafts = cls(context=context).get_drafts_queryset(request.user, drafts)
+
+            page_drafts = defaultdict(list)
+            for draft in drafts.select_related('user').order_by('id'):
+                page_drafts[draft.task_id].append(draft)
+            context['page_drafts'] = page_drafts
+
 
 class SelectedItemsSerializer(serializers.Serializer):
     all = serializers.BooleanField()
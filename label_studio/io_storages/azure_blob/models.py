@@ -99,6 +99,7 @@ class AzureBlobStorageMixin(models.Model):
 
 class AzureBlobImportStorageBase(AzureBlobStorageMixin, ImportStorage):
     url_scheme = 'azure-blob'
+    incremental_sync = True
 
     presign = models.BooleanField(_('presign'), default=True, help_text='Generate presigned URLs')
     presign_ttl = models.PositiveSmallIntegerField(
@@ -177,19 +178,22 @@ class AzureBlobImportStorage(ProjectStorageMixin, AzureBlobImportStorageBase):
 
 class AzureBlobExportStorage(AzureBlobStorageMixin, ExportStorage):  # note: order is important!
     def save_annotation(self, annotation):
-        container = self.get_container()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
         # get key that identifies this object in storage
         key = AzureBlobExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        AzureBlobExportStorageLink.create(annotation, self, content_hash=self.get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
+        container = self.get_container()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         blob = container.get_blob_client(key)
-        blob.upload_blob(json.dumps(ser_annotation), overwrite=True)
-
-        # create link if everything ok
-        AzureBlobExportStorageLink.create(annotation, self)
+        blob.upload_blob(json.dumps(data), overwrite=True)
 
 
 def async_export_annotation_to_azure_storages(annotation):
@@ -1,9 +1,12 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import base64
+import hashlib
 import json
 import logging
+import time
 import traceback as tb
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Union
 from urllib.parse import urljoin
@@ -18,14 +21,16 @@ from data_export.serializers import ExportDataSerializer
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.db import models, transaction
-from django.db.models import JSONField
+from django.db.models import F, JSONField, Prefetch
+from django.db.models.functions import Collate
 from django.shortcuts import reverse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django_rq import job
-from io_storages.utils import get_uri_via_regex
+from io_storages.utils import get_presigned_url_cache_ttl, get_uri_via_regex, presigned_url_cache
+from projects.models import ProjectCounters
 from rq.job import Job
-from tasks.models import Annotation, Task
+from tasks.models import Annotation, Prediction, Task, refresh_task_derived_data
 from tasks.serializers import AnnotationSerializer, PredictionSerializer
 from webhooks.models import WebhookAction
 from webhooks.utils import emit_webhooks_for_instance
@@ -33,6 +38,18 @@ from webhooks.utils import emit_webhooks_for_instance
 logger = logging.getLogger(__name__)
 
 
+def iter_batches(iterable, batch_size):
+    """Split iterable (e.g. keys from the storage listing) into lists of batch_size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class StorageInfo(models.Model):
     """
     StorageInfo helps to understand storage status and progress
@@ -65,6 +82,9 @@ class StorageInfo(models.Model):
     traceback = models.TextField(null=True, blank=True, help_text='Traceback report for the last failed sync')
     meta = JSONField('meta', null=True, default=dict, help_text='Meta and debug information about storage processes')
 
+    # meta keys that are kept when the next sync is queued
+    persistent_meta_keys = ('sync_watermark', 'time_last_full_sync')
+
     def info_set_job(self, job_id):
         self.last_sync_job = job_id
         self.save(update_fields=['last_sync_job'])
@@ -76,7 +96,8 @@ class StorageInfo(models.Model):
         self.status = self.Status.QUEUED
 
         # reset and init meta
-        self.meta = {'attempts': self.meta.get('attempts', 0) + 1, 'time_queued': str(timezone.now())}
+        meta = {key: self.meta[key] for key in self.persistent_meta_keys if key in self.meta}
+        self.meta = {**meta, 'attempts': self.meta.get('attempts', 0) + 1, 'time_queued': str(timezone.now())}
 
         self.save(update_fields=['last_sync_job', 'last_sync', 'last_sync_count', 'status', 'meta'])
 
@@ -223,15 +244,70 @@ class Storage(StorageInfo):
 
 
 class ImportStorage(Storage):
+    # upper limit for concurrent get_data() calls during sync, None means STORAGE_SYNC_MAX_WORKERS
+    sync_max_workers = None
+    # iterkeys() lists keys in lexicographic order, so sync can continue from the last seen key
+    incremental_sync = False
+
     def iterkeys(self):
         return iter(())
 
+    def iter_new_keys(self, start_after):
+        """Iterate keys that sort after start_after, override it if the storage can start listing from a key"""
+        return (key for key in self.iterkeys() if key > start_after)
+
+    def get_sync_scope(self):
+        """Storage settings that define the listing, the watermark is valid only while they stay the same"""
+        fields = ('bucket', 'container', 'path', 'prefix', 'regex_filter', 'recursive_scan')
+        return json.dumps({field: getattr(self, field) for field in fields if hasattr(self, field)}, sort_keys=True)
+
+    def get_sync_start_after(self):
+        """Return the watermark key to continue listing from, None means the full listing is required"""
+        if not (settings.STORAGE_INCREMENTAL_SYNC and self.incremental_sync):
+            return None
+
+        watermark = self.meta.get('sync_watermark')
+        if not watermark or watermark.get('scope') != self.get_sync_scope():
+            return None
+
+        # periodic full sync picks up keys added before the watermark and finds deleted objects
+        time_last_full_sync = self.meta.get('time_last_full_sync')
+        if not time_last_full_sync:
+            return None
+        delta = (timezone.now() - datetime.fromisoformat(time_last_full_sync)).total_seconds()
+        if delta > settings.STORAGE_FULL_SYNC_INTERVAL:
+            return None
+
+        return watermark['key']
+
     def get_data(self, key):
         raise NotImplementedError
 
     def generate_http_url(self, url):
         raise NotImplementedError
 
+    def generate_http_url_cached(self, url):
+        """Generate presigned URL or reuse the cached one until it's close to expiration
+
+        :return: (http_url, max_age) where max_age is the number of seconds the URL can be reused
+        """
+        presign_ttl = getattr(self, 'presign_ttl', None)
+        ttl = get_presigned_url_cache_ttl(presign_ttl) if presign_ttl else 0
+        # storages without presign TTL and unsaved storages (e.g. default S3 storage) are not cached
+        if not ttl or not settings.STORAGE_PRESIGNED_URL_CACHE or self.id is None:
+            return self.generate_http_url(url), ttl
+
+        key = presigned_url_cache.make_key(self, url)
+        cached = presigned_url_cache.get(key)
+        if cached:
+            http_url, expires_at = cached
+            return http_url, max(int(expires_at - time.time()), 0)
+
+        http_url = self.generate_http_url(url)
+        if http_url:
+            presigned_url_cache.set(key, http_url, ttl)
+        return http_url, ttl
+
     def can_resolve_url(self, url: Union[str, None]) -> bool:
         return self.can_resolve_scheme(url)
 
@@ -280,7 +356,7 @@ class ImportStorage(Storage):
                     return uri.replace(extracted_uri, proxy_url)
                 else:
                     # resolve uri to url using storages
-                    http_url = self.generate_http_url(extracted_uri)
+                    http_url, _max_age = self.generate_http_url_cached(extracted_uri)
 
                 return uri.replace(extracted_uri, http_url)
             except Exception:
@@ -298,8 +374,9 @@ class ImportStorage(Storage):
 
         raise NotImplementedError
 
-    @classmethod
-    def add_task(cls, data, project, maximum_annotations, max_inner_id, storage, key, link_class):
+    @staticmethod
+    def _parse_task_data(data):
+        """Split storage object into task data, annotations and predictions"""
         # predictions
         predictions = data.get('predictions', [])
         if predictions:
@@ -321,6 +398,12 @@ class ImportStorage(Storage):
         if 'data' in data and isinstance(data['data'], dict):
             data = data['data']
 
+        return data, annotations, predictions, cancelled_annotations
+
+    @classmethod
+    def add_task(cls, data, project, maximum_annotations, max_inner_id, storage, key, link_class):
+        data, annotations, predictions, cancelled_annotations = cls._parse_task_data(data)
+
         with transaction.atomic():
             task = Task.objects.create(
                 data=data,
@@ -360,8 +443,124 @@ class ImportStorage(Storage):
         return task
         # FIXME: add_annotation_history / post_process_annotations should be here
 
+    @classmethod
+    def add_tasks(cls, items, project, maximum_annotations, max_inner_id, storage, link_class):
+        """Bulk version of add_task for a batch of storage objects
+
+        :param items: list of (key, data) pairs, inner_id is assigned in the same order starting from max_inner_id
+        :return: list of created tasks
+        """
+        parsed = [cls._parse_task_data(data) for _key, data in items]
+        raise_exception = not flag_set(
+            'ff_fix_back_dev_3342_storage_scan_with_invalid_annotations', user=AnonymousUser()
+        )
+
+        with transaction.atomic():
+            db_tasks = []
+            for i, (data, annotations, predictions, cancelled_annotations) in enumerate(parsed):
+                db_tasks.append(
+                    Task(
+                        data=data,
+                        project=project,
+                        overlap=maximum_annotations,
+                        is_labeled=len(annotations) >= maximum_annotations,
+                        total_predictions=len(predictions),
+                        total_annotations=len(annotations) - cancelled_annotations,
+                        cancelled_annotations=cancelled_annotations,
+                        inner_id=max_inner_id + i,
+                    )
+                )
+
+            # get task ids
+            if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE:
+                last_task = Task.objects.order_by('-id').only('id').first()
+                current_id = (last_task.id + 1) if last_task else 1
+                for task in db_tasks:
+                    task.id = current_id
+                    current_id += 1
+            db_tasks = Task.objects.bulk_create(db_tasks, batch_size=settings.BATCH_SIZE)
+
+            link_class.objects.bulk_create(
+                [
+                    link_class(task=task, key=key, storage=storage, object_exists=True)
+                    for task, (key, _data) in zip(db_tasks, items)
+                ],
+                batch_size=settings.BATCH_SIZE,
+            )
+            logger.debug(f'Create {len(db_tasks)} {storage.__class__.__name__} links')
+
+            # validate predictions and annotations per task, invalid ones are skipped as a whole like in add_task
+            db_predictions, db_annotations = [], []
+            for task, (_data, annotations, predictions, _cancelled) in zip(db_tasks, parsed):
+                for prediction in predictions:
+                    prediction['task'] = task.id
+                    prediction['project'] = project.id
+                prediction_ser = PredictionSerializer(data=predictions, many=True)
+                if prediction_ser.is_valid(raise_exception=raise_exception):
+                    for validated_data in prediction_ser.validated_data:
+                        prediction = Prediction(**validated_data)
+                        # we need to call result normalizer here since "bulk_create" doesn't call save() method
+                        prediction.result = Prediction.prepare_prediction_result(prediction.result, project)
+                        db_predictions.append(prediction)
+
+                for annotation in annotations:
+                    annotation['task'] = task.id
+                    annotation['project'] = project.id
+                annotation_ser = AnnotationSerializer(data=annotations, many=True)
+                if annotation_ser.is_valid(raise_exception=raise_exception):
+                    db_annotations += [
+                        Annotation(**validated_data) for validated_data in annotation_ser.validated_data
+                    ]
+
+            logger.debug(f'Create {len(db_predictions)} predictions and {len(db_annotations)} annotations')
+            Prediction.objects.bulk_create(db_predictions, batch_size=settings.BATCH_SIZE)
+            Annotation.objects.bulk_create(db_annotations, batch_size=settings.BATCH_SIZE)
+
+        # bulk_create skips post_save signals, so update project summary, task search documents and aggregates
+        if hasattr(project, 'summary'):
+            project.summary.update_data_columns(db_tasks)
+            project.summary.update_created_annotations_and_labels(db_annotations)
+        if db_annotations or db_predictions:
+            refresh_task_derived_data({obj.task_id for obj in db_annotations + db_predictions})
+        return db_tasks
+
+    def get_sync_max_workers(self):
+        """Number of threads used to fetch objects from the storage during sync"""
+        if self.sync_max_workers is None:
+            return settings.STORAGE_SYNC_MAX_WORKERS
+        return min(self.sync_max_workers, settings.STORAGE_SYNC_MAX_WORKERS)
+
+    @staticmethod
+    def _json_load_error(key, exc):
+        logger.debug(exc, exc_info=True)
+        return ValueError(
+            f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
+            f'(images, audio, text, etc.), edit storage settings and enable '
+            f'"Treat every bucket object as a source file"'
+        )
+
+    def _get_data_for_sync(self, key):
+        logger.debug(f'{self}: found new key {key}')
+        try:
+            return self.get_data(key)
+        except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+            raise self._json_load_error(key, exc)
+
+    def get_data_batch(self, keys, executor=None):
+        """Fetch data for a page of keys in the same order, override it if the storage can read objects in bulk"""
+        if executor:
+            return list(executor.map(self._get_data_for_sync, keys))
+        return [self._get_data_for_sync(key) for key in keys]
+
     def _scan_and_create_links(self, link_class):
         """
+        Keys are processed in pages of STORAGE_SYNC_BATCH_SIZE: existing links are looked up
+        in ImportStorageLinkKeyIndex, new objects are fetched on a thread pool (map keeps the listing order,
+        so inner_id stays deterministic) and tasks are created with bulk inserts.
+
+        With STORAGE_INCREMENTAL_SYNC only keys after the last seen key are listed,
+        see get_sync_start_after() for when the full listing is done instead.
+
         TODO: deprecate this function and transform it to "pipeline" version  _scan_and_create_links_v2,
         TODO: it must be compatible with opensource, so old version is needed as well
         """
@@ -372,52 +571,81 @@ class ImportStorage(Storage):
         maximum_annotations = self.project.maximum_annotations
         task = self.project.tasks.order_by('-inner_id').first()
         max_inner_id = (task.inner_id + 1) if task else 1
+        max_workers = self.get_sync_max_workers()
 
-        tasks_for_webhook = []
-        for key in self.iterkeys():
-            # w/o Dataflow
-            # pubsub.push(topic, key)
-            # -> GF.pull(topic, key) + env -> add_task()
-            logger.debug(f'Scanning key {key}')
-            self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
-
-            # skip if task already exists
-            if link_class.exists(key, self):
-                logger.debug(f'{self.__class__.__name__} link {key} already exists')
-                tasks_existed += 1  # update progress counter
-                continue
-
-            logger.debug(f'{self}: found new key {key}')
-            try:
-                data = self.get_data(key)
-            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
-                logger.debug(exc, exc_info=True)
-                raise ValueError(
-                    f'Error loading JSON from file "{key}".\nIf you\'re trying to import non-JSON data '
-                    f'(images, audio, text, etc.), edit storage settings and enable '
-                    f'"Treat every bucket object as a source file"'
-                )
-
-            task = self.add_task(data, self.project, maximum_annotations, max_inner_id, self, key, link_class)
-            max_inner_id += 1
-
-            # update progress counters for storage info
-            tasks_created += 1
+        start_after = self.get_sync_start_after()
+        full_sync = start_after is None
+        if full_sync:
+            all_keys = self.iterkeys()
+        else:
+            logger.info(f'{self}: incremental sync of keys after {start_after}')
+            all_keys = self.iter_new_keys(start_after)
+        key_index = ImportStorageLinkKeyIndex(link_class, self, start_after=start_after)
+        # deleted objects can be found only when the full listing is compared with all links
+        if full_sync and settings.STORAGE_INCREMENTAL_SYNC and self.incremental_sync:
+            key_index.reconcile()
+        watermark = start_after
 
-            # add task to webhook list
-            tasks_for_webhook.append(task)
+        tasks_for_webhook = []
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            for keys in iter_batches(all_keys, settings.STORAGE_SYNC_BATCH_SIZE):
+                logger.debug(f'Scanning {len(keys)} keys starting from {keys[0]}')
+                self.info_update_progress(last_sync_count=tasks_created, tasks_existed=tasks_existed)
+                watermark = max(keys) if watermark is None else max(watermark, *keys)
+
+                # skip keys if tasks already exist
+                existing_keys = key_index.existing_keys(keys)
+                new_keys = {}
+                for key in keys:
+                    if key in existing_keys:
+                        logger.debug(f'{self.__class__.__name__} link {key} already exists')
+                        tasks_existed += 1  # update progress counter
+                    else:
+                        new_keys[key] = None
+                new_keys = list(new_keys)
+                if not new_keys:
+                    continue
+
+                items = []
+                for key, data in zip(new_keys, self.get_data_batch(new_keys, executor)):
+                    if data is None:
+                        # object was removed after listing
+                        logger.debug(f'{self}: no data found for key {key}')
+                        continue
+                    items.append((key, data))
+                if not items:
+                    continue
+
+                tasks = self.add_tasks(items, self.project, maximum_annotations, max_inner_id, self, link_class)
+                max_inner_id += len(tasks)
+
+                # update progress counters for storage info
+                tasks_created += len(tasks)
+
+                # add tasks to webhook list
+                tasks_for_webhook += tasks
+
+                # settings.WEBHOOK_BATCH_SIZE
+                # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
+                # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
+                # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
+                # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
+                # call to ensure all tasks are processed and no task is left unreported in the webhook.
+                while len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
+                    emit_webhooks_for_instance(
+                        self.project.organization,
+                        self.project,
+                        WebhookAction.TASKS_CREATED,
+                        tasks_for_webhook[: settings.WEBHOOK_BATCH_SIZE],
+                    )
+                    tasks_for_webhook = tasks_for_webhook[settings.WEBHOOK_BATCH_SIZE :]
+            links_missing = key_index.finish()
+        finally:
+            key_index.close()
+            if executor:
+                executor.shutdown(wait=True)
 
-            # settings.WEBHOOK_BATCH_SIZE
-            # `WEBHOOK_BATCH_SIZE` sets the maximum number of tasks sent in a single webhook call, ensuring manageable payload sizes.
-            # When `tasks_for_webhook` accumulates tasks equal to/exceeding `WEBHOOK_BATCH_SIZE`, they're sent in a webhook via
-            # `emit_webhooks_for_instance`, and `tasks_for_webhook` is cleared for new tasks.
-            # If tasks remain in `tasks_for_webhook` at process end (less than `WEBHOOK_BATCH_SIZE`), they're sent in a final webhook
-            # call to ensure all tasks are processed and no task is left unreported in the webhook.
-            if len(tasks_for_webhook) >= settings.WEBHOOK_BATCH_SIZE:
-                emit_webhooks_for_instance(
-                    self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
-                )
-                tasks_for_webhook = []
         if tasks_for_webhook:
             emit_webhooks_for_instance(
                 self.project.organization, self.project, WebhookAction.TASKS_CREATED, tasks_for_webhook
@@ -426,9 +654,20 @@ class ImportStorage(Storage):
         self.project.update_tasks_states(
             maximum_annotations_changed=False, overlap_cohort_percentage_changed=False, tasks_number_changed=True
         )
+        if tasks_created:
+            ProjectCounters.recalculate_on_commit(self.project.id)
+
+        meta = {'tasks_existed': tasks_existed, 'full_sync': full_sync}
+        if self.incremental_sync:
+            if watermark is not None:
+                meta['sync_watermark'] = {'key': watermark, 'scope': self.get_sync_scope()}
+            if full_sync:
+                meta['time_last_full_sync'] = self.meta['time_in_progress']
+        if links_missing is not None:
+            meta['links_missing'] = links_missing
 
         # sync is finished, set completed status for storage info
-        self.info_set_completed(last_sync_count=tasks_created, tasks_existed=tasks_existed)
+        self.info_set_completed(last_sync_count=tasks_created, **meta)
 
     def scan_and_create_links(self):
         """This is proto method - you can override it, or just replace ImportStorageLink by your own model"""
@@ -521,16 +760,22 @@ def storage_background_failure(*args, **kwargs):
 
 
 class ExportStorage(Storage, ProjectStorageMixin):
+    # upper limit for concurrent save_object() calls during sync, None means STORAGE_EXPORT_MAX_WORKERS
+    export_max_workers = None
+
     can_delete_objects = models.BooleanField(
         _('can_delete_objects'), null=True, blank=True, help_text='Deletion from storage enabled'
     )
 
-    def _get_serialized_data(self, annotation):
+    def _save_task_to_storage(self):
         user = self.project.organization.created_by
         flag = flag_set(
             'fflag_feat_optic_650_target_storage_task_format_long', user=user, override_system_default=False
         )
-        if settings.FUTURE_SAVE_TASK_TO_STORAGE or flag:
+        return settings.FUTURE_SAVE_TASK_TO_STORAGE or flag
+
+    def _get_serialized_data(self, annotation):
+        if self._save_task_to_storage():
             # export task with annotations
             # TODO: we have to rewrite save_all_annotations, because this func will be called for each annotation
             # TODO: instead of each task, however, we have to call it only once per task
@@ -542,26 +787,147 @@ class ExportStorage(Storage, ProjectStorageMixin):
             # deprecated functionality - save only annotation
             return serializer_class(annotation, context={'project': self.project}).data
 
+    @staticmethod
+    def get_content_hash(data):
+        """Hash of serialized object, used to skip uploading of unchanged objects"""
+        return hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
     def save_annotation(self, annotation):
         raise NotImplementedError
 
+    def save_object(self, key, data):
+        """Put serialized data into the storage under the key from ExportStorageLink.get_key()"""
+        raise NotImplementedError
+
+    def save_objects(self, objects, executor=None, **kwargs):
+        """Put a chunk of (key, data) objects into the storage, override it if the storage can write in bulk"""
+        if executor:
+            # consume the iterator to get exceptions from workers
+            list(executor.map(lambda item: self.save_object(*item, **kwargs), objects))
+        else:
+            for key, data in objects:
+                self.save_object(key, data, **kwargs)
+
+    def get_export_max_workers(self):
+        """Number of threads used to upload objects to the storage during sync"""
+        if self.export_max_workers is None:
+            return settings.STORAGE_EXPORT_MAX_WORKERS
+        return min(self.export_max_workers, settings.STORAGE_EXPORT_MAX_WORKERS)
+
+    def _iter_export_chunks(self, annotations, link_class):
+        """Yield chunks of (key, data, annotations) objects: one object per task or per annotation"""
+        chunk_size = settings.STORAGE_EXPORT_CHUNK_SIZE
+        if self._save_task_to_storage():
+            # the whole task is saved, so serialize it once for all its annotations
+            task_ids = annotations.order_by('task_id').values_list('task_id', flat=True).distinct()
+            for ids in iter_batches(task_ids.iterator(chunk_size=chunk_size), chunk_size):
+                tasks = (
+                    Task.objects.filter(id__in=ids)
+                    .select_related('file_upload')
+                    .prefetch_related(
+                        Prefetch('annotations', queryset=Annotation.objects.select_related('completed_by')),
+                        'predictions',
+                        'drafts',
+                        'comment_authors',
+                    )
+                )
+                chunk = []
+                for task in tasks:
+                    task_annotations = list(task.annotations.all())
+                    for annotation in task_annotations:
+                        annotation.cached_user = self.cached_user
+                    annotation = task_annotations[0]
+                    chunk.append(
+                        (link_class.get_key(annotation), self._get_serialized_data(annotation), task_annotations)
+                    )
+                yield chunk
+        else:
+            queryset = annotations.select_related('task', 'completed_by').order_by('id')
+            for chunk_annotations in iter_batches(queryset.iterator(chunk_size=chunk_size), chunk_size):
+                chunk = []
+                for annotation in chunk_annotations:
+                    annotation.cached_user = self.cached_user
+                    chunk.append((link_class.get_key(annotation), self._get_serialized_data(annotation), [annotation]))
+                yield chunk
+
+    def _save_export_links(self, link_class, links, saved_objects):
+        """Create or update links for saved objects in bulk"""
+        now = timezone.now()
+        new_links, updated_links = [], []
+        for *_object, annotations, content_hash in saved_objects:
+            for annotation in annotations:
+                link = links.get(annotation.id)
+                if link is None:
+                    new_links.append(
+                        link_class(annotation=annotation, storage=self, object_exists=True, content_hash=content_hash)
+                    )
+                else:
+                    link.object_exists = True
+                    link.content_hash = content_hash
+                    link.updated_at = now
+                    updated_links.append(link)
+        link_class.objects.bulk_create(new_links, batch_size=settings.BATCH_SIZE)
+        link_class.objects.bulk_update(
+            updated_links, ['object_exists', 'content_hash', 'updated_at'], batch_size=settings.BATCH_SIZE
+        )
+
     def save_all_annotations(self):
-        annotation_exported = 0
-        total_annotations = Annotation.objects.filter(project=self.project).count()
+        """Export all project annotations in chunks
+
+        Objects are serialized once per chunk with prefetched relations, uploaded on a thread pool,
+        and links are saved in bulk. Objects with the same content hash as in the last sync are skipped.
+        """
+        link_class = self.links.model
+        annotations = Annotation.objects.filter(project=self.project)
+        annotation_exported = objects_saved = objects_skipped = 0
+        total_annotations = annotations.count()
         self.info_set_in_progress()
         self.cached_user = self.project.organization.created_by
 
-        for annotation in Annotation.objects.filter(project=self.project).iterator(
-            chunk_size=settings.STORAGE_EXPORT_CHUNK_SIZE
-        ):
-            annotation.cached_user = self.cached_user
-            self.save_annotation(annotation)
-
-            # update progress counters
-            annotation_exported += 1
-            self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
-
-        self.info_set_completed(last_sync_count=annotation_exported, total_annotations=total_annotations)
+        max_workers = self.get_export_max_workers()
+        executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            for chunk in self._iter_export_chunks(annotations, link_class):
+                annotation_ids = [
+                    annotation.id for _, _, chunk_annotations in chunk for annotation in chunk_annotations
+                ]
+                links = {
+                    link.annotation_id: link
+                    for link in link_class.objects.filter(storage=self, annotation_id__in=annotation_ids)
+                }
+
+                changed_objects = []
+                for key, data, chunk_annotations in chunk:
+                    content_hash = self.get_content_hash(data)
+                    if all(
+                        annotation.id in links
+                        and links[annotation.id].object_exists
+                        and links[annotation.id].content_hash == content_hash
+                        for annotation in chunk_annotations
+                    ):
+                        logger.debug(f'{self}: object {key} is not changed, skip it')
+                        objects_skipped += 1
+                        continue
+                    changed_objects.append((key, data, chunk_annotations, content_hash))
+
+                if changed_objects:
+                    self.save_objects([(key, data) for key, data, _, _ in changed_objects], executor)
+                    self._save_export_links(link_class, links, changed_objects)
+                    objects_saved += len(changed_objects)
+
+                # update progress counters
+                annotation_exported += len(annotation_ids)
+                self.info_update_progress(last_sync_count=annotation_exported, total_annotations=total_annotations)
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+        self.info_set_completed(
+            last_sync_count=annotation_exported,
+            total_annotations=total_annotations,
+            objects_saved=objects_saved,
+            objects_skipped=objects_skipped,
+        )
 
     def sync(self):
         if redis_connected():
@@ -601,7 +967,27 @@ class ImportStorageLink(models.Model):
 
     @classmethod
     def exists(cls, key, storage):
-        return cls.objects.filter(key=key, storage=storage.id).exists()
+        return cls.objects.filter(key__in=cls.key_variants(key, storage), storage=storage.id).exists()
+
+    @classmethod
+    def key_variants(cls, key, storage):
+        """Keys under which a link to the storage object might have been saved"""
+        return (key,)
+
+    @classmethod
+    def existing_keys(cls, keys, storage):
+        """Return the subset of keys that already have links in this storage, using a single query"""
+        return {key for found_keys in cls.found_key_variants(keys, storage).values() for key in found_keys}
+
+    @classmethod
+    def found_key_variants(cls, keys, storage):
+        """Find links of the keys under all key variants with a single query, return {link key: keys}"""
+        candidates = {}
+        for key in keys:
+            for variant in cls.key_variants(key, storage):
+                candidates.setdefault(variant, set()).add(key)
+        found = cls.objects.filter(key__in=list(candidates), storage=storage.id).values_list('key', flat=True)
+        return {variant: candidates[variant] for variant in found}
 
     @classmethod
     def create(cls, task, key, storage):
@@ -612,6 +998,122 @@ class ImportStorageLink(models.Model):
         abstract = True
 
 
+class ImportStorageLinkKeyIndex:
+    """Sync-scoped index of keys that already have links in the storage
+
+    Storages listing keys in lexicographic order (incremental_sync) are merged against link keys streamed
+    from the database in the same order, so membership checks don't query the database per page
+    and memory is bounded by the chunk size of the stream whatever the number of links is.
+    Keys of other storages are checked with one query per page.
+
+    With reconcile() the merge of the full listing also finds links to deleted objects: links passed by the stream
+    without a listed key are marked with object_exists=False, links of listed keys get object_exists=True back.
+    """
+
+    def __init__(self, link_class, storage, start_after=None):
+        self.link_class = link_class
+        self.storage = storage
+        self.start_after = start_after
+        self.merged = storage.incremental_sync
+        # links saved under other key variants (old key formats) don't follow the listing order
+        self.has_key_variants = len(link_class.key_variants('', storage)) > 1
+        self.last_key = None
+        self._links = None
+        self._link = None
+        self.reconciled = False
+        self._missing, self._restored, self._variant_links = [], [], set()
+
+    def reconcile(self):
+        """Track links to deleted objects during the merge of the full listing
+        :return: True if links are reconciled
+        """
+        self.reconciled = self.merged and self.start_after is None and self._links is None
+        return self.reconciled
+
+    def _iter_links(self):
+        links = self.link_class.objects.filter(storage=self.storage.id)
+        # keys are ordered by code points like python strings and storage listings
+        sort_key = F('key') if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE else Collate('key', 'C')
+        links = links.annotate(sort_key=sort_key).order_by('sort_key')
+        if self.start_after is not None:
+            links = links.filter(sort_key__gt=self.start_after)
+        return links.values_list('key', 'object_exists').iterator(chunk_size=settings.BATCH_SIZE)
+
+    def _advance(self, key=None):
+        """Move the link stream past the key (to the end if key is None), return True if a link with the key is found"""
+        if self._links is None:
+            self._links = self._iter_links()
+            self._link = next(self._links, None)
+        found = False
+        while self._link is not None and (key is None or self._link[0] <= key):
+            link_key, object_exists = self._link
+            if link_key == key:
+                found = True
+                if self.reconciled and not object_exists:
+                    self._restored.append(link_key)
+            elif self.reconciled and object_exists:
+                self._missing.append(link_key)
+            self._link = next(self._links, None)
+        self._flush()
+        return found
+
+    def _flush(self, force=False):
+        for buffer, object_exists in ((self._missing, False), (self._restored, True)):
+            if len(buffer) >= settings.BATCH_SIZE or (force and buffer):
+                self.link_class.objects.filter(storage=self.storage.id, key__in=buffer).update(
+                    object_exists=object_exists
+                )
+                buffer.clear()
+
+    def existing_keys(self, keys):
+        if not self.merged:
+            return self.link_class.existing_keys(keys, self.storage)
+
+        existing, not_found = set(), []
+        for key in keys:
+            if self.last_key is not None and key < self.last_key:
+                logger.warning(f'{self.storage}: keys are not listed in order, links are checked with queries')
+                if self.reconciled:
+                    logger.warning(f'{self.storage}: links to deleted objects are not reconciled')
+                self.merged = self.reconciled = False
+                self.close()
+                return self.link_class.existing_keys(keys, self.storage)
+            self.last_key = key
+            if self._advance(key):
+                existing.add(key)
+            else:
+                not_found.append(key)
+        if not_found and self.has_key_variants:
+            found = self.link_class.found_key_variants(not_found, self.storage)
+            existing.update(key for found_keys in found.values() for key in found_keys)
+            if self.reconciled:
+                # these links are passed by the stream at other positions, they are restored in finish()
+                self._variant_links.update(found)
+        return existing
+
+    def finish(self):
+        """Complete reconciliation after the full listing
+        :return: number of links to objects not found in the storage or None if links aren't reconciled
+        """
+        if not self.reconciled:
+            return None
+        self._advance()
+        self._flush(force=True)
+        links = self.link_class.objects.filter(storage=self.storage.id)
+        variant_links = list(self._variant_links)
+        for i in range(0, len(variant_links), settings.BATCH_SIZE):
+            links.filter(key__in=variant_links[i : i + settings.BATCH_SIZE]).update(object_exists=True)
+        self.close()
+        missing = links.filter(object_exists=False).count()
+        logger.info(f'{self.storage}: {missing} linked objects not found in the storage')
+        return missing
+
+    def close(self):
+        if self._links is not None:
+            self._links.close()
+            self._links = self._link = None
+
+
 class ExportStorageLink(models.Model):
 
     annotation = models.ForeignKey(
@@ -622,6 +1124,9 @@ class ExportStorageLink(models.Model):
     )
     created_at = models.DateTimeField(_('created at'), auto_now_add=True, help_text='Creation time')
     updated_at = models.DateTimeField(_('updated at'), auto_now=True, help_text='Update time')
+    content_hash = models.CharField(
+        _('content hash'), max_length=32, null=True, blank=True, help_text='MD5 hash of the saved object content'
+    )
 
     @staticmethod
     def get_key(annotation):
@@ -647,10 +1152,13 @@ class ExportStorageLink(models.Model):
         return cls.objects.filter(annotation=annotation.id, storage=storage.id).exists()
 
     @classmethod
-    def create(cls, annotation, storage):
-        link, created = cls.objects.get_or_create(annotation=annotation, storage=storage, object_exists=True)
+    def create(cls, annotation, storage, content_hash=None):
+        link, created = cls.objects.get_or_create(
+            annotation=annotation, storage=storage, object_exists=True, defaults={'content_hash': content_hash}
+        )
         if not created:
             # update updated_at field
+            link.content_hash = content_hash
             link.save()
         return link
 
@@ -64,21 +64,26 @@ class GCSStorageMixin(models.Model):
 
 class GCSImportStorageBase(GCSStorageMixin, ImportStorage):
     url_scheme = 'gs'
+    incremental_sync = True
 
     presign = models.BooleanField(_('presign'), default=True, help_text='Generate presigned URLs')
     presign_ttl = models.PositiveSmallIntegerField(
         _('presign_ttl'), default=1, help_text='Presigned URLs TTL (in minutes)'
     )
 
-    def iterkeys(self):
+    def iterkeys(self, start_after=None):
         return GCS.iter_blobs(
             client=self.get_client(),
             bucket_name=self.bucket,
             prefix=self.prefix,
             regex_filter=self.regex_filter,
             return_key=True,
+            start_after=start_after,
         )
 
+    def iter_new_keys(self, start_after):
+        return self.iterkeys(start_after=start_after)
+
     def get_data(self, key):
         if self.use_blob_urls:
             return {settings.DATA_UNDEFINED_NAME: GCS.get_uri(self.bucket, key)}
@@ -119,20 +124,23 @@ class GCSImportStorage(ProjectStorageMixin, GCSImportStorageBase):
 
 class GCSExportStorage(GCSStorageMixin, ExportStorage):
     def save_annotation(self, annotation):
-        bucket = self.get_bucket()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = GCSExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        GCSExportStorageLink.create(annotation, self, content_hash=self.get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
+        bucket = self.get_bucket()
         key = str(self.prefix) + '/' + key if self.prefix else key
 
         # put object into storage
         blob = bucket.blob(key)
-        blob.upload_from_string(json.dumps(ser_annotation))
-
-        # create link if everything ok
-        GCSExportStorageLink.create(annotation, self)
+        blob.upload_from_string(json.dumps(data))
 
 
 def async_export_annotation_to_gcs_storages(annotation):
@@ -115,6 +115,7 @@ class GCS(object):
         regex_filter: str = None,
         limit: int = None,
         return_key: bool = False,
+        start_after: str = None,
     ):
         """
         Iterate files on the bucket. Optionally return limited number of files that match provided extensions
@@ -124,16 +125,23 @@ class GCS(object):
         :param regex_filter: RegEx filter
         :param limit: specify limit for max files
         :param return_key: return object key string instead of gcs.Blob object
+        :param start_after: list only files with names lexicographically greater than this one
         :return: Iterator object
         """
         total_read = 0
-        blob_iter = client.list_blobs(bucket_name, prefix=prefix)
+        if start_after:
+            # start_offset is inclusive, the blob equal to start_after is skipped below
+            blob_iter = client.list_blobs(bucket_name, prefix=prefix, start_offset=start_after)
+        else:
+            blob_iter = client.list_blobs(bucket_name, prefix=prefix)
         prefix = str(prefix) if prefix else ''
         regex = re.compile(str(regex_filter)) if regex_filter else None
         for blob in blob_iter:
             # skip dir level
             if blob.name == (prefix.rstrip('/') + '/'):
                 continue
+            if start_after and blob.name <= start_after:
+                continue
             # check regex pattern filter
             if regex and not regex.match(blob.name):
                 logger.debug(blob.name + ' is skipped by regex filter')
@@ -115,14 +115,17 @@ class LocalFilesExportStorage(LocalFilesMixin, ExportStorage):
 
         # get key that identifies this object in storage
         key = LocalFilesExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # Create export storage link
+        LocalFilesExportStorageLink.create(annotation, self, content_hash=self.get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
         key = os.path.join(self.path, f'{key}')
 
         # put object into storage
         with open(key, mode='w') as f:
-            json.dump(ser_annotation, f, indent=2)
-
-        # Create export storage link
-        LocalFilesExportStorageLink.create(annotation, self)
+            json.dump(data, f, indent=2)
 
 
 class LocalFilesImportStorageLink(ImportStorageLink):
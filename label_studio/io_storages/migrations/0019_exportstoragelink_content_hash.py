@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('io_storages', '0018_alter_azureblobexportstorage_project_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='azureblobexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 hash of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='gcsexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 hash of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='localfilesexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 hash of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='redisexportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 hash of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+        migrations.AddField(
+            model_name='s3exportstoragelink',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='MD5 hash of the saved object content', max_length=32, null=True, verbose_name='content hash'),
+        ),
+    ]
@@ -4,6 +4,7 @@ import json
 import logging
 
 import redis
+from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -72,15 +73,19 @@ class RedisStorageMixin(models.Model):
 
 
 class RedisImportStorageBase(ImportStorage, RedisStorageMixin):
+    # objects are read with MGET per page of keys, see get_data_batch()
+    sync_max_workers = 1
+
     db = models.PositiveSmallIntegerField(_('db'), default=1, help_text='Server Database')
 
     def can_resolve_url(self, url):
         return False
 
     def iterkeys(self):
+        # SCAN doesn't block the server like KEYS does, but it can return the same key more than once
         client = self.get_client()
         path = str(self.path)
-        for key in client.keys(path + '*'):
+        for key in client.scan_iter(match=path + '*', count=settings.REDIS_STORAGE_SCAN_COUNT):
             yield key
 
     def get_data(self, key):
@@ -90,6 +95,19 @@ class RedisImportStorageBase(ImportStorage, RedisStorageMixin):
             return
         return json.loads(value)
 
+    def get_data_batch(self, keys, executor=None):
+        client = self.get_client()
+        data = []
+        for key, value in zip(keys, client.mget(keys)):
+            if not value:
+                data.append(None)
+                continue
+            try:
+                data.append(json.loads(value))
+            except (UnicodeDecodeError, json.decoder.JSONDecodeError) as exc:
+                raise self._json_load_error(key, exc)
+        return data
+
     def scan_and_create_links(self):
         return self._scan_and_create_links(RedisImportStorageLink)
 
@@ -110,19 +128,29 @@ class RedisImportStorage(ProjectStorageMixin, RedisImportStorageBase):
 class RedisExportStorage(RedisStorageMixin, ExportStorage):
     db = models.PositiveSmallIntegerField(_('db'), default=2, help_text='Server Database')
 
+    # objects are written with one MSET per chunk, see save_objects()
+    export_max_workers = 1
+
     def save_annotation(self, annotation):
-        client = self.get_client()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = RedisExportStorageLink.get_key(annotation)
+        self.save_object(key, ser_annotation)
+
+        # create link if everything ok
+        RedisExportStorageLink.create(annotation, self, content_hash=self.get_content_hash(ser_annotation))
+
+    def save_object(self, key, data):
+        client = self.get_client()
 
         # put object into storage
-        client.set(key, json.dumps(ser_annotation))
+        client.set(key, json.dumps(data))
 
-        # create link if everything ok
-        RedisExportStorageLink.create(annotation, self)
+    def save_objects(self, objects, executor=None):
+        client = self.get_client()
+        client.mset({key: json.dumps(data) for key, data in objects})
 
     def validate_connection(self, client=None):
         if client is None:
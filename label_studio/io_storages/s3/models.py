@@ -117,6 +117,7 @@ class S3StorageMixin(models.Model):
 class S3ImportStorageBase(S3StorageMixin, ImportStorage):
 
     url_scheme = 's3'
+    incremental_sync = True
 
     presign = models.BooleanField(_('presign'), default=True, help_text='Generate presigned URLs')
     presign_ttl = models.PositiveSmallIntegerField(
@@ -126,12 +127,17 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
         _('recursive scan'), default=False, help_text=_('Perform recursive scan over the bucket content')
     )
 
-    def iterkeys(self):
+    def iterkeys(self, start_after=None):
         client, bucket = self.get_client_and_bucket()
+        list_kwargs = {}
         if self.prefix:
-            list_kwargs = {'Prefix': self.prefix.rstrip('/') + '/'}
+            list_kwargs['Prefix'] = self.prefix.rstrip('/') + '/'
             if not self.recursive_scan:
                 list_kwargs['Delimiter'] = '/'
+        if start_after:
+            # S3 lists keys in lexicographic order, Marker starts the listing after the given key
+            list_kwargs['Marker'] = start_after
+        if list_kwargs:
             bucket_iter = bucket.objects.filter(**list_kwargs).all()
         else:
             bucket_iter = bucket.objects.all()
@@ -146,6 +152,9 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
                 continue
             yield key
 
+    def iter_new_keys(self, start_after):
+        return self.iterkeys(start_after=start_after)
+
     def scan_and_create_links(self):
         return self._scan_and_create_links(S3ImportStorageLink)
 
@@ -164,9 +173,9 @@ class S3ImportStorageBase(S3StorageMixin, ImportStorage):
             return {data_key: uri}
 
         # read task json from bucket and validate it
-        _, s3 = self.get_client_and_resource()
-        bucket = s3.Bucket(self.bucket)
-        obj = s3.Object(bucket.name, key).get()['Body'].read().decode('utf-8')
+        # boto3 clients are thread-safe unlike resources, get_data is called from a thread pool during sync
+        client = self.get_client()
+        obj = client.get_object(Bucket=self.bucket, Key=key)['Body'].read().decode('utf-8')
         value = json.loads(obj)
         if not isinstance(value, dict):
             raise ValueError(f'Error on key {key}: For S3 your JSON file must be a dictionary with one task')
@@ -202,15 +211,17 @@ class S3ImportStorage(ProjectStorageMixin, S3ImportStorageBase):
 
 class S3ExportStorage(S3StorageMixin, ExportStorage):
     def save_annotation(self, annotation):
-        client, s3 = self.get_client_and_resource()
         logger.debug(f'Creating new object on {self.__class__.__name__} Storage {self} for annotation {annotation}')
         ser_annotation = self._get_serialized_data(annotation)
 
         # get key that identifies this object in storage
         key = S3ExportStorageLink.get_key(annotation)
-        key = str(self.prefix) + '/' + key if self.prefix else key
+        self.save_object(key, ser_annotation)
 
-        # put object into storage
+        # create link if everything ok
+        S3ExportStorageLink.create(annotation, self, content_hash=self.get_content_hash(ser_annotation))
+
+    def get_put_params(self):
         additional_params = {}
 
         self.cached_user = getattr(self, 'cached_user', self.project.organization.created_by)
@@ -222,11 +233,21 @@ class S3ExportStorage(S3StorageMixin, ExportStorage):
                 additional_params['ServerSideEncryption'] = 'aws:kms'
             else:
                 additional_params['ServerSideEncryption'] = 'AES256'
+        return additional_params
 
-        s3.Object(self.bucket, key).put(Body=json.dumps(ser_annotation), **additional_params)
+    def save_object(self, key, data, put_params=None):
+        # boto3 clients are thread-safe in contrast to resources, export workers share the cached client
+        client = self.get_client()
+        key = str(self.prefix) + '/' + key if self.prefix else key
 
-        # create link if everything ok
-        S3ExportStorageLink.create(annotation, self)
+        # put object into storage
+        if put_params is None:
+            put_params = self.get_put_params()
+        client.put_object(Bucket=self.bucket, Key=key, Body=json.dumps(data), **put_params)
+
+    def save_objects(self, objects, executor=None):
+        # flag_set() might query the database, so resolve put params once before upload workers start
+        super().save_objects(objects, executor, put_params=self.get_put_params())
 
     def delete_annotation(self, annotation):
         client, s3 = self.get_client_and_resource()
@@ -272,15 +293,10 @@ class S3ImportStorageLink(ImportStorageLink):
     storage = models.ForeignKey(S3ImportStorage, on_delete=models.CASCADE, related_name='links')
 
     @classmethod
-    def exists(cls, key, storage):
-        storage_link_exists = super(S3ImportStorageLink, cls).exists(key, storage)
+    def key_variants(cls, key, storage):
         # TODO: this is a workaround to be compatible with old keys version - remove it later
         prefix = str(storage.prefix) or ''
-        return (
-            storage_link_exists
-            or cls.objects.filter(key=prefix + key, storage=storage.id).exists()
-            or cls.objects.filter(key=prefix + '/' + key, storage=storage.id).exists()
-        )
+        return key, prefix + key, prefix + '/' + key
 
 
 class S3ExportStorageLink(ExportStorageLink):
@@ -1,9 +1,17 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
+import json
 import logging
 import re
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Union
+from typing import Optional, Tuple, Union
+
+from core.redis import redis_get, redis_set
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
@@ -82,3 +90,67 @@ def storage_can_resolve_bucket_url(storage, url) -> bool:
         return False
 
     return True
+
+
+def get_presigned_url_cache_ttl(presign_ttl: int) -> int:
+    """Number of seconds a presigned URL can be reused: its lifetime (in minutes) minus a safety margin"""
+    return max(presign_ttl * 60 - settings.STORAGE_PRESIGNED_URL_CACHE_MARGIN, 0)
+
+
+class PresignedURLCache:
+    """Presigned URLs cached by (storage, object URI) until they are close to expiration
+
+    URLs are kept in process memory (LRU with STORAGE_PRESIGNED_URL_CACHE_MAX_SIZE items)
+    and, if STORAGE_PRESIGNED_URL_CACHE_REDIS is enabled, in redis to share them between workers.
+    """
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(storage, uri: str) -> str:
+        uri_hash = hashlib.md5(uri.encode()).hexdigest()
+        return f'storage-presign:{storage.__class__.__name__}:{storage.id}:{uri_hash}'
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Get (url, expires_at) for the key or None if there is no valid URL in the cache"""
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                if item[1] > now:
+                    self._items.move_to_end(key)
+                    return item
+                del self._items[key]
+
+        if settings.STORAGE_PRESIGNED_URL_CACHE_REDIS:
+            cached = redis_get(key)
+            if cached:
+                url, expires_at = json.loads(cached)
+                if expires_at > now:
+                    self._set_local(key, url, expires_at)
+                    return url, expires_at
+        return None
+
+    def set(self, key: str, url: str, ttl: int) -> float:
+        """Cache URL for ttl seconds and return its expiration timestamp"""
+        expires_at = time.time() + ttl
+        self._set_local(key, url, expires_at)
+        if settings.STORAGE_PRESIGNED_URL_CACHE_REDIS:
+            redis_set(key, json.dumps([url, expires_at]), ttl=ttl)
+        return expires_at
+
+    def _set_local(self, key, url, expires_at):
+        with self._lock:
+            self._items[key] = (url, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > settings.STORAGE_PRESIGNED_URL_CACHE_MAX_SIZE:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+presigned_url_cache = PresignedURLCache()
@@ -1,5 +1,5 @@
 from django.db import transaction
-from tasks.models import Annotation
+from tasks.models import Annotation, TaskSearchDocument
 
 
 def bulk_update_label(old_label, new_label, organization, project=None):
@@ -10,7 +10,7 @@ def bulk_update_label(old_label, new_label, organization, project=None):
     updated_count = 0
     with transaction.atomic():
         update_annotations = []
-        for annotation in annotations.only('result').all():
+        for annotation in annotations.only('result', 'task_id').all():
             result = annotation.result
 
             updated_result = []
@@ -31,4 +31,6 @@ def bulk_update_label(old_label, new_label, organization, project=None):
 
         if update_annotations:
             Annotation.objects.bulk_update(update_annotations, ['result'])
+            # bulk_update skips annotation signals, so search documents are rebuilt here
+            TaskSearchDocument.refresh({annotation.task_id for annotation in update_annotations})
     return updated_count
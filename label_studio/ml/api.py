@@ -10,7 +10,7 @@ from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg.utils import no_body, swagger_auto_schema
 from ml.models import MLBackend
-from ml.serializers import MLBackendSerializer, MLInteractiveAnnotatingRequest
+from ml.serializers import MLBackendPredictionJobSerializer, MLBackendSerializer, MLInteractiveAnnotatingRequest
 from projects.models import Project, Task
 from rest_framework import generics, status
 from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
@@ -415,3 +415,102 @@ class MLBackendVersionsAPI(generics.RetrieveAPIView):
             result = {'error': str(versions_response.error_message)}
             status_code = versions_response.status_code if versions_response.status_code > 0 else 500
             return Response(data=result, status=status_code)
+
+
+_prediction_job_parameters = [
+    openapi.Parameter(
+        name='id',
+        type=openapi.TYPE_INTEGER,
+        in_=openapi.IN_PATH,
+        description='A unique integer value identifying this ML backend.',
+    ),
+    openapi.Parameter(
+        name='job_pk',
+        type=openapi.TYPE_INTEGER,
+        in_=openapi.IN_PATH,
+        description='A unique integer value identifying this prediction job.',
+    ),
+]
+
+
+@method_decorator(
+    name='get',
+    decorator=swagger_auto_schema(
+        tags=['Machine Learning'],
+        x_fern_sdk_group_name='ml',
+        x_fern_sdk_method_name='list_prediction_jobs',
+        x_fern_audiences=['internal'],
+        operation_summary='List prediction jobs',
+        operation_description='List background jobs retrieving predictions from the ML backend, newest first.',
+        manual_parameters=_prediction_job_parameters[:1],
+    ),
+)
+class MLBackendPredictionJobListAPI(generics.ListAPIView):
+    serializer_class = MLBackendPredictionJobSerializer
+    permission_required = all_permissions.projects_view
+
+    def get_queryset(self):
+        ml_backend = generics.get_object_or_404(MLBackend, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, ml_backend)
+        return ml_backend.prediction_jobs.order_by('-id')
+
+
+@method_decorator(
+    name='get',
+    decorator=swagger_auto_schema(
+        tags=['Machine Learning'],
+        x_fern_sdk_group_name='ml',
+        x_fern_sdk_method_name='get_prediction_job',
+        x_fern_audiences=['internal'],
+        operation_summary='Get prediction job',
+        operation_description='Get status and progress of the background job retrieving predictions.',
+        manual_parameters=_prediction_job_parameters,
+        responses={200: MLBackendPredictionJobSerializer},
+    ),
+)
+class MLBackendPredictionJobAPI(APIView):
+
+    permission_required = all_permissions.projects_view
+
+    def get_object(self):
+        ml_backend = generics.get_object_or_404(MLBackend, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, ml_backend)
+        return generics.get_object_or_404(ml_backend.prediction_jobs, pk=self.kwargs['job_pk'])
+
+    def get(self, request, *args, **kwargs):
+        job = self.get_object()
+        return Response(MLBackendPredictionJobSerializer(job).data)
+
+
+@method_decorator(
+    name='post',
+    decorator=swagger_auto_schema(
+        tags=['Machine Learning'],
+        x_fern_sdk_group_name='ml',
+        x_fern_sdk_method_name='cancel_prediction_job',
+        x_fern_audiences=['internal'],
+        operation_summary='Cancel prediction job',
+        operation_description="""
+        Cancel the background job retrieving predictions. A running job stops after the current chunk of tasks, 
+        predictions retrieved already are kept.
+        """,
+        manual_parameters=_prediction_job_parameters,
+        request_body=no_body,
+        responses={
+            200: MLBackendPredictionJobSerializer,
+            409: openapi.Response(description='Job is finished already'),
+        },
+    ),
+)
+class MLBackendPredictionJobCancelAPI(MLBackendPredictionJobAPI):
+
+    http_method_names = ['post']
+    permission_required = all_permissions.projects_change
+
+    def post(self, request, *args, **kwargs):
+        job = self.get_object()
+        if not job.cancel():
+            return Response(
+                {'detail': f'Prediction job {job.id} is {job.status} already'}, status=status.HTTP_409_CONFLICT
+            )
+        return Response(MLBackendPredictionJobSerializer(job).data)
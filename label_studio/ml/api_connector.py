@@ -2,7 +2,9 @@
 """
 import logging
 import os
+import threading
 import urllib
+from collections import OrderedDict
 
 import requests
 from core.feature_flags import flag_set
@@ -62,6 +64,8 @@ class BaseHTTPAPI(object):
         self._basic_auth = (kwargs.get('basic_auth_user'), kwargs.get('basic_auth_pass'))
 
         self._max_retries = max_retries or self.MAX_RETRIES
+        # requests.Session isn't thread-safe: each thread of each process gets its own session
+        self._sessions_lock = threading.Lock()
         self._sessions = {self._session_key(): self.create_session()}
 
     def create_session(self):
@@ -73,17 +77,33 @@ class BaseHTTPAPI(object):
         return session
 
     def _session_key(self):
-        return os.getpid()
+        return os.getpid(), threading.get_ident()
+
+    def _drop_stale_sessions(self):
+        """Close sessions of finished threads, forget sessions inherited from the parent process"""
+        pid = os.getpid()
+        alive = {thread.ident for thread in threading.enumerate()}
+        for key in list(self._sessions):
+            session_pid, thread_id = key
+            if session_pid != pid:
+                del self._sessions[key]
+            elif thread_id not in alive:
+                self._sessions.pop(key).close()
+
+    def close(self):
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
 
     @property
     def http(self):
         key = self._session_key()
-        if key in self._sessions:
-            return self._sessions[key]
-        else:
-            session = self.create_session()
-            self._sessions[key] = session
-            return session
+        session = self._sessions.get(key)
+        if session is None:
+            with self._sessions_lock:
+                self._drop_stale_sessions()
+                session = self._sessions[key] = self.create_session()
+        return session
 
     def _prepare_kwargs(self, kwargs):
         # add timeout if it's not presented
@@ -113,13 +133,15 @@ class MLApiResult:
     Class for storing the result of ML API request
     """
 
-    def __init__(self, url='', request='', response=None, headers=None, type='ok', status_code=200):
+    def __init__(self, url='', request='', response=None, headers=None, type='ok', status_code=200, timeout=False):
         self.url = url
         self.request = request
         self.response = {} if response is None else response
         self.headers = {} if headers is None else headers
         self.type = type
         self.status_code = status_code
+        # the server didn't respond in time after the connection was established
+        self.timeout = timeout
 
     @property
     def is_error(self):
@@ -165,7 +187,15 @@ class MLApi(BaseHTTPAPI):
             else:
                 error_string = str(e)
             status_code = response.status_code if response is not None else 0
-            return MLApiResult(url, request, {'error': error_string}, headers, 'error', status_code=status_code)
+            return MLApiResult(
+                url,
+                request,
+                {'error': error_string},
+                headers,
+                'error',
+                status_code=status_code,
+                timeout=isinstance(e, requests.exceptions.ReadTimeout),
+            )
         status_code = response.status_code
         try:
             response = response.json()
@@ -270,12 +300,52 @@ class MLApi(BaseHTTPAPI):
         )
 
 
+_ml_api_pool = OrderedDict()
+_ml_api_pool_lock = threading.Lock()
+
+
+def get_pooled_ml_api(url, timeout=None, auth_method=None, basic_auth_user=None, basic_auth_pass=None):
+    """
+    MLApi client shared in the process by all requests to the same ML backend url, auth and timeout,
+    its sessions keep connections to the backend alive between requests, one session per thread
+    Pool is LRU with ML_API_CLIENT_POOL_SIZE clients, 0 disables it
+    """
+    if not settings.ML_API_CLIENT_POOL_SIZE:
+        return MLApi(
+            url=url,
+            timeout=timeout,
+            auth_method=auth_method,
+            basic_auth_user=basic_auth_user,
+            basic_auth_pass=basic_auth_pass,
+        )
+
+    key = (url, timeout, auth_method, basic_auth_user, basic_auth_pass)
+    with _ml_api_pool_lock:
+        api = _ml_api_pool.get(key)
+        if api is None:
+            api = _ml_api_pool[key] = MLApi(
+                url=url,
+                timeout=timeout,
+                auth_method=auth_method,
+                basic_auth_user=basic_auth_user,
+                basic_auth_pass=basic_auth_pass,
+            )
+            # evicted clients can be still in use by other threads: closing drops their idle connections,
+            # requests in flight finish and later requests of these threads open new connections
+            while len(_ml_api_pool) > settings.ML_API_CLIENT_POOL_SIZE:
+                _, evicted = _ml_api_pool.popitem(last=False)
+                evicted.close()
+        else:
+            _ml_api_pool.move_to_end(key)
+    return api
+
+
 def get_ml_api(project):
     if project.ml_backend_active_connection is None:
         return None
     if project.ml_backend_active_connection.ml_backend is None:
         return None
-    return MLApi(
+    return get_pooled_ml_api(
         url=project.ml_backend_active_connection.ml_backend.url,
         timeout=project.ml_backend_active_connection.ml_backend.timeout,
     )
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0029_projectsummarydelta'),
+        ('ml', '0007_auto_20240314_1957'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MLTrainingTrigger',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ml_training_trigger', serialize=False, to='projects.project')),
+                ('annotations_since_training', models.IntegerField(default=0, help_text='Annotation saves since training was last dispatched', verbose_name='annotations since training')),
+                ('training_scheduled', models.BooleanField(default=False, help_text='Training job is queued and has not started yet', verbose_name='training scheduled')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0008_mltrainingtrigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='done',
+            field=models.PositiveIntegerField(default=0, help_text='Number of processed tasks', verbose_name='done'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='error_message',
+            field=models.TextField(blank=True, null=True, verbose_name='error message'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='failed',
+            field=models.PositiveIntegerField(default=0, help_text='Number of tasks without predictions', verbose_name='failed'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='finished_at',
+            field=models.DateTimeField(default=None, null=True, verbose_name='finished at'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='started_at',
+            field=models.DateTimeField(default=None, null=True, verbose_name='started at'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed'), ('canceled', 'Canceled')], db_index=True, default='queued', max_length=16, verbose_name='status'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='task_ids',
+            field=models.JSONField(default=list, help_text='Tasks to retrieve predictions for', verbose_name='task ids'),
+        ),
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='total',
+            field=models.PositiveIntegerField(default=0, help_text='Number of tasks in the job', verbose_name='total'),
+        ),
+        migrations.AlterField(
+            model_name='mlbackendpredictionjob',
+            name='job_id',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0009_mlbackendpredictionjob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mlbackendpredictionjob',
+            name='dispatched_at',
+            field=models.DateTimeField(default=None, help_text='Time the job was sent to the job queue', null=True, verbose_name='dispatched at'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-19 14:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ml', '0010_mlbackendpredictionjob_dispatched_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mltrainingtrigger',
+            name='training_job_id',
+            field=models.CharField(blank=True, default='', help_text='Scheduled rq job of training', max_length=128, verbose_name='training job id'),
+        ),
+    ]
@@ -1,18 +1,35 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import timedelta
 from typing import Dict, List
 
-from core.utils.common import conditional_atomic, db_is_not_sqlite, load_func
+import ujson as json
+from core.redis import (
+    get_job_status,
+    redis_connected,
+    redis_get,
+    redis_incr,
+    redis_set,
+    start_job_async_or_sync,
+)
+from core.utils.common import load_func
 from django.conf import settings
 from django.db import models, transaction
-from django.db.models import Count, JSONField, Q
+from django.db.models import Count, F, JSONField, Q
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
-from ml.api_connector import PREDICT_URL, TIMEOUT_PREDICT, MLApi
+from ml.api_connector import PREDICT_URL, TIMEOUT_PREDICT, get_pooled_ml_api
 from projects.models import Project
-from tasks.serializers import PredictionSerializer, TaskSimpleSerializer
+from rest_framework.exceptions import ValidationError
+from rq.job import Job, JobStatus
+from tasks.serializers import TaskSimpleSerializer
 from webhooks.serializers import Webhook, WebhookSerializer
 
 logger = logging.getLogger(__name__)
@@ -21,6 +38,10 @@ MAX_JOBS_PER_PROJECT = 1
 
 InteractiveAnnotatingDataSerializer = load_func(settings.INTERACTIVE_DATA_SERIALIZER)
 
+# connected state of ML backends in this process: ml backend id => (config hash, expiration time, model version)
+_ml_backend_states = {}
+_ml_backend_states_lock = threading.Lock()
+
 
 class MLBackendState(models.TextChoices):
     CONNECTED = 'CO', _('Connected')
@@ -156,7 +177,13 @@ class MLBackend(models.Model):
 
     @staticmethod
     def healthcheck_(url, auth_method=None, **kwargs):
-        return MLApi(url=url, auth_method=auth_method, **kwargs).health()
+        return get_pooled_ml_api(
+            url,
+            timeout=kwargs.get('timeout'),
+            auth_method=auth_method,
+            basic_auth_user=kwargs.get('basic_auth_user'),
+            basic_auth_pass=kwargs.get('basic_auth_pass'),
+        ).health()
 
     def has_permission(self, user):
         user.project = self.project  # link for activity log
@@ -164,7 +191,13 @@ class MLBackend(models.Model):
 
     @staticmethod
     def setup_(url, project, auth_method=None, **kwargs):
-        api = MLApi(url=url, auth_method=auth_method, **kwargs)
+        api = get_pooled_ml_api(
+            url,
+            timeout=kwargs.get('timeout'),
+            auth_method=auth_method,
+            basic_auth_user=kwargs.get('basic_auth_user'),
+            basic_auth_pass=kwargs.get('basic_auth_pass'),
+        )
 
         if not isinstance(project, Project):
             project = Project.objects.get(pk=project)
@@ -187,7 +220,7 @@ class MLBackend(models.Model):
 
     @property
     def api(self):
-        return MLApi(
+        return get_pooled_ml_api(
             url=self.url,
             timeout=self.timeout,
             auth_method=self.auth_method,
@@ -199,7 +232,42 @@ class MLBackend(models.Model):
     def not_ready(self):
         return self.state in (MLBackendState.DISCONNECTED, MLBackendState.ERROR)
 
-    def update_state(self):
+    def _state_config_hash(self):
+        config = [
+            str(self.created_at),
+            self.url,
+            self.auth_method,
+            self.basic_auth_user,
+            self.basic_auth_pass,
+            self.extra_params,
+            self.auto_update,
+            self.project.label_config,
+        ]
+        return hashlib.md5(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def update_state(self, cache=False):
+        """Check the ML backend health and set it up for the project
+
+        :param cache: Reuse the connected state checked during ML_BACKEND_STATE_CACHE_TTL seconds
+        with the same backend and label config, instead of /health and /setup requests
+        :return: Model version returned by the backend
+        """
+        config_hash = self._state_config_hash() if settings.ML_BACKEND_STATE_CACHE_TTL else None
+        if cache and config_hash:
+            with _ml_backend_states_lock:
+                cached = _ml_backend_states.get(self.id)
+            if cached and cached[0] == config_hash and cached[1] > time.monotonic():
+                model_version = cached[2]
+                if self.state != MLBackendState.CONNECTED or (
+                    self.auto_update and self.model_version != model_version
+                ):
+                    self.state = MLBackendState.CONNECTED
+                    if self.auto_update:
+                        self.model_version = model_version
+                    self.error_message = None
+                    self.save()
+                return model_version
+
         model_version = None
         if self.healthcheck().is_error:
             self.state = MLBackendState.DISCONNECTED
@@ -218,6 +286,14 @@ class MLBackend(models.Model):
                     self.model_version = model_version
                 self.error_message = None
         self.save()
+
+        with _ml_backend_states_lock:
+            if self.state == MLBackendState.CONNECTED and config_hash:
+                expires_at = time.monotonic() + settings.ML_BACKEND_STATE_CACHE_TTL
+                _ml_backend_states[self.id] = (config_hash, expires_at, model_version)
+            else:
+                # errors are checked again on the next request
+                _ml_backend_states.pop(self.id, None)
         return model_version
 
     def train(self):
@@ -289,8 +365,9 @@ class MLBackend(models.Model):
             )
             return []
 
-    def _get_predictions_from_ml_backend(self, serialized_tasks: List[Dict]) -> List[Dict]:
-        result = self.api.make_predictions(serialized_tasks, self.project)
+    def _get_predictions_from_ml_backend(self, serialized_tasks: List[Dict], result=None) -> List[Dict]:
+        if result is None:
+            result = self.api.make_predictions(serialized_tasks, self.project)
 
         # response validation
         if result.is_error:
@@ -339,32 +416,142 @@ class MLBackend(models.Model):
                 )
         return predictions
 
-    def predict_tasks(self, tasks):
-        model_version = self.update_state()
+    def predict_tasks(self, tasks, on_chunk=None):
+        """Retrieve predictions for the tasks without predictions of the current model version
+
+        Tasks are sent to the ML backend in chunks of ML_PREDICT_CHUNK_SIZE tasks,
+        up to ML_PREDICT_CONCURRENCY requests at once, predictions are saved after each chunk
+        :param tasks: Task queryset or list
+        :param on_chunk: Callback called with chunk stats after each chunk is saved
+        :return: Created predictions or model version if all tasks have predictions already
+        """
+        from tasks.models import Task
+
+        model_version = self.update_state(cache=True)
         if self.not_ready:
             logger.debug(f'ML backend {self} is not ready')
             return
 
         if isinstance(tasks, list):
-            from tasks.models import Task
-
             tasks = Task.objects.filter(id__in=[task.id for task in tasks])
 
         # Filter tasks that already contain the current model version in predictions
         tasks = tasks.annotate(predictions_count=Count('predictions')).exclude(
             Q(predictions_count__gt=0) & Q(predictions__model_version=model_version)
         )
-        if not tasks.exists():
+        task_ids = list(tasks.order_by('id').values_list('id', flat=True))
+        if not task_ids:
             logger.debug(f'All tasks already have prediction from model version={self.model_version}')
             return model_version
-        tasks_ser = TaskSimpleSerializer(tasks, many=True).data
-        predictions = self._get_predictions_from_ml_backend(tasks_ser)
-        with conditional_atomic(predicate=db_is_not_sqlite):
-            prediction_ser = PredictionSerializer(data=predictions, many=True)
-            prediction_ser.is_valid(raise_exception=True)
-            instances = prediction_ser.save()
+
+        chunk_size = max(settings.ML_PREDICT_CHUNK_SIZE, 1)
+        chunks = [task_ids[i : i + chunk_size] for i in range(0, len(task_ids), chunk_size)]
+        stats = {'total': len(task_ids), 'done': 0, 'failed': 0}
+        instances = []
+
+        def save_chunk(chunk, future):
+            chunk_predictions, failed, latency = future.result()
+            chunk_instances, invalid = self._save_predictions(chunk_predictions)
+            instances.extend(chunk_instances)
+            stats['done'] += len(chunk)
+            stats['failed'] += failed + invalid
+            logger.info(
+                f'ML backend {self}: predicted {stats["done"]}/{stats["total"]} tasks '
+                f'({stats["failed"]} failed), chunk of {len(chunk)} tasks took {latency:.2f}s'
+            )
+            if on_chunk:
+                on_chunk(dict(stats, chunk_size=len(chunk), latency=latency))
+
+        # tasks are serialized here, threads only wait for the ML backend and don't use db connections
+        with ThreadPoolExecutor(max_workers=max(settings.ML_PREDICT_CONCURRENCY, 1)) as executor:
+            pending = {}
+            for chunk in chunks:
+                serialized_tasks = TaskSimpleSerializer(
+                    Task.objects.filter(id__in=chunk).order_by('id'), many=True
+                ).data
+                pending[executor.submit(self._predict_chunk, serialized_tasks)] = chunk
+                if len(pending) >= settings.ML_PREDICT_CONCURRENCY:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        save_chunk(pending.pop(future), future)
+            for future in as_completed(list(pending)):
+                save_chunk(pending.pop(future), future)
+
         return instances
 
+    def _predict_chunk(self, serialized_tasks: List[Dict]):
+        """Predictions for the chunk of tasks
+
+        Failed requests are retried ML_PREDICT_RETRIES times with exponential backoff,
+        then the chunk is split in halves, so one bad task or too large request doesn't fail the whole chunk
+        :return: predictions, number of failed tasks, latency in seconds
+        """
+        started_at = time.monotonic()
+        for attempt in range(settings.ML_PREDICT_RETRIES + 1):
+            result = self.api.make_predictions(serialized_tasks, self.project)
+            if not result.is_error:
+                predictions = self._get_predictions_from_ml_backend(serialized_tasks, result=result)
+                # incorrect responses are logged and give no predictions
+                failed = len({task['id'] for task in serialized_tasks} - {p['task'] for p in predictions})
+                return predictions, failed, time.monotonic() - started_at
+            # client errors except rate limits are not retried
+            if 400 <= result.status_code < 500 and result.status_code != 429:
+                break
+            if attempt < settings.ML_PREDICT_RETRIES:
+                time.sleep(settings.ML_PREDICT_RETRY_BACKOFF * 2**attempt)
+
+        # too large chunks fail with server errors or read timeouts,
+        # connection errors don't depend on the tasks, so the chunk isn't split
+        if len(serialized_tasks) > 1 and (result.status_code or result.timeout):
+            middle = len(serialized_tasks) // 2
+            first = self._predict_chunk(serialized_tasks[:middle])
+            second = self._predict_chunk(serialized_tasks[middle:])
+            return first[0] + second[0], first[1] + second[1], time.monotonic() - started_at
+
+        logger.error(f'Predictions for {len(serialized_tasks)} tasks failed: {result.error_message}')
+        return [], len(serialized_tasks), time.monotonic() - started_at
+
+    def _save_predictions(self, predictions: List[Dict]):
+        """Create predictions of one chunk with a single bulk insert and recount their tasks
+
+        :return: created predictions, number of invalid predictions
+        """
+        from data_manager.functions import bump_project_data_version
+        from projects.models import ProjectCounters
+        from tasks.functions import update_task_counters
+        from tasks.models import Prediction, Task
+
+        objs, invalid = [], 0
+        for prediction in predictions:
+            try:
+                result = Prediction.prepare_prediction_result(prediction['result'], self.project)
+                score = None if prediction['score'] is None else float(prediction['score'])
+            except (ValidationError, TypeError, ValueError) as e:
+                logger.error(f'ML backend returns an incorrect prediction for task {prediction["task"]}: {e}')
+                invalid += 1
+                continue
+            model_version = prediction['model_version']
+            objs.append(
+                Prediction(
+                    task_id=prediction['task'],
+                    project_id=prediction['project'],
+                    result=result,
+                    score=score,
+                    model_version='' if model_version is None else str(model_version),
+                )
+            )
+        if not objs:
+            return [], invalid
+
+        task_ids = {obj.task_id for obj in objs}
+        with transaction.atomic():
+            instances = Prediction.objects.bulk_create(objs, batch_size=settings.BATCH_SIZE)
+            Task.objects.filter(id__in=task_ids).update(updated_at=now())
+            update_task_counters(task_ids)
+            ProjectCounters.increment(self.project_id, total_predictions_number=len(instances))
+        bump_project_data_version(self.project_id)
+        return instances, invalid
+
     def interactive_annotating(self, task, context=None, user=None):
         result = {}
         options = {}
@@ -411,7 +598,13 @@ class MLBackend(models.Model):
 
     @staticmethod
     def get_versions_(url, project, auth_method, **kwargs):
-        api = MLApi(url=url, auth_method=auth_method, **kwargs)
+        api = get_pooled_ml_api(
+            url,
+            timeout=kwargs.get('timeout'),
+            auth_method=auth_method,
+            basic_auth_user=kwargs.get('basic_auth_user'),
+            basic_auth_pass=kwargs.get('basic_auth_pass'),
+        )
         if not isinstance(project, Project):
             project = Project.objects.get(pk=project)
         return api.get_versions(project)
@@ -426,9 +619,30 @@ class MLBackend(models.Model):
         )
 
 
+class MLBackendPredictionJobStatus(models.TextChoices):
+    QUEUED = 'queued', _('Queued')
+    RUNNING = 'running', _('Running')
+    COMPLETED = 'completed', _('Completed')
+    FAILED = 'failed', _('Failed')
+    CANCELED = 'canceled', _('Canceled')
+
+
+class MLBackendPredictionJobCanceled(Exception):
+    pass
+
+
+class MLBackendPredictionJobStale(Exception):
+    pass
+
+
 class MLBackendPredictionJob(models.Model):
+    """Predictions for a set of tasks retrieved in a background job
 
-    job_id = models.CharField(max_length=128)
+    Jobs of one project run one after another, up to ML_PREDICTION_JOBS_PER_PROJECT at once,
+    the next queued job of the project is started when a job finishes
+    """
+
+    job_id = models.CharField(max_length=128, blank=True, default='')
     ml_backend = models.ForeignKey(MLBackend, related_name='prediction_jobs', on_delete=models.CASCADE)
     model_version = models.TextField(
         _('model version'), blank=True, null=True, help_text='Model version this job is associated with'
@@ -436,10 +650,164 @@ class MLBackendPredictionJob(models.Model):
     batch_size = models.PositiveSmallIntegerField(
         _('batch size'), default=100, help_text='Number of tasks processed per batch'
     )
-
+    status = models.CharField(
+        _('status'),
+        max_length=16,
+        choices=MLBackendPredictionJobStatus.choices,
+        default=MLBackendPredictionJobStatus.QUEUED,
+        db_index=True,
+    )
+    task_ids = JSONField(_('task ids'), default=list, help_text='Tasks to retrieve predictions for')
+    total = models.PositiveIntegerField(_('total'), default=0, help_text='Number of tasks in the job')
+    done = models.PositiveIntegerField(_('done'), default=0, help_text='Number of processed tasks')
+    failed = models.PositiveIntegerField(_('failed'), default=0, help_text='Number of tasks without predictions')
+    error_message = models.TextField(_('error message'), blank=True, null=True)
+
+    dispatched_at = models.DateTimeField(
+        _('dispatched at'), null=True, default=None, help_text='Time the job was sent to the job queue'
+    )
+    started_at = models.DateTimeField(_('started at'), null=True, default=None)
+    finished_at = models.DateTimeField(_('finished at'), null=True, default=None)
     created_at = models.DateTimeField(_('created at'), auto_now_add=True)
     updated_at = models.DateTimeField(_('updated at'), auto_now=True)
 
+    ACTIVE_STATUSES = [MLBackendPredictionJobStatus.QUEUED, MLBackendPredictionJobStatus.RUNNING]
+    # rq statuses of jobs waiting in a queue or taken by a worker, they aren't failed as stale
+    RQ_ALIVE_STATUSES = [JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED, JobStatus.STARTED]
+
+    @property
+    def is_active(self):
+        return self.status in self.ACTIVE_STATUSES
+
+    @classmethod
+    def create(cls, ml_backend, task_ids):
+        """Create the job and start it unless the project runs the maximum number of jobs already"""
+        task_ids = list(task_ids)
+        job = cls.objects.create(
+            ml_backend=ml_backend,
+            task_ids=task_ids,
+            total=len(task_ids),
+            batch_size=settings.ML_PREDICT_CHUNK_SIZE,
+        )
+        cls.start_queued(ml_backend.project_id)
+        job.refresh_from_db()
+        return job
+
+    @classmethod
+    def start_queued(cls, project_id):
+        """Start queued jobs of the project while it runs less than ML_PREDICTION_JOBS_PER_PROJECT jobs.
+        Jobs are sent to rq after the transaction commits, jobs without progress for
+        ML_PREDICTION_JOB_STALE_TIMEOUT seconds are considered lost and fail, so they don't hold the slots,
+        unless their rq job is still waiting in the queue or running
+        """
+        with transaction.atomic():
+            # lock the project, so concurrent callers don't start more jobs than allowed
+            list(Project.objects.select_for_update().filter(id=project_id).values_list('id', flat=True))
+            jobs = cls.objects.filter(ml_backend__project_id=project_id)
+            stale_before = now() - timedelta(seconds=settings.ML_PREDICTION_JOB_STALE_TIMEOUT)
+            candidates = jobs.filter(
+                Q(status=MLBackendPredictionJobStatus.RUNNING, updated_at__lt=stale_before)
+                | Q(status=MLBackendPredictionJobStatus.QUEUED, dispatched_at__lt=stale_before)
+            ).values_list('id', 'job_id')
+            # jobs without rq job id (sync mode or not recorded yet) are judged by time only
+            stale_ids = [
+                job_id for job_id, rq_job_id in candidates if get_job_status(rq_job_id) not in cls.RQ_ALIVE_STATUSES
+            ]
+            if stale_ids:
+                jobs.filter(id__in=stale_ids, status__in=cls.ACTIVE_STATUSES).update(
+                    status=MLBackendPredictionJobStatus.FAILED,
+                    error_message='Prediction job stopped without finishing',
+                    finished_at=now(),
+                    updated_at=now(),
+                )
+
+            active = jobs.filter(
+                Q(status=MLBackendPredictionJobStatus.RUNNING)
+                | Q(status=MLBackendPredictionJobStatus.QUEUED, dispatched_at__isnull=False)
+            ).count()
+            limit = max(settings.ML_PREDICTION_JOBS_PER_PROJECT, 1) - active
+            if limit <= 0:
+                return
+            job_ids = list(
+                jobs.filter(status=MLBackendPredictionJobStatus.QUEUED, dispatched_at__isnull=True)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )[:limit]
+            if not job_ids:
+                return
+            cls.objects.filter(id__in=job_ids).update(dispatched_at=now(), updated_at=now())
+            transaction.on_commit(lambda: cls._dispatch(job_ids))
+
+    @classmethod
+    def _dispatch(cls, job_ids):
+        for job_id in job_ids:
+            rq_job = start_job_async_or_sync(
+                run_prediction_job, job_id, queue_name='low', job_timeout=settings.RQ_LONG_JOB_TIMEOUT
+            )
+            if hasattr(rq_job, 'id'):
+                cls.objects.filter(id=job_id).update(job_id=rq_job.id)
+
+    def run(self):
+        """Retrieve predictions for the job tasks, progress is saved after each chunk of tasks"""
+        from tasks.models import Task
+
+        def on_chunk(stats):
+            # tasks with predictions of the current model version are skipped by predict_tasks
+            skipped = self.total - stats['total']
+            if not MLBackendPredictionJob.objects.filter(
+                id=self.id, status=MLBackendPredictionJobStatus.RUNNING
+            ).update(done=skipped + stats['done'], failed=stats['failed'], updated_at=now()):
+                status = MLBackendPredictionJob.objects.filter(id=self.id).values_list('status', flat=True).first()
+                if status == MLBackendPredictionJobStatus.CANCELED:
+                    raise MLBackendPredictionJobCanceled()
+                raise MLBackendPredictionJobStale(status)
+
+        tasks = Task.objects.filter(project_id=self.ml_backend.project_id, id__in=self.task_ids)
+        try:
+            result = self.ml_backend.predict_tasks(tasks, on_chunk=on_chunk)
+        except MLBackendPredictionJobCanceled:
+            logger.info(f'Prediction job {self.id} is canceled')
+            return
+        except MLBackendPredictionJobStale as exc:
+            logger.warning(f'Prediction job {self.id} stops, its status changed to {exc} while running')
+            return
+        except Exception as exc:
+            logger.error(f'Prediction job {self.id} failed: {exc}', exc_info=True)
+            self._finish(MLBackendPredictionJobStatus.FAILED, error_message=str(exc))
+            return
+
+        if result is None:
+            error_message = f'ML backend {self.ml_backend} is not ready'
+            self._finish(MLBackendPredictionJobStatus.FAILED, error_message=error_message)
+            return
+        # on_chunk isn't called if all tasks have predictions already
+        failed = MLBackendPredictionJob.objects.filter(id=self.id).values_list('failed', flat=True).first() or 0
+        self._finish(
+            MLBackendPredictionJobStatus.COMPLETED,
+            done=self.total,
+            failed=failed,
+            model_version=self.ml_backend.model_version,
+        )
+
+    def _finish(self, status, **fields):
+        MLBackendPredictionJob.objects.filter(id=self.id, status=MLBackendPredictionJobStatus.RUNNING).update(
+            status=status, finished_at=now(), updated_at=now(), **fields
+        )
+
+    def cancel(self):
+        """Cancel the job, a running job stops after the current chunk of tasks
+        :return: True if the job was active
+        """
+        canceled = MLBackendPredictionJob.objects.filter(id=self.id, status__in=self.ACTIVE_STATUSES).update(
+            status=MLBackendPredictionJobStatus.CANCELED, finished_at=now(), updated_at=now()
+        )
+        self.refresh_from_db()
+        if canceled:
+            # the slot is free now, the worker of the canceled job could be gone already
+            project_id = self.ml_backend.project_id
+            transaction.on_commit(lambda: MLBackendPredictionJob.start_queued(project_id))
+        return bool(canceled)
+
 
 class MLBackendTrainJob(models.Model):
 
@@ -479,6 +847,138 @@ class MLBackendTrainJob(models.Model):
         return status['job_status'] in ('queued', 'started')
 
 
+class MLTrainingTrigger(models.Model):
+    """Annotation saves counted since training was last dispatched for the project,
+    so annotation submits don't count all project annotations to decide on training
+    """
+
+    project = models.OneToOneField(
+        Project, primary_key=True, on_delete=models.CASCADE, related_name='ml_training_trigger'
+    )
+    annotations_since_training = models.IntegerField(
+        _('annotations since training'), default=0, help_text='Annotation saves since training was last dispatched'
+    )
+    training_scheduled = models.BooleanField(
+        _('training scheduled'), default=False, help_text='Training job is queued and has not started yet'
+    )
+    training_job_id = models.CharField(
+        _('training job id'), max_length=128, blank=True, default='', help_text='Scheduled rq job of training'
+    )
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    @classmethod
+    def register_annotation(cls, project):
+        """Count an annotation save and dispatch training every project.min_annotations_to_start_training saves
+        :return: True if training is dispatched
+        """
+        threshold = project.min_annotations_to_start_training if project is not None else 0
+        if not threshold:
+            return False
+
+        if redis_connected():
+            # redis INCR keeps concurrent submits off the trigger row, every threshold-th save dispatches training
+            key = f'ml:project:{project.id}:annotations_since_training'
+            if redis_get(key) is None:
+                initial = cls._initial_count(project, threshold)
+                count = initial if redis_set(key, initial, nx=True) else redis_incr(key)
+            else:
+                count = redis_incr(key)
+            if count % threshold:
+                return False
+            cls.dispatch_training(project.id)
+            return True
+
+        increment = {'annotations_since_training': F('annotations_since_training') + 1}
+        if not cls.objects.filter(project_id=project.id).update(**increment):
+            _, created = cls.objects.get_or_create(
+                project_id=project.id, defaults={'annotations_since_training': cls._initial_count(project, threshold)}
+            )
+            if not created:
+                cls.objects.filter(project_id=project.id).update(**increment)
+
+        # conditional reset is atomic, so concurrent submits dispatch training once per threshold
+        if not cls.objects.filter(project_id=project.id, annotations_since_training__gte=threshold).update(
+            annotations_since_training=0
+        ):
+            return False
+        cls.dispatch_training(project.id)
+        return True
+
+    @staticmethod
+    def _initial_count(project, threshold):
+        """First save since training was enabled: keep the cadence of the former per-save annotation count"""
+        from tasks.models import Annotation
+
+        return Annotation.objects.filter(project=project).count() % threshold or threshold
+
+    @classmethod
+    def dispatch_training(cls, project_id):
+        """Queue training of project ML backends unless it's already queued.
+        The job is queued after the transaction commits. A scheduled flag is lost if its rq job isn't pending anymore,
+        or if the job wasn't queued a few debounce intervals after the flag was set (e.g. the process died)
+        """
+        if not cls.objects.filter(project_id=project_id, training_scheduled=False).update(
+            training_scheduled=True, training_job_id='', updated_at=now()
+        ):
+            trigger = cls.objects.filter(project_id=project_id).values('training_job_id', 'updated_at').first()
+            if trigger is None:
+                # annotation saves are counted in redis, the trigger row is created by the first dispatch
+                _, created = cls.objects.get_or_create(project_id=project_id, defaults={'training_scheduled': True})
+                if created:
+                    transaction.on_commit(lambda: cls._enqueue_training(project_id))
+                return
+            if not cls._is_training_lost(trigger['training_job_id'], trigger['updated_at']):
+                logger.debug(f'Training for project {project_id} is already scheduled')
+                return
+            # conditional claim of the lost flag, so concurrent submits dispatch training once
+            if not cls.objects.filter(
+                project_id=project_id, training_scheduled=True, training_job_id=trigger['training_job_id']
+            ).update(training_job_id='', updated_at=now()):
+                return
+            logger.info(f'Training job {trigger["training_job_id"]} of project {project_id} is lost, queue it again')
+        transaction.on_commit(lambda: cls._enqueue_training(project_id))
+
+    @staticmethod
+    def _is_training_lost(job_id, updated_at):
+        if job_id:
+            return get_job_status(job_id) not in (JobStatus.QUEUED, JobStatus.SCHEDULED, JobStatus.DEFERRED)
+        return updated_at < now() - timedelta(seconds=max(3 * settings.ML_TRAINING_DEBOUNCE, 60))
+
+    @classmethod
+    def _enqueue_training(cls, project_id):
+        try:
+            job = start_job_async_or_sync(
+                train_ml_backends, project_id, in_seconds=settings.ML_TRAINING_DEBOUNCE, queue_name='low'
+            )
+        except Exception as exc:
+            logger.error(f'Training for project {project_id} could not be queued: {exc}', exc_info=True)
+            cls.objects.filter(project_id=project_id).update(training_scheduled=False)
+            return
+        if isinstance(job, Job):
+            cls.objects.filter(project_id=project_id, training_scheduled=True).update(training_job_id=job.id)
+
+
+def train_ml_backends(project_id):
+    MLTrainingTrigger.objects.filter(project_id=project_id).update(training_scheduled=False)
+    for ml_backend in MLBackend.objects.filter(project_id=project_id):
+        ml_backend.train()
+
+
+def run_prediction_job(job_id):
+    job = MLBackendPredictionJob.objects.filter(id=job_id).select_related('ml_backend__project').first()
+    if job is None:
+        return
+    try:
+        # the job could be canceled or failed as stale while it was waiting in the queue
+        if MLBackendPredictionJob.objects.filter(id=job_id, status=MLBackendPredictionJobStatus.QUEUED).update(
+            status=MLBackendPredictionJobStatus.RUNNING, started_at=now(), updated_at=now()
+        ):
+            job.refresh_from_db()
+            job.run()
+    finally:
+        MLBackendPredictionJob.start_queued(job.ml_backend.project_id)
+
+
 def _validate_ml_api_result(ml_api_result, tasks, curr_logger):
     if ml_api_result.is_error:
         curr_logger.info(ml_api_result.error_message)
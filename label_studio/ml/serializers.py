@@ -2,7 +2,7 @@
 """
 from core.utils.io import validate_upload_url
 from django.conf import settings
-from ml.models import MLBackend, MLBackendAuth
+from ml.models import MLBackend, MLBackendAuth, MLBackendPredictionJob
 from rest_framework import serializers
 
 
@@ -111,6 +111,25 @@ class MLBackendSerializer(serializers.ModelSerializer):
         ]
 
 
+class MLBackendPredictionJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MLBackendPredictionJob
+        fields = [
+            'id',
+            'ml_backend',
+            'status',
+            'model_version',
+            'total',
+            'done',
+            'failed',
+            'error_message',
+            'started_at',
+            'finished_at',
+            'created_at',
+            'updated_at',
+        ]
+
+
 class MLInteractiveAnnotatingRequest(serializers.Serializer):
     """
     Serializer for ML interactive annotating request.
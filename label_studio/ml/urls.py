@@ -19,6 +19,17 @@ _api_urlpatterns = [
         name='ml-interactive-annotating',
     ),
     path('<int:pk>/versions', api.MLBackendVersionsAPI.as_view(), name='ml-versions'),
+    path('<int:pk>/prediction-jobs', api.MLBackendPredictionJobListAPI.as_view(), name='ml-prediction-job-list'),
+    path(
+        '<int:pk>/prediction-jobs/<int:job_pk>',
+        api.MLBackendPredictionJobAPI.as_view(),
+        name='ml-prediction-job-detail',
+    ),
+    path(
+        '<int:pk>/prediction-jobs/<int:job_pk>/cancel',
+        api.MLBackendPredictionJobCancelAPI.as_view(),
+        name='ml-prediction-job-cancel',
+    ),
 ]
 
 urlpatterns = [
@@ -13,7 +13,11 @@ from core.redis import start_job_async_or_sync
 from core.utils.common import paginator, paginator_help, temporary_disconnect_all_signals
 from core.utils.exceptions import LabelStudioDatabaseException, ProjectExistException
 from core.utils.io import find_dir, find_file, read_yaml
-from data_manager.functions import filters_ordering_selected_items_exist, get_prepared_queryset
+from data_manager.functions import (
+    bump_project_data_version,
+    filters_ordering_selected_items_exist,
+    get_prepared_queryset,
+)
 from django.conf import settings
 from django.db import IntegrityError
 from django.db.models import F
@@ -26,7 +30,14 @@ from ml.serializers import MLBackendSerializer
 from projects.functions.next_task import get_next_task
 from projects.functions.stream_history import get_label_stream_history
 from projects.functions.utils import recalculate_created_annotations_and_labels_from_scratch
-from projects.models import Project, ProjectImport, ProjectManager, ProjectReimport, ProjectSummary
+from projects.models import (
+    Project,
+    ProjectCounters,
+    ProjectImport,
+    ProjectManager,
+    ProjectReimport,
+    ProjectSummary,
+)
 from projects.serializers import (
     GetFieldsSerializer,
     ProjectImportSerializer,
@@ -733,6 +744,8 @@ class ProjectTaskListAPI(GetParentObjectMixin, generics.ListCreateAPIView, gener
         task_ids = list(Task.objects.filter(project=project).values('id'))
         Task.delete_tasks_without_signals(Task.objects.filter(project=project))
         project.summary.reset()
+        ProjectCounters.reset(project.id)
+        bump_project_data_version(project.id)
         emit_webhooks_for_instance(request.user.active_organization, None, WebhookAction.TASKS_DELETED, task_ids)
         return Response(status=204)
 
@@ -1,13 +1,17 @@
+import hashlib
 import logging
 from collections import Counter
-from typing import List, Tuple, Union
+from itertools import islice
+from typing import Callable, Iterator, List, Tuple, Union
 
 from core.feature_flags import flag_set
 from core.utils.common import conditional_atomic, db_is_not_sqlite, load_func
 from django.conf import settings
+from django.core.exceptions import EmptyResultSet
 from django.db.models import BooleanField, Case, Count, Exists, F, Max, OuterRef, Q, QuerySet, Value, When
 from django.db.models.fields import DecimalField
 from projects.functions.stream_history import add_stream_history
+from projects.functions.task_queue import get_task_queue
 from projects.models import Project
 from tasks.models import Annotation, Task
 from users.models import User
@@ -24,26 +28,126 @@ def get_next_task_logging_level(user: User) -> int:
     return level
 
 
-def _get_random_unlocked(task_query: QuerySet[Task], user: User, upper_limit=None) -> Union[Task, None]:
-    for task in task_query.order_by('?').only('id')[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE]:
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task.id)
-            if not task.has_lock(user):
-                return task
-        except Task.DoesNotExist:
-            logger.debug('Task with id {} locked'.format(task.id))
+def _lock_task(task_id: int, user: User) -> Union[Task, None]:
+    try:
+        task = Task.objects.select_for_update(skip_locked=True).get(pk=task_id)
+        if not task.has_lock(user):
+            return task
+    except Task.DoesNotExist:
+        logger.debug('Task with id {} locked'.format(task_id))
 
 
-def _get_first_unlocked(tasks_query: QuerySet[Task], user) -> Union[Task, None]:
-    # Skip tasks that are locked due to being taken by collaborators
-    for task_id in tasks_query.values_list('id', flat=True):
-        try:
-            task = Task.objects.select_for_update(skip_locked=True).get(pk=task_id)
-            if not task.has_lock(user):
+def _get_task_queue_key(task_query: QuerySet[Task], user: User, strategy: str) -> Union[str, None]:
+    try:
+        sql = str(task_query.query)
+    except EmptyResultSet:
+        return None
+    return f'next-task:{user.id}:{strategy}:{hashlib.md5(sql.encode()).hexdigest()}'
+
+
+def _get_unlocked_from_queue(
+    task_query: QuerySet[Task],
+    user: User,
+    project: Project,
+    strategy: str,
+    get_candidates: Callable[[], List[int]],
+    fallback: Callable[[], Union[Task, None]],
+) -> Union[Task, None]:
+    """Pop prefetched candidates from the queue engine, the buffer is refilled in bulk when it's empty.
+    Buffers are kept per user and sampling context (strategy + task query), stale candidates are skipped.
+    If the refilled buffer runs out without an unlocked task, the DB sampling (fallback) is used.
+    """
+    queue = get_task_queue()
+    key = _get_task_queue_key(task_query, user, strategy)
+    if key is None:
+        return None
+
+    refilled = False
+    while True:
+        task_ids = queue.pop(key, settings.NEXT_TASK_QUEUE_POP_SIZE)
+        if not task_ids:
+            if refilled:
+                return fallback()
+            candidates = get_candidates()
+            if not candidates:
+                return None
+            queue.push(key, candidates)
+            refilled = True
+            continue
+
+        # the buffer can be outdated: tasks could be labeled, filtered out or locked since the refill,
+        # so the whole batch is checked against the current query and locks at once
+        valid_ids = _filter_unlocked_ids(task_ids, user, project, task_query=task_query)
+        for i, task_id in enumerate(valid_ids):
+            task = _lock_task(task_id, user)
+            if task:
+                queue.requeue(key, valid_ids[i + 1 :])
                 return task
 
-        except Task.DoesNotExist:
-            logger.debug('Task with id {} locked'.format(task_id))
+
+def _filter_unlocked_ids(
+    task_ids: List[int], user: User, project: Project, task_query: Union[QuerySet[Task], None] = None
+) -> List[int]:
+    """Keep ids of tasks not locked for the user, locks are checked for the whole window in one query
+
+    :param task_query: if set, ids must also still match this query (checked in the same statement)
+    """
+    if not task_ids:
+        return []
+    tasks = Task.objects.filter(id__in=task_ids)
+    if task_query is not None:
+        tasks = tasks.filter(id__in=task_query.filter(pk__in=task_ids).values('id'))
+    unlocked = set(tasks.exclude_locked(user, project).values_list('id', flat=True))
+    return [task_id for task_id in task_ids if task_id in unlocked]
+
+
+def _get_random_unlocked(
+    task_query: QuerySet[Task], user: User, project: Project, upper_limit=None, use_queue=True
+) -> Union[Task, None]:
+    def sample_ids():
+        task_ids = task_query.order_by('?').values_list('id', flat=True)[: settings.RANDOM_NEXT_TASK_SAMPLE_SIZE]
+        return _filter_unlocked_ids(list(dict.fromkeys(task_ids)), user, project)
+
+    if use_queue and get_task_queue():
+        return _get_unlocked_from_queue(
+            task_query,
+            user,
+            project,
+            'random',
+            sample_ids,
+            lambda: _get_random_unlocked(task_query, user, project, upper_limit, use_queue=False),
+        )
+
+    for task_id in sample_ids():
+        task = _lock_task(task_id, user)
+        if task:
+            return task
+
+
+def _iter_unlocked_ids(tasks_query: QuerySet[Task], user: User, project: Project) -> Iterator[int]:
+    """Iterate over ids of tasks not locked for the user in the query order, locks are checked window by window"""
+    task_ids = tasks_query.values_list('id', flat=True).iterator(chunk_size=settings.NEXT_TASK_LOCK_CHECK_WINDOW)
+    while window := list(islice(task_ids, settings.NEXT_TASK_LOCK_CHECK_WINDOW)):
+        yield from _filter_unlocked_ids(list(dict.fromkeys(window)), user, project)
+
+
+def _get_first_unlocked(tasks_query: QuerySet[Task], user, project: Project, use_queue=True) -> Union[Task, None]:
+    if use_queue and get_task_queue():
+        # page through the query until the buffer is full, so locked leading tasks don't hide the rest
+        return _get_unlocked_from_queue(
+            tasks_query,
+            user,
+            project,
+            'first',
+            lambda: list(islice(_iter_unlocked_ids(tasks_query, user, project), settings.NEXT_TASK_QUEUE_SIZE)),
+            lambda: _get_first_unlocked(tasks_query, user, project, use_queue=False),
+        )
+
+    # Skip tasks that are locked due to being taken by collaborators
+    for task_id in _iter_unlocked_ids(tasks_query, user, project):
+        task = _lock_task(task_id, user)
+        if task:
+            return task
 
 
 def _try_ground_truth(tasks: QuerySet[Task], project: Project, user: User) -> Union[Task, None]:
@@ -54,8 +158,8 @@ def _try_ground_truth(tasks: QuerySet[Task], project: Project, user: User) -> Un
     )
     if not_solved_tasks_with_ground_truths.exists():
         if project.sampling == project.SEQUENCE:
-            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user)
-        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user)
+            return _get_first_unlocked(not_solved_tasks_with_ground_truths, user, project)
+        return _get_random_unlocked(not_solved_tasks_with_ground_truths, user, project)
 
 
 def _try_tasks_with_overlap(tasks: QuerySet[Task]) -> Tuple[Union[Task, None], QuerySet[Task]]:
@@ -67,7 +171,7 @@ def _try_tasks_with_overlap(tasks: QuerySet[Task]) -> Tuple[Union[Task, None], Q
         return None, tasks.filter(overlap=1)
 
 
-def _try_breadth_first(tasks: QuerySet[Task], user: User) -> Union[Task, None]:
+def _try_breadth_first(tasks: QuerySet[Task], user: User, project: Project) -> Union[Task, None]:
     """Try to find tasks with maximum amount of annotations, since we are trying to label tasks as fast as possible"""
 
     tasks = tasks.annotate(annotations_count=Count('annotations', filter=~Q(annotations__completed_by=user)))
@@ -89,7 +193,7 @@ def _try_breadth_first(tasks: QuerySet[Task], user: User) -> Union[Task, None]:
     )
     if not_solved_tasks_labeling_with_max_annotations.exists():
         # try to complete tasks that are already in progress
-        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user)
+        return _get_random_unlocked(not_solved_tasks_labeling_with_max_annotations, user, project)
 
 
 def _try_uncertainty_sampling(
@@ -127,17 +231,20 @@ def _try_uncertainty_sampling(
         if num_annotators > 1 and num_tasks_with_current_predictions > 0:
             # try to randomize tasks to avoid concurrent labeling between several annotators
             next_task = _get_random_unlocked(
-                possible_next_tasks, user, upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions)
+                possible_next_tasks,
+                user,
+                project,
+                upper_limit=min(num_annotators + 1, num_tasks_with_current_predictions),
             )
         else:
-            next_task = _get_first_unlocked(possible_next_tasks, user)
+            next_task = _get_first_unlocked(possible_next_tasks, user, project)
     else:
         # uncertainty sampling fallback: choose by random sampling
         logger.debug(
             f'Uncertainty sampling fallbacks to random sampling '
             f'(current project.model_version={str(project.model_version)})'
         )
-        next_task = _get_random_unlocked(tasks, user)
+        next_task = _get_random_unlocked(tasks, user, project)
     return next_task
 
 
@@ -231,7 +338,7 @@ def get_next_task_without_dm_queue(
 
     if not next_task and prioritized_low_agreement:
         logger.debug(f'User={user} tries low agreement from prepared tasks')
-        next_task = _get_first_unlocked(not_solved_tasks, user)
+        next_task = _get_first_unlocked(not_solved_tasks, user, project)
         queue_info += (' & ' if queue_info else '') + 'Low agreement queue'
 
     if not next_task and project.show_ground_truth_first:
@@ -242,7 +349,7 @@ def get_next_task_without_dm_queue(
     if not next_task and project.maximum_annotations > 1:
         # if there are any tasks in progress (with maximum number of annotations), randomly sampling from them
         logger.debug(f'User={user} tries depth first from prepared tasks')
-        next_task = _try_breadth_first(not_solved_tasks, user)
+        next_task = _try_breadth_first(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Breadth first queue'
 
@@ -256,7 +363,7 @@ def skipped_queue(next_task, prepared_tasks, project, user, queue_info):
         if skipped_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(skipped_tasks)])
             skipped_tasks = prepared_tasks.filter(pk__in=skipped_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(skipped_tasks, user)
+            next_task = _get_first_unlocked(skipped_tasks, user, project, use_queue=False)
             queue_info = 'Skipped queue'
 
     return next_task, queue_info
@@ -272,7 +379,7 @@ def postponed_queue(next_task, prepared_tasks, project, user, queue_info):
         if postponed_tasks.exists():
             preserved_order = Case(*[When(pk=pk, then=pos) for pos, pk in enumerate(postponed_tasks)])
             postponed_tasks = prepared_tasks.filter(pk__in=postponed_tasks).order_by(preserved_order)
-            next_task = _get_first_unlocked(postponed_tasks, user)
+            next_task = _get_first_unlocked(postponed_tasks, user, project, use_queue=False)
             if next_task is not None:
                 next_task.allow_postpone = False
             queue_info = 'Postponed draft queue'
@@ -291,7 +398,7 @@ def get_task_from_qs_with_sampling(
     next_task = None
     if project.sampling == project.SEQUENCE:
         logger.debug(f'User={user} tries sequence sampling from prepared tasks')
-        next_task = _get_first_unlocked(not_solved_tasks, user)
+        next_task = _get_first_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Sequence queue'
 
@@ -303,7 +410,7 @@ def get_task_from_qs_with_sampling(
 
     elif project.sampling == project.UNIFORM:
         logger.debug(f'User={user} tries random sampling from prepared tasks')
-        next_task = _get_random_unlocked(not_solved_tasks, user)
+        next_task = _get_random_unlocked(not_solved_tasks, user, project)
         if next_task:
             queue_info += (' & ' if queue_info else '') + 'Uniform random queue'
 
@@ -0,0 +1,107 @@
+"""Next task queue engines keep buffers of prefetched task candidates,
+so next_task doesn't run sampling queries on every request.
+
+Buffers are refilled in bulk by the sampling strategies from projects.functions.next_task,
+popped candidates are checked against the current task query and locks in one query per batch.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Iterable, List, Optional
+
+from core.redis import redis_connected, redis_lpop_many, redis_lpush_list, redis_set_list
+from core.utils.common import load_func
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BaseTaskQueue:
+    def is_available(self) -> bool:
+        return True
+
+    def pop(self, key: str, count: int) -> List[int]:
+        """Pop up to count next task ids from the buffer, empty list means the buffer is empty or expired"""
+        raise NotImplementedError
+
+    def requeue(self, key: str, task_ids: List[int]) -> None:
+        """Put unused task ids back to the head of the buffer"""
+        raise NotImplementedError
+
+    def push(self, key: str, task_ids: Iterable[int]) -> None:
+        """Replace the buffer with new task ids, it expires in NEXT_TASK_QUEUE_TTL seconds"""
+        raise NotImplementedError
+
+
+class MemoryTaskQueue(BaseTaskQueue):
+    """Buffers in process memory, each worker process has its own buffers"""
+
+    def __init__(self):
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    def pop(self, key, count):
+        with self._lock:
+            item = self._queues.get(key)
+            if item is None:
+                return []
+            queue, expires_at = item
+            if not queue or expires_at < time.time():
+                del self._queues[key]
+                return []
+            return [queue.popleft() for _ in range(min(count, len(queue)))]
+
+    def requeue(self, key, task_ids):
+        with self._lock:
+            item = self._queues.get(key)
+            if item is None:
+                self._queues[key] = (deque(task_ids), time.time() + settings.NEXT_TASK_QUEUE_TTL)
+            else:
+                item[0].extendleft(reversed(task_ids))
+
+    def push(self, key, task_ids):
+        now = time.time()
+        with self._lock:
+            # drop expired buffers of other users and sampling contexts
+            for expired_key in [k for k, (_queue, expires_at) in self._queues.items() if expires_at < now]:
+                del self._queues[expired_key]
+            self._queues[key] = (deque(task_ids), now + settings.NEXT_TASK_QUEUE_TTL)
+
+
+class RedisTaskQueue(BaseTaskQueue):
+    """Buffers in redis lists shared between workers, LPOP hands out every candidate only once"""
+
+    def is_available(self):
+        return redis_connected()
+
+    def pop(self, key, count):
+        return [int(task_id) for task_id in redis_lpop_many(key, count) or []]
+
+    def requeue(self, key, task_ids):
+        redis_lpush_list(key, list(task_ids), ttl=settings.NEXT_TASK_QUEUE_TTL)
+
+    def push(self, key, task_ids):
+        redis_set_list(key, list(task_ids), ttl=settings.NEXT_TASK_QUEUE_TTL)
+
+
+_task_queues = {}
+
+
+def get_task_queue() -> Optional[BaseTaskQueue]:
+    """Get the queue engine from NEXT_TASK_QUEUE_ENGINE, None means tasks are sampled from DB directly"""
+    path = settings.NEXT_TASK_QUEUE_ENGINE
+    if not path:
+        return None
+    if path not in _task_queues:
+        _task_queues[path] = load_func(path)()
+    queue = _task_queues[path]
+    if not queue.is_available():
+        logger.debug(f'Next task queue engine {path} is not available, fallback to DB sampling')
+        return None
+    return queue
+
+
+def reset_task_queues():
+    """Drop engine instances with all their in-memory buffers"""
+    _task_queues.clear()
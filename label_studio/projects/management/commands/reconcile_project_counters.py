@@ -0,0 +1,48 @@
+import logging
+
+from django.core.management.base import BaseCommand
+from projects.models import Project, ProjectCounters, ProjectManager
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Compare denormalized project counters with live counts and repair drifted projects'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', type=int, default=None, help='organization id, all by default')
+        parser.add_argument('--project', type=int, default=None, help='project id, all by default')
+        parser.add_argument(
+            '--dry-run',
+            dest='dry_run',
+            action='store_true',
+            default=False,
+            help='Only report drifted projects',
+        )
+
+    def handle(self, *args, **options):
+        projects = Project.objects.order_by('id')
+        if options['organization']:
+            projects = projects.filter(organization_id=options['organization'])
+        if options['project']:
+            projects = projects.filter(id=options['project'])
+
+        # stored counters include pending deltas, projects without the counters row are compared as zeros
+        stored = {
+            counters.pop('id'): counters
+            for counters in ProjectCounters.annotate_projects(projects).values('id', *ProjectManager.COUNTER_FIELDS)
+        }
+        live = ProjectManager.with_counts_annotate(projects, live=True).values('id', *ProjectManager.COUNTER_FIELDS)
+
+        drifted = []
+        for counters in live.iterator():
+            project_id = counters.pop('id')
+            if stored.get(project_id) != counters:
+                logger.debug(f'Project {project_id} counters drifted: stored={stored.get(project_id)} live={counters}')
+                drifted.append(project_id)
+
+        if drifted and not options['dry_run']:
+            ProjectCounters.recalculate(drifted)
+
+        action = 'found' if options['dry_run'] else 'repaired'
+        self.stdout.write(f'{len(drifted)} projects with drifted counters {action}: {drifted}')
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0026_auto_20231103_0020'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCounters',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='projects.project')),
+                ('task_number', models.IntegerField(default=0, help_text='Total task number in project', verbose_name='task number')),
+                ('finished_task_number', models.IntegerField(default=0, help_text='Finished tasks (is_labeled=True) in project', verbose_name='finished task number')),
+                ('total_predictions_number', models.IntegerField(default=0, help_text='Total predictions number in project', verbose_name='total predictions number')),
+                ('total_annotations_number', models.IntegerField(default=0, help_text='Total not cancelled annotations number in project', verbose_name='total annotations number')),
+                ('num_tasks_with_annotations', models.IntegerField(default=0, help_text='Tasks with at least one useful annotation', verbose_name='tasks with annotations number')),
+                ('useful_annotation_number', models.IntegerField(default=0, help_text='Not cancelled, not ground truth annotations with result in project', verbose_name='useful annotation number')),
+                ('ground_truth_number', models.IntegerField(default=0, help_text='Ground truth annotations number in project', verbose_name='ground truth number')),
+                ('skipped_annotations_number', models.IntegerField(default=0, help_text='Cancelled (skipped) annotations number in project', verbose_name='skipped annotations number')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='updated at')),
+            ],
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+
+def _fill_project_counters(migration_name):
+    from projects.models import Project, ProjectCounters
+
+    project_ids = Project.objects.all().values_list('id', flat=True)
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        ProjectCounters.recalculate([project_id])
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.save()
+
+
+def fill_project_counters(migration_name):
+    logger.info('Start filling project counters')
+    start_job_async_or_sync(_fill_project_counters, migration_name=migration_name)
+    logger.info('Finished filling project counters')
+
+
+def forward(apps, schema_editor):
+    fill_project_counters('0028_auto_fill_projectcounters')
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0027_projectcounters'),
+        ('tasks', '0050_alter_predictionmeta_failed_prediction_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backwards)
+    ]
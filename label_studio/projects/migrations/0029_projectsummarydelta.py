@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0028_auto_fill_projectcounters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectSummaryDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(help_text='ProjectSummary counter field', max_length=32, verbose_name='field')),
+                ('key', models.TextField(help_text='Annotation type tuple or control tag from_name', verbose_name='key')),
+                ('label', models.TextField(help_text='Label inside from_name, empty for from_name markers', null=True, verbose_name='label')),
+                ('delta', models.IntegerField(help_text='Counter change', verbose_name='delta')),
+                ('summary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deltas', to='projects.projectsummary')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['summary', 'id'], name='projects_pr_summary_98d658_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 22:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0029_projectsummarydelta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectsummary',
+            name='data_column_types',
+            field=models.JSONField(default=dict, help_text='Type names of values found in data columns of imported tasks, "mixed" for different types', null=True, verbose_name='data column types'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:08
+
+import logging
+
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+from django.db import migrations, models
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+def _fill_task_search_documents(migration_name):
+    from projects.models import ProjectSummary
+    from tasks.models import Task, TaskSearchDocument
+
+    project_ids = list(ProjectSummary.objects.filter(search_documents_ready=False).values_list('project_id', flat=True))
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        task_ids = (
+            Task.objects.filter(project_id=project_id)
+            .filter(Q(annotations__isnull=False) | Q(predictions__isnull=False))
+            .values_list('id', flat=True)
+            .distinct()
+        )
+        TaskSearchDocument.refresh(set(task_ids))
+        ProjectSummary.objects.filter(project_id=project_id).update(search_documents_ready=True)
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.save()
+
+
+def forward(apps, schema_editor):
+    # summaries are created on first access with search documents ready, so create them for all existing projects
+    Project = apps.get_model('projects', 'Project')
+    ProjectSummary = apps.get_model('projects', 'ProjectSummary')
+    ProjectSummary.objects.bulk_create(
+        [
+            ProjectSummary(project_id=project_id, search_documents_ready=False)
+            for project_id in Project.objects.filter(summary__isnull=True).values_list('id', flat=True)
+        ],
+        batch_size=1000,
+    )
+
+    logger.info('Start filling task search documents')
+    start_job_async_or_sync(_fill_task_search_documents, migration_name='0031_projectsummary_search_documents_ready')
+    logger.info('Finished filling task search documents')
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projectsummary_data_column_types'),
+        ('tasks', '0053_tasksearchdocument_search_indexes'),
+    ]
+
+    operations = [
+        # existing summaries wait for the fill job, new ones are kept up to date from the start
+        migrations.AddField(
+            model_name='projectsummary',
+            name='search_documents_ready',
+            field=models.BooleanField(default=False, help_text='Task search documents are built for all annotations and predictions of the project', verbose_name='search documents ready'),
+        ),
+        migrations.AlterField(
+            model_name='projectsummary',
+            name='search_documents_ready',
+            field=models.BooleanField(default=True, help_text='Task search documents are built for all annotations and predictions of the project', verbose_name='search documents ready'),
+        ),
+        migrations.RunPython(forward, backwards),
+    ]
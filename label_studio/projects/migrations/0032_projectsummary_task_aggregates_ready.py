@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:37
+
+import logging
+
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+from django.db import migrations, models
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+
+def _fill_task_aggregates(migration_name):
+    from projects.models import ProjectSummary
+    from tasks.models import Task, TaskAggregates
+
+    project_ids = list(ProjectSummary.objects.filter(task_aggregates_ready=False).values_list('project_id', flat=True))
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        task_ids = (
+            Task.objects.filter(project_id=project_id)
+            .filter(Q(annotations__isnull=False) | Q(predictions__isnull=False) | Q(drafts__isnull=False))
+            .values_list('id', flat=True)
+            .distinct()
+        )
+        TaskAggregates.refresh(set(task_ids))
+        ProjectSummary.objects.filter(project_id=project_id).update(task_aggregates_ready=True)
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.save()
+
+
+def forward(apps, schema_editor):
+    logger.info('Start filling task aggregates')
+    start_job_async_or_sync(_fill_task_aggregates, migration_name='0032_projectsummary_task_aggregates_ready')
+    logger.info('Finished filling task aggregates')
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0031_projectsummary_search_documents_ready'),
+        ('tasks', '0054_taskaggregates'),
+    ]
+
+    operations = [
+        # existing summaries wait for the fill job, new ones are kept up to date from the start
+        migrations.AddField(
+            model_name='projectsummary',
+            name='task_aggregates_ready',
+            field=models.BooleanField(default=False, help_text='Data manager task aggregates are built for all annotations, predictions and drafts of the project', verbose_name='task aggregates ready'),
+        ),
+        migrations.AlterField(
+            model_name='projectsummary',
+            name='task_aggregates_ready',
+            field=models.BooleanField(default=True, help_text='Data manager task aggregates are built for all annotations, predictions and drafts of the project', verbose_name='task aggregates ready'),
+        ),
+        migrations.RunPython(forward, backwards),
+    ]
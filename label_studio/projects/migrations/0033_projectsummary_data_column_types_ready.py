@@ -0,0 +1,80 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:12
+
+import logging
+
+from core.models import AsyncMigrationStatus
+from core.redis import start_job_async_or_sync
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _fill_data_column_types(migration_name):
+    from projects.models import ProjectSummary
+    from tasks.models import Task
+
+    project_ids = list(
+        ProjectSummary.objects.filter(data_column_types_ready=False).values_list('project_id', flat=True)
+    )
+    for project_id in project_ids:
+        migration = AsyncMigrationStatus.objects.create(
+            project_id=project_id,
+            name=migration_name,
+            status=AsyncMigrationStatus.STATUS_STARTED,
+        )
+
+        data_column_types = {}
+        task_data = Task.objects.filter(project_id=project_id).values_list('data', flat=True)
+        for data in task_data.iterator(chunk_size=settings.BATCH_SIZE):
+            if not isinstance(data, dict):
+                continue
+            ProjectSummary._merge_data_column_types(
+                data_column_types,
+                {column: type(value).__name__ for column, value in data.items() if value is not None},
+            )
+
+        # types written by imports and task updates since the migration are merged, not overwritten
+        with transaction.atomic():
+            summary = ProjectSummary.objects.select_for_update().filter(project_id=project_id).first()
+            if summary is not None:
+                summary.data_column_types = ProjectSummary._merge_data_column_types(
+                    dict(summary.data_column_types or {}), data_column_types
+                )
+                summary.data_column_types_ready = True
+                summary.save(update_fields=['data_column_types', 'data_column_types_ready'])
+
+        migration.status = AsyncMigrationStatus.STATUS_FINISHED
+        migration.save()
+
+
+def forward(apps, schema_editor):
+    logger.info('Start filling data column types')
+    start_job_async_or_sync(_fill_data_column_types, migration_name='0033_projectsummary_data_column_types_ready')
+    logger.info('Finished filling data column types')
+
+
+def backwards(apps, schema_editor):
+    pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0032_projectsummary_task_aggregates_ready'),
+    ]
+
+    operations = [
+        # existing summaries wait for the fill job, new ones are kept up to date from the start
+        migrations.AddField(
+            model_name='projectsummary',
+            name='data_column_types_ready',
+            field=models.BooleanField(default=False, help_text='Data column types are collected from all tasks of the project', verbose_name='data column types ready'),
+        ),
+        migrations.AlterField(
+            model_name='projectsummary',
+            name='data_column_types_ready',
+            field=models.BooleanField(default=True, help_text='Data column types are collected from all tasks of the project', verbose_name='data column types ready'),
+        ),
+        migrations.RunPython(forward, backwards),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0033_projectsummary_data_column_types_ready'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectCountersDelta',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(help_text='ProjectCounters counter field', max_length=32, verbose_name='field')),
+                ('delta', models.IntegerField(help_text='Counter change', verbose_name='delta')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='counters_deltas', to='projects.project')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'id'], name='projects_pr_project_872e87_idx')],
+            },
+        ),
+    ]
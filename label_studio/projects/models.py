@@ -1,7 +1,10 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
+import copy
 import json
 import logging
+from collections import Counter
+from contextlib import contextmanager
 from typing import Any, Mapping, Optional
 
 from annoying.fields import AutoOneToOneField
@@ -26,12 +29,30 @@ from core.utils.common import (
     load_func,
     merge_labels_counters,
 )
-from core.utils.db import fast_first
+from core.utils.db import SQCount, fast_first
 from core.utils.exceptions import LabelStudioValidationErrorSentryIgnored
+from data_manager.plan_cache import view_plan_cache
 from django.conf import settings
 from django.core.validators import MaxLengthValidator, MinLengthValidator
 from django.db import models, transaction
-from django.db.models import Avg, BooleanField, Case, Count, JSONField, Max, Q, Sum, Value, When
+from django.db.models import (
+    Avg,
+    BooleanField,
+    Case,
+    Count,
+    ExpressionWrapper,
+    F,
+    JSONField,
+    Max,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from label_studio_sdk._extensions.label_studio_tools.core.label_config import parse_config
 from labels_manager.models import Label
@@ -88,13 +109,20 @@ class ProjectManager(models.Manager):
         return self.with_counts_annotate(self, fields=fields)
 
     @staticmethod
-    def with_counts_annotate(queryset, fields=None):
+    def with_counts_annotate(queryset, fields=None, live=False):
+        """Annotate projects with counters
+        :param fields: counter fields to annotate, all counters by default
+        :param live: count with subqueries instead of reading denormalized ProjectCounters
+        """
         available_fields = ProjectManager.ANNOTATED_FIELDS
         if fields is None:
             to_annotate = available_fields
         else:
             to_annotate = {field: available_fields[field] for field in fields if field in available_fields}
 
+        if settings.PROJECT_COUNTERS_ENABLED and not live:
+            return ProjectCounters.annotate_projects(queryset, fields=list(to_annotate))
+
         for _, annotate_func in to_annotate.items():  # noqa: F402
             queryset = annotate_func(queryset)
 
@@ -419,6 +447,9 @@ class Project(ProjectMixin, models.Model):
         :param overlap_cohort_percentage_changed: If cohort_percentage param changed
         :param tasks_number_changed: If tasks number changed in project
         """
+        from data_manager.functions import bump_project_data_version
+
+        bump_project_data_version(self.id)
         logger.info(
             f'Starting _update_tasks_states with params: Project {str(self)} maximum_annotations '
             f'{self.maximum_annotations} and percentage {self.overlap_cohort_percentage}'
@@ -437,14 +468,17 @@ class Project(ProjectMixin, models.Model):
                 tasks_with_overlap = self.tasks.all()
             # update is_labeled after change
             bulk_update_stats_project_tasks(tasks_with_overlap, project=self)
+            ProjectCounters.recalculate_on_commit(self.id)
 
         # if cohort slider is tweaked
         elif overlap_cohort_percentage_changed and self.maximum_annotations > 1:
             self._rearrange_overlap_cohort()
+            ProjectCounters.recalculate_on_commit(self.id)
 
         # if adding/deleting tasks and cohort settings are applied
         elif tasks_number_changed and self.overlap_cohort_percentage < 100 and self.maximum_annotations > 1:
             self._rearrange_overlap_cohort()
+            ProjectCounters.recalculate_on_commit(self.id)
 
     def _rearrange_overlap_cohort(self):
         """
@@ -565,7 +599,8 @@ class Project(ProjectMixin, models.Model):
         if not annotations_from_config:
             logger.debug('Annotation schema is not found in config')
             return
-        annotations_from_data = set(self.summary.created_annotations)
+        summary = self.summary.fold_pending_deltas()
+        annotations_from_data = set(summary.created_annotations)
         if annotations_from_data and not annotations_from_data.issubset(annotations_from_config):
             different_annotations = list(annotations_from_data.difference(annotations_from_config))
             diff_str = []
@@ -579,7 +614,7 @@ class Project(ProjectMixin, models.Model):
                     or t not in get_all_types(config_string)
                 ):
                     diff_str.append(
-                        f'{self.summary.created_annotations[ann_tuple]} '
+                        f'{summary.created_annotations[ann_tuple]} '
                         f'with from_name={from_name}, to_name={to_name}, type={t}'
                     )
             if len(diff_str) > 0:
@@ -590,7 +625,7 @@ class Project(ProjectMixin, models.Model):
 
         # validate labels consistency
         labels_from_config, dynamic_label_from_config = get_all_labels(config_string)
-        created_labels = merge_labels_counters(self.summary.created_labels, self.summary.created_labels_drafts)
+        created_labels = merge_labels_counters(summary.created_labels, summary.created_labels_drafts)
 
         def display_count(count: int, type: str) -> Optional[str]:
             """Helper for displaying pluralized sources of validation errors,
@@ -632,8 +667,8 @@ class Project(ProjectMixin, models.Model):
                 different_labels = list(set(labels_from_data).difference(labels_from_config_by_tag))
                 diff_str = ''
                 for label in different_labels:
-                    annotation_label_count = self.summary.created_labels.get(control_tag_from_data, {}).get(label, 0)
-                    draft_label_count = self.summary.created_labels_drafts.get(control_tag_from_data, {}).get(label, 0)
+                    annotation_label_count = summary.created_labels.get(control_tag_from_data, {}).get(label, 0)
+                    draft_label_count = summary.created_labels_drafts.get(control_tag_from_data, {}).get(label, 0)
                     annotation_display_count = display_count(annotation_label_count, 'annotation')
                     draft_display_count = display_count(draft_label_count, 'draft')
 
@@ -692,6 +727,7 @@ class Project(ProjectMixin, models.Model):
                 self.save(update_fields=['model_version'])
 
             _, deleted_map = predictions.delete()
+            ProjectCounters.recalculate_on_commit(self.id)
 
         count = deleted_map.get('tasks.Prediction', 0)
         return {'deleted_predictions': count}
@@ -735,6 +771,8 @@ class Project(ProjectMixin, models.Model):
             self.label_config_hash = hash(str(self.parsed_label_config))
             if update_fields is not None:
                 update_fields = {'data_types', 'parsed_label_config', 'label_config_hash'}.union(update_fields)
+            if exists:
+                view_plan_cache.invalidate_project(self.id)
 
         if self.label_config and (self._label_config_has_changed() or not exists or not self.control_weights):
             self.control_weights = self.get_updated_weights()
@@ -750,6 +788,7 @@ class Project(ProjectMixin, models.Model):
             steps = ProjectOnboardingSteps.objects.all()
             objs = [ProjectOnboarding(project=self, step=step) for step in steps]
             ProjectOnboarding.objects.bulk_create(objs)
+            ProjectCounters.objects.get_or_create(project=self)
 
         # argument for recalculate project task stats
         if recalc:
@@ -765,6 +804,7 @@ class Project(ProjectMixin, models.Model):
             bulk_update_stats_project_tasks(
                 self.tasks.filter(Q(annotations__isnull=False) & Q(annotations__ground_truth=False))
             )
+            ProjectCounters.recalculate_on_commit(self.id)
 
         if hasattr(self, 'summary'):
             # Ensure project.summary is consistent with current tasks / annotations
@@ -996,9 +1036,11 @@ class Project(ProjectMixin, models.Model):
         storage = get_storage_by_url(url, storage_objects)
 
         if storage:
+            http_url, max_age = storage.generate_http_url_cached(url)
             return {
-                'url': storage.generate_http_url(url),
+                'url': http_url,
                 'presign_ttl': storage.presign_ttl,
+                'max_age': max_age,
             }
 
     def _update_tasks_counters_and_is_labeled(self, task_ids, from_scratch=True):
@@ -1008,8 +1050,10 @@ class Project(ProjectMixin, models.Model):
         :param from_scratch: Skip calculated tasks
         :return: Count of updated tasks
         """
+        from data_manager.functions import bump_project_data_version
         from tasks.functions import update_tasks_counters
 
+        bump_project_data_version(self.id)
         num_tasks_updated = 0
         page_idx = 0
 
@@ -1021,6 +1065,7 @@ class Project(ProjectMixin, models.Model):
                 num_tasks_updated += update_tasks_counters(queryset, from_scratch)
                 bulk_update_stats_project_tasks(queryset, self)
             page_idx += 1
+        ProjectCounters.recalculate_on_commit(self.id)
         return num_tasks_updated
 
     def _update_tasks_counters_and_task_states(
@@ -1038,11 +1083,14 @@ class Project(ProjectMixin, models.Model):
         :param from_scratch: Skip calculated tasks
         :return: Count of updated tasks
         """
+        from data_manager.functions import bump_project_data_version
         from tasks.functions import update_tasks_counters
 
+        bump_project_data_version(self.id)
         queryset = make_queryset_from_iterable(queryset)
         objs = update_tasks_counters(queryset, from_scratch)
         self._update_tasks_states(maximum_annotations_changed, overlap_cohort_percentage_changed, tasks_number_changed)
+        ProjectCounters.recalculate_on_commit(self.id)
 
         if recalculate_all_stats and recalculate_stats_counts:
             recalculate_all_stats(self.id, **recalculate_stats_counts)
@@ -1141,6 +1189,31 @@ class ProjectSummary(models.Model):
     common_data_columns = JSONField(
         _('common data columns'), null=True, default=list, help_text='Common data columns found across imported tasks'
     )
+    # { col1: 'str', col2: 'int', col3: 'mixed' }
+    data_column_types = JSONField(
+        _('data column types'),
+        null=True,
+        default=dict,
+        help_text='Type names of values found in data columns of imported tasks, "mixed" for different types',
+    )
+    # existing projects get it when their data column types are filled by the migration job
+    data_column_types_ready = models.BooleanField(
+        _('data column types ready'),
+        default=True,
+        help_text='Data column types are collected from all tasks of the project',
+    )
+    # existing projects get it when their task search documents are filled by the migration job
+    search_documents_ready = models.BooleanField(
+        _('search documents ready'),
+        default=True,
+        help_text='Task search documents are built for all annotations and predictions of the project',
+    )
+    # existing projects get it when their task aggregates are filled by the migration job
+    task_aggregates_ready = models.BooleanField(
+        _('task aggregates ready'),
+        default=True,
+        help_text='Data manager task aggregates are built for all annotations, predictions and drafts of the project',
+    )
     # { (from_name, to_name, type): annotation_count }
     created_annotations = JSONField(
         _('created annotations'),
@@ -1154,22 +1227,53 @@ class ProjectSummary(models.Model):
         _('created labels in drafts'), null=True, default=dict, help_text='Unique drafts labels'
     )
 
+    # label counters below are appended to ProjectSummaryDelta rows instead of rewriting the JSON fields,
+    # readers call fold_pending_deltas() first, writers compact pending deltas into the row in bulk
+    DELTA_FIELDS = ('created_annotations', 'created_labels', 'created_labels_drafts')
+
+    # pending deltas are already folded into the counters of this instance
+    _pending_deltas_folded = False
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        if fields is None or set(self.DELTA_FIELDS) & set(fields):
+            self._pending_deltas_folded = False
+
     def has_permission(self, user):
         user.project = self.project  # link for activity log
         return self.project.has_permission(user)
 
     def reset(self, tasks_data_based=True):
+        update_fields = list(self.DELTA_FIELDS)
         if tasks_data_based:
             self.all_data_columns = {}
             self.common_data_columns = []
-        self.created_annotations = {}
-        self.created_labels = {}
-        self.created_labels_drafts = {}
-        self.save()
+            self.data_column_types = {}
+            update_fields += ['all_data_columns', 'common_data_columns', 'data_column_types']
+        with transaction.atomic():
+            self._lock_row()
+            self.deltas.all().delete()
+            for field in self.DELTA_FIELDS:
+                setattr(self, field, {})
+            self.save(update_fields=update_fields)
+        self._pending_deltas_folded = True
+
+    def _lock_row(self, *fields):
+        return ProjectSummary.objects.select_for_update().filter(pk=self.pk).values(*fields).first()
+
+    MIXED_DATA_COLUMN_TYPE = 'mixed'
+
+    @classmethod
+    def _merge_data_column_types(cls, column_types, new_types):
+        for column, value_type in new_types.items():
+            if column_types.setdefault(column, value_type) != value_type:
+                column_types[column] = cls.MIXED_DATA_COLUMN_TYPE
+        return column_types
 
     def update_data_columns(self, tasks):
         common_data_columns = set()
-        all_data_columns = dict(self.all_data_columns)
+        all_data_columns = {}
+        data_column_types = {}
         for task in tasks:
             try:
                 task_data = get_attr_or_item(task, 'data')
@@ -1178,48 +1282,84 @@ class ProjectSummary(models.Model):
             task_data_keys = task_data.keys()
             for column in task_data_keys:
                 all_data_columns[column] = all_data_columns.get(column, 0) + 1
+                value = task_data[column]
+                if value is not None:
+                    self._merge_data_column_types(data_column_types, {column: type(value).__name__})
             if not common_data_columns:
                 common_data_columns = set(task_data_keys)
             else:
                 common_data_columns &= set(task_data_keys)
 
-        self.all_data_columns = all_data_columns
-        if not self.common_data_columns:
-            self.common_data_columns = list(sorted(common_data_columns))
-        else:
-            self.common_data_columns = list(sorted(set(self.common_data_columns) & common_data_columns))
-        logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
-        logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
-        self.save(update_fields=['all_data_columns', 'common_data_columns'])
+        # common columns are an intersection, so they can't be kept as deltas: apply to the locked row instead
+        with transaction.atomic():
+            row = self._lock_row('all_data_columns', 'common_data_columns', 'data_column_types') or {}
+            self.all_data_columns = dict(row.get('all_data_columns') or {})
+            for column, count in all_data_columns.items():
+                self.all_data_columns[column] = self.all_data_columns.get(column, 0) + count
+            self.data_column_types = self._merge_data_column_types(
+                dict(row.get('data_column_types') or {}), data_column_types
+            )
+            current_common_data_columns = row.get('common_data_columns')
+            if not current_common_data_columns:
+                self.common_data_columns = list(sorted(common_data_columns))
+            else:
+                self.common_data_columns = list(sorted(set(current_common_data_columns) & common_data_columns))
+            logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
+            logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
+            self.save(update_fields=['all_data_columns', 'common_data_columns', 'data_column_types'])
+
+    def update_data_column_types(self, tasks, columns=None):
+        """Merge types of task.data values written in bulk without task signals, columns limit the written keys"""
+        data_column_types = {}
+        for task in tasks:
+            try:
+                task_data = get_attr_or_item(task, 'data')
+            except KeyError:
+                task_data = task
+            for column, value in task_data.items():
+                if value is not None and (columns is None or column in columns):
+                    self._merge_data_column_types(data_column_types, {column: type(value).__name__})
+
+        with transaction.atomic():
+            row = self._lock_row('data_column_types') or {}
+            self.data_column_types = self._merge_data_column_types(
+                dict(row.get('data_column_types') or {}), data_column_types
+            )
+            self.save(update_fields=['data_column_types'])
 
     def remove_data_columns(self, tasks):
-        all_data_columns = dict(self.all_data_columns)
-        keys_to_remove = []
+        with transaction.atomic():
+            row = self._lock_row('all_data_columns', 'common_data_columns', 'data_column_types') or {}
+            all_data_columns = dict(row.get('all_data_columns') or {})
+            data_column_types = dict(row.get('data_column_types') or {})
+            keys_to_remove = []
 
-        for task in tasks:
-            task_data = get_attr_or_item(task, 'data')
-            for key in task_data.keys():
-                if key in all_data_columns:
-                    all_data_columns[key] -= 1
-                    if all_data_columns[key] == 0:
-                        keys_to_remove.append(key)
-                        all_data_columns.pop(key)
-        self.all_data_columns = all_data_columns
-
-        if keys_to_remove:
-            common_data_columns = list(self.common_data_columns)
+            for task in tasks:
+                task_data = get_attr_or_item(task, 'data')
+                for key in task_data.keys():
+                    if key in all_data_columns:
+                        all_data_columns[key] -= 1
+                        if all_data_columns[key] == 0:
+                            keys_to_remove.append(key)
+                            all_data_columns.pop(key)
+            self.all_data_columns = all_data_columns
+
+            common_data_columns = list(row.get('common_data_columns') or [])
             for key in keys_to_remove:
                 if key in common_data_columns:
                     common_data_columns.remove(key)
+                data_column_types.pop(key, None)
             self.common_data_columns = common_data_columns
-        logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
-        logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
-        self.save(
-            update_fields=[
-                'all_data_columns',
-                'common_data_columns',
-            ]
-        )
+            self.data_column_types = data_column_types
+            logger.debug(f'summary.all_data_columns = {self.all_data_columns}')
+            logger.debug(f'summary.common_data_columns = {self.common_data_columns}')
+            self.save(
+                update_fields=[
+                    'all_data_columns',
+                    'common_data_columns',
+                    'data_column_types',
+                ]
+            )
 
     def _get_annotation_key(self, result):
         result_type = result.get('type', None)
@@ -1254,125 +1394,441 @@ class ProjectSummary(models.Model):
                 labels.append(str(label))
         return labels
 
-    def update_created_annotations_and_labels(self, annotations):
-        created_annotations = dict(self.created_annotations)
-        labels = dict(self.created_labels)
-        for annotation in annotations:
-            results = get_attr_or_item(annotation, 'result') or []
+    def _get_deltas(self, objects, labels_field, sign):
+        """Aggregate annotation or draft results into (field, key, label, delta) rows
+
+        :param objects: annotations or drafts (objects or dicts with "result")
+        :param labels_field: created_labels for annotations (created_annotations is counted too)
+            or created_labels_drafts for drafts
+        :param sign: 1 to add counters, -1 to remove them
+        """
+        counters = Counter()
+        # from_name markers create (on add) or drop empty (on remove) label dicts, they go after label counters
+        from_names = {}
+        for obj in objects:
+            results = get_attr_or_item(obj, 'result') or []
             if not isinstance(results, list):
                 continue
 
             for result in results:
-                # aggregate annotation types
-                key = self._get_annotation_key(result)
-                if not key:
+                if labels_field == 'created_labels':
+                    # aggregate annotation types
+                    key = self._get_annotation_key(result)
+                    if key:
+                        counters[('created_annotations', key, None)] += sign
+                    elif sign > 0:
+                        continue
+                from_name = result.get('from_name', None)
+                if from_name is None:
                     continue
-                created_annotations[key] = created_annotations.get(key, 0) + 1
-                from_name = result['from_name']
 
                 # aggregate labels
-                if from_name not in self.created_labels:
-                    labels[from_name] = dict()
-
+                from_names[from_name] = None
                 for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+                    counters[(labels_field, from_name, label)] += sign
+
+        deltas = [(field, key, label, delta) for (field, key, label), delta in counters.items()]
+        deltas += [(labels_field, from_name, None, sign) for from_name in from_names]
+        return deltas
+
+    @staticmethod
+    def _fold_deltas(counters, deltas):
+        """Apply (field, key, label, delta) rows to counters {field: dict} in order,
+        removals of missing keys are ignored and counters dropping to zero are removed
+        """
+        for field, key, label, delta in deltas:
+            values = counters[field]
+            if field == 'created_annotations':
+                if delta > 0:
+                    values[key] = values.get(key, 0) + delta
+                elif key in values:
+                    values[key] += delta
+                    if values[key] <= 0:
+                        values.pop(key)
+            elif delta > 0:
+                labels = values.setdefault(key, {})
+                if label is not None:
+                    labels[label] = labels.get(label, 0) + delta
+            elif key in values:
+                labels = values[key]
+                if label is not None and label in labels:
+                    labels[label] += delta
+                    if labels[label] <= 0:
+                        labels.pop(label)
+                if not labels:
+                    values.pop(key)
+        return counters
+
+    def _fold_into_self(self, deltas):
+        counters = {field: copy.deepcopy(getattr(self, field) or {}) for field in self.DELTA_FIELDS}
+        self._fold_deltas(counters, deltas)
+        for field, values in counters.items():
+            setattr(self, field, values)
+
+    def fold_pending_deltas(self):
+        """Fold pending deltas into the label counters of this instance without writing them,
+        call it before reading created_annotations, created_labels or created_labels_drafts
+        """
+        if not self._pending_deltas_folded:
+            deltas = list(self.deltas.order_by('id').values_list('field', 'key', 'label', 'delta'))
+            if deltas:
+                self._fold_into_self(deltas)
+            self._pending_deltas_folded = True
+        return self
+
+    def _add_deltas(self, deltas):
+        if not deltas:
+            return
+        ProjectSummaryDelta.objects.bulk_create(
+            [
+                ProjectSummaryDelta(summary_id=self.pk, field=field, key=key, label=label, delta=delta)
+                for field, key, label, delta in deltas
+            ],
+            batch_size=settings.BATCH_SIZE,
+        )
+        # unfolded instances pick the new rows up with the rest of pending deltas
+        if self._pending_deltas_folded:
+            self._fold_into_self(deltas)
+        threshold = max(settings.PROJECT_SUMMARY_COMPACT_THRESHOLD, 1)
+        if len(deltas) >= threshold or self.deltas.order_by('id').values('id')[threshold - 1 : threshold].exists():
+            self.compact()
+
+    def compact(self):
+        """Fold pending deltas into the JSON fields of the summary row and delete them"""
+        with transaction.atomic():
+            row = self._lock_row(*self.DELTA_FIELDS)
+            if row is None:
+                return
+            pending = list(self.deltas.order_by('id').values_list('id', 'field', 'key', 'label', 'delta'))
+            counters = {field: row[field] or {} for field in self.DELTA_FIELDS}
+            if pending:
+                self._fold_deltas(counters, [delta[1:] for delta in pending])
+                ProjectSummary.objects.filter(pk=self.pk).update(**counters)
+                # delete exactly the folded rows, deltas committed meanwhile stay pending
+                ids = [delta[0] for delta in pending]
+                for i in range(0, len(ids), settings.BATCH_SIZE):
+                    ProjectSummaryDelta.objects.filter(id__in=ids[i : i + settings.BATCH_SIZE]).delete()
+            for field, values in counters.items():
+                setattr(self, field, values)
+            self._pending_deltas_folded = True
+        logger.debug(f'Compacted {len(pending)} summary deltas for project {self.pk}')
+
+    def _reset_counters(self, fields):
+        with transaction.atomic():
+            self._lock_row()
+            self.deltas.filter(field__in=fields).delete()
+            for field in fields:
+                setattr(self, field, {})
+            self.save(update_fields=fields)
 
-        logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {labels}')
-        self.created_annotations = created_annotations
-        self.created_labels = labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+    def update_created_annotations_and_labels(self, annotations):
+        deltas = self._get_deltas(annotations, 'created_labels', 1)
+        self._add_deltas(deltas)
+        logger.debug(f'summary.created_annotations and created_labels deltas = {deltas}')
 
     def remove_created_annotations_and_labels(self, annotations):
         # we are going to remove all annotations, so we'll reset the corresponding fields on the summary
         remove_all_annotations = self.project.annotations.count() == len(annotations)
-        created_annotations, created_labels = (
-            ({}, {}) if remove_all_annotations else (dict(self.created_annotations), dict(self.created_labels))
+        if remove_all_annotations:
+            self._reset_counters(['created_annotations', 'created_labels'])
+            logger.debug('summary.created_annotations and created_labels are reset')
+        else:
+            deltas = self._get_deltas(annotations, 'created_labels', -1)
+            self._add_deltas(deltas)
+            logger.debug(f'summary.created_annotations and created_labels deltas = {deltas}')
+
+    def update_created_labels_drafts(self, drafts):
+        deltas = self._get_deltas(drafts, 'created_labels_drafts', 1)
+        self._add_deltas(deltas)
+        logger.debug(f'update summary.created_labels_drafts deltas = {deltas}')
+
+    def remove_created_drafts_and_labels(self, drafts):
+        # we are going to remove all drafts, so we'll reset the corresponding field on the summary
+        remove_all_drafts = AnnotationDraft.objects.filter(task__project=self.project).count() == len(drafts)
+        if remove_all_drafts:
+            self._reset_counters(['created_labels_drafts'])
+            logger.debug('summary.created_labels_drafts is reset')
+        else:
+            deltas = self._get_deltas(drafts, 'created_labels_drafts', -1)
+            self._add_deltas(deltas)
+            logger.debug(f'summary.created_labels_drafts deltas = {deltas}')
+
+
+class ProjectSummaryDelta(models.Model):
+    """Pending +/- changes of ProjectSummary label counters,
+    appended by annotation and draft writers without locking the summary row
+    """
+
+    summary = models.ForeignKey(ProjectSummary, on_delete=models.CASCADE, related_name='deltas')
+    field = models.CharField(_('field'), max_length=32, help_text='ProjectSummary counter field')
+    key = models.TextField(_('key'), help_text='Annotation type tuple or control tag from_name')
+    label = models.TextField(_('label'), null=True, help_text='Label inside from_name, empty for from_name markers')
+    delta = models.IntegerField(_('delta'), help_text='Counter change')
+
+    class Meta:
+        indexes = [models.Index(fields=['summary', 'id'])]
+
+
+class ProjectCounters(models.Model):
+    """Denormalized project counters used by the project list instead of per-project subqueries.
+    Single task / annotation / prediction changes are appended as ProjectCountersDelta rows in the same transaction,
+    readers add pending deltas to the row and writers compact them into it in bulk.
+    Annotation deltas are derived from the changed annotation fields, finished tasks from is_labeled recounts.
+    Bulk operations recalculate the row on commit, reconcile_project_counters command repairs drift.
+    """
+
+    project = models.OneToOneField(Project, primary_key=True, on_delete=models.CASCADE, related_name='counters')
+    task_number = models.IntegerField(_('task number'), default=0, help_text='Total task number in project')
+    finished_task_number = models.IntegerField(
+        _('finished task number'), default=0, help_text='Finished tasks (is_labeled=True) in project'
+    )
+    total_predictions_number = models.IntegerField(
+        _('total predictions number'), default=0, help_text='Total predictions number in project'
+    )
+    total_annotations_number = models.IntegerField(
+        _('total annotations number'), default=0, help_text='Total not cancelled annotations number in project'
+    )
+    num_tasks_with_annotations = models.IntegerField(
+        _('tasks with annotations number'), default=0, help_text='Tasks with at least one useful annotation'
+    )
+    useful_annotation_number = models.IntegerField(
+        _('useful annotation number'),
+        default=0,
+        help_text='Not cancelled, not ground truth annotations with result in project',
+    )
+    ground_truth_number = models.IntegerField(
+        _('ground truth number'), default=0, help_text='Ground truth annotations number in project'
+    )
+    skipped_annotations_number = models.IntegerField(
+        _('skipped annotations number'), default=0, help_text='Cancelled (skipped) annotations number in project'
+    )
+    updated_at = models.DateTimeField(_('updated at'), auto_now=True)
+
+    @classmethod
+    def increment(cls, project_id, **deltas):
+        """Add deltas to project counters, e.g. increment(project_id, task_number=1).
+        They are appended as ProjectCountersDelta rows without locking the counters row
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas or project_id is None or not settings.PROJECT_COUNTERS_ENABLED:
+            return
+        ProjectCountersDelta.objects.bulk_create(
+            [ProjectCountersDelta(project_id=project_id, field=field, delta=delta) for field, delta in deltas.items()]
         )
+        threshold = max(settings.PROJECT_COUNTERS_COMPACT_THRESHOLD, 1)
+        pending = ProjectCountersDelta.objects.filter(project_id=project_id).order_by('id').values('id')
+        if pending[threshold - 1 : threshold].exists():
+            cls.compact(project_id)
 
-        if not remove_all_annotations:
-            for annotation in annotations:
-                results = get_attr_or_item(annotation, 'result') or []
-                if not isinstance(results, list):
-                    continue
+    @classmethod
+    def compact(cls, project_id):
+        """Fold pending deltas into the counters row and delete them"""
+        with transaction.atomic():
+            if not cls.objects.select_for_update().filter(project_id=project_id).exists():
+                return
+            pending = list(
+                ProjectCountersDelta.objects.filter(project_id=project_id)
+                .order_by('id')
+                .values_list('id', 'field', 'delta')
+            )
+            totals = Counter()
+            for _delta_id, field, delta in pending:
+                totals[field] += delta
+            updates = {field: F(field) + delta for field, delta in totals.items() if delta}
+            if updates:
+                cls.objects.filter(project_id=project_id).update(updated_at=now(), **updates)
+            # delete exactly the folded rows, deltas committed meanwhile stay pending
+            ids = [delta[0] for delta in pending]
+            for i in range(0, len(ids), settings.BATCH_SIZE):
+                ProjectCountersDelta.objects.filter(id__in=ids[i : i + settings.BATCH_SIZE]).delete()
+        logger.debug(f'Compacted {len(pending)} counters deltas for project {project_id}')
 
-                for result in results:
-                    # reduce annotation counters
-                    key = self._get_annotation_key(result)
-                    if key in created_annotations:
-                        created_annotations[key] -= 1
-                        if created_annotations[key] == 0:
-                            created_annotations.pop(key)
-
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in created_labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in created_labels[from_name]:
-                            created_labels[from_name][label] -= 1
-                            if created_labels[from_name][label] == 0:
-                                created_labels[from_name].pop(label)
-                    if not created_labels[from_name]:
-                        created_labels.pop(from_name)
-
-        logger.debug(f'summary.created_annotations = {created_annotations}')
-        logger.debug(f'summary.created_labels = {created_labels}')
-        self.created_annotations = created_annotations
-        self.created_labels = created_labels
-        self.save(update_fields=['created_annotations', 'created_labels'])
+    @staticmethod
+    def pending_deltas_sum(field, project_ref='pk'):
+        """Sum of pending deltas of the counter field for the outer project"""
+        deltas = (
+            ProjectCountersDelta.objects.filter(project=OuterRef(project_ref), field=field)
+            .values('project')
+            .annotate(total=Sum('delta'))
+            .values('total')
+        )
+        return Coalesce(Subquery(deltas, output_field=models.IntegerField()), Value(0))
 
-    def update_created_labels_drafts(self, drafts):
-        labels = dict(self.created_labels_drafts)
-        for draft in drafts:
-            results = get_attr_or_item(draft, 'result') or []
-            if not isinstance(results, list):
-                continue
+    @classmethod
+    def annotate_projects(cls, queryset, fields=None):
+        """Annotate projects with stored counters plus pending deltas, zeros for projects without the counters row"""
+        fields = ProjectManager.COUNTER_FIELDS if fields is None else fields
+        return queryset.annotate(
+            **{field: Coalesce(F(f'counters__{field}'), Value(0)) + cls.pending_deltas_sum(field) for field in fields}
+        )
 
-            for result in results:
-                if 'from_name' not in result:
+    @classmethod
+    def reset(cls, project_id):
+        """All project tasks are deleted"""
+        with transaction.atomic():
+            cls.objects.filter(project_id=project_id).update(
+                updated_at=now(), **dict.fromkeys(ProjectManager.COUNTER_FIELDS, 0)
+            )
+            ProjectCountersDelta.objects.filter(project_id=project_id).delete()
+
+    @classmethod
+    def recalculate(cls, project_ids):
+        """Recount counters from scratch for the given projects, pending deltas are replaced by the recount"""
+        for project_id in project_ids:
+            with transaction.atomic():
+                last_delta_id = ProjectCountersDelta.objects.filter(project_id=project_id).aggregate(
+                    last_id=Max('id')
+                )['last_id']
+                projects = ProjectManager.with_counts_annotate(Project.objects.filter(id=project_id), live=True)
+                counters = projects.values(*ProjectManager.COUNTER_FIELDS).first()
+                if counters is None:
                     continue
-                from_name = result['from_name']
+                cls.objects.update_or_create(project_id=project_id, defaults=counters)
+                if last_delta_id is not None:
+                    ProjectCountersDelta.objects.filter(project_id=project_id, id__lte=last_delta_id).delete()
 
-                # aggregate labels
-                if from_name not in self.created_labels_drafts:
-                    labels[from_name] = dict()
+    @classmethod
+    def recalculate_on_commit(cls, project_id):
+        """Bulk operations can't be tracked as deltas, recount the project when the transaction is committed"""
+        if project_id is None or not settings.PROJECT_COUNTERS_ENABLED:
+            return
+        transaction.on_commit(lambda: cls.recalculate([project_id]))
 
-                for label in self._get_labels(result):
-                    labels[from_name][label] = labels[from_name].get(label, 0) + 1
+    @staticmethod
+    def get_task_contribution(task_id, lock=False):
+        """Values a single task adds to its project counters, zeros if the task doesn't exist
 
-        logger.debug(f'update summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+        :param lock: lock the task row with select_for_update until the end of the transaction
+        """
+        contribution = dict.fromkeys(ProjectManager.COUNTER_FIELDS, 0)
+        if task_id is None:
+            return contribution
+
+        annotations = Annotation.objects.filter(task=OuterRef('id'))
+        tasks = Task.objects.filter(id=task_id)
+        if lock:
+            tasks = tasks.select_for_update()
+        task = (
+            tasks.annotate(
+                predictions_number=SQCount(Prediction.objects.filter(task=OuterRef('id')).values('id')),
+                annotations_number=SQCount(annotations.filter(was_cancelled=False).values('id')),
+                useful_number=SQCount(
+                    annotations.filter(was_cancelled=False, ground_truth=False, result__isnull=False).values('id')
+                ),
+                ground_truth_number=SQCount(annotations.filter(ground_truth=True).values('id')),
+                skipped_number=SQCount(annotations.filter(was_cancelled=True).values('id')),
+            )
+            .values(
+                'is_labeled',
+                'predictions_number',
+                'annotations_number',
+                'useful_number',
+                'ground_truth_number',
+                'skipped_number',
+            )
+            .first()
+        )
+        if task is None:
+            return contribution
+
+        contribution.update(
+            task_number=1,
+            finished_task_number=int(task['is_labeled']),
+            total_predictions_number=task['predictions_number'],
+            total_annotations_number=task['annotations_number'],
+            num_tasks_with_annotations=int(task['useful_number'] > 0),
+            useful_annotation_number=task['useful_number'],
+            ground_truth_number=task['ground_truth_number'],
+            skipped_annotations_number=task['skipped_number'],
+        )
+        return contribution
 
-    def remove_created_drafts_and_labels(self, drafts):
-        # we are going to remove all drafts, so we'll reset the corresponding field on the summary
-        remove_all_drafts = AnnotationDraft.objects.filter(task__project=self.project).count() == len(drafts)
-        labels = {} if remove_all_drafts else dict(self.created_labels_drafts)
+    @classmethod
+    @contextmanager
+    def track_task(cls, task_id, project_id):
+        """Apply changes of the task contribution made inside the block to project counters as deltas.
+        It's used for task deletion: the task row stays locked from the first read until the transaction ends,
+        so concurrent blocks for the same task run one after another
+        """
+        if task_id is None or not settings.PROJECT_COUNTERS_ENABLED:
+            yield
+            return
+        with transaction.atomic(savepoint=False):
+            before = cls.get_task_contribution(task_id, lock=True)
+            yield
+            after = cls.get_task_contribution(task_id)
+            cls.increment(project_id, **{field: after[field] - before[field] for field in after})
 
-        if not remove_all_drafts:
-            for draft in drafts:
-                results = get_attr_or_item(draft, 'result') or []
-                if not isinstance(results, list):
-                    continue
+    ANNOTATION_COUNTER_FIELDS = (
+        'total_annotations_number',
+        'useful_annotation_number',
+        'ground_truth_number',
+        'skipped_annotations_number',
+    )
 
-                for result in results:
-                    # reduce labels counters
-                    from_name = result.get('from_name', None)
-                    if from_name not in labels:
-                        continue
-                    for label in self._get_labels(result):
-                        label = str(label)
-                        if label in labels[from_name]:
-                            labels[from_name][label] -= 1
-                            if labels[from_name][label] == 0:
-                                labels[from_name].pop(label)
-                    if not labels[from_name]:
-                        labels.pop(from_name)
-        logger.debug(f'summary.created_labels_drafts = {labels}')
-        self.created_labels_drafts = labels
-        self.save(update_fields=['created_labels_drafts'])
+    @staticmethod
+    def get_annotation_contribution(was_cancelled, ground_truth, has_result):
+        """Values a single annotation adds to its project counters"""
+        return dict(
+            total_annotations_number=int(not was_cancelled),
+            useful_annotation_number=int(not was_cancelled and not ground_truth and has_result),
+            ground_truth_number=int(ground_truth),
+            skipped_annotations_number=int(was_cancelled),
+        )
+
+    @classmethod
+    @contextmanager
+    def track_annotation(cls, annotation, deleted=False):
+        """Apply the change of the annotation made inside the block to project counters as deltas
+        derived from its stored and new fields, without task level reads or locks.
+        The task is counted in num_tasks_with_annotations when its first useful annotation appears,
+        finished_task_number follows is_labeled recounts in tasks.functions.update_task_counters()
+        """
+        if annotation.task_id is None or not settings.PROJECT_COUNTERS_ENABLED:
+            yield
+            return
+
+        zeros = dict.fromkeys(cls.ANNOTATION_COUNTER_FIELDS, 0)
+        before = zeros
+        if not annotation._state.adding:
+            stored = (
+                Annotation.objects.filter(pk=annotation.pk)
+                .annotate(has_result=ExpressionWrapper(Q(result__isnull=False), output_field=BooleanField()))
+                .values_list('was_cancelled', 'ground_truth', 'has_result')
+                .first()
+            )
+            if stored is not None:
+                before = cls.get_annotation_contribution(*stored)
+        yield
+        after = (
+            zeros
+            if deleted
+            else cls.get_annotation_contribution(
+                annotation.was_cancelled, annotation.ground_truth, annotation.result is not None
+            )
+        )
+        deltas = {field: after[field] - before[field] for field in after}
+        useful_delta = deltas['useful_annotation_number']
+        if useful_delta:
+            other_useful = Annotation.objects.filter(
+                task_id=annotation.task_id, was_cancelled=False, ground_truth=False, result__isnull=False
+            ).exclude(pk=annotation.pk)
+            if not other_useful.exists():
+                deltas['num_tasks_with_annotations'] = useful_delta
+        cls.increment(annotation.project_id, **deltas)
+
+
+class ProjectCountersDelta(models.Model):
+    """Pending +/- changes of ProjectCounters fields, appended by single task, annotation and prediction writers
+    without locking the counters row
+    """
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='counters_deltas')
+    field = models.CharField(_('field'), max_length=32, help_text='ProjectCounters counter field')
+    delta = models.IntegerField(_('delta'), help_text='Counter change')
+
+    class Meta:
+        indexes = [models.Index(fields=['project', 'id'])]
 
 
 class ProjectImport(models.Model):
@@ -233,6 +233,10 @@ class ProjectSummarySerializer(serializers.ModelSerializer):
         model = ProjectSummary
         fields = '__all__'
 
+    def to_representation(self, instance):
+        instance.fold_pending_deltas()
+        return super().to_representation(instance)
+
 
 class ProjectImportSerializer(serializers.ModelSerializer):
     class Meta:
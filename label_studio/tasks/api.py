@@ -9,7 +9,7 @@ from core.permissions import ViewClassPermission, all_permissions
 from core.utils.common import DjangoFilterDescriptionInspector
 from core.utils.params import bool_from_request
 from data_manager.api import TaskListAPI as DMTaskListAPI
-from data_manager.functions import evaluate_predictions
+from data_manager.functions import warm_predictions
 from data_manager.models import PrepareParams
 from data_manager.serializers import DataManagerTaskSerializer
 from django.db import transaction
@@ -109,6 +109,14 @@ logger = logging.getLogger(__name__)
                 in_=openapi.IN_QUERY,
                 description='Get tasks for review',
             ),
+            openapi.Parameter(
+                name='cursor',
+                type=openapi.TYPE_STRING,
+                in_=openapi.IN_QUERY,
+                description='Use cursor (keyset) pagination instead of page numbers: pass an empty value for the '
+                'first page and the `cursor` value from the previous response for the next pages. '
+                'Totals are not calculated in this mode, use `/api/dm/totals/` to get them.',
+            ),
             openapi.Parameter(
                 name='include',
                 type=openapi.TYPE_STRING,
@@ -295,12 +303,12 @@ class TaskAPI(generics.RetrieveUpdateDestroyAPIView):
         context = self.get_retrieve_serializer_context(request)
         context['project'] = project = self.task.project
 
-        # get prediction
+        # get prediction, it's retrieved in background and the task is returned with predictions that exist now
         if (
             project.evaluate_predictions_automatically or project.show_collab_predictions
-        ) and not self.task.predictions.exists():
-            evaluate_predictions([self.task])
-            self.task.refresh_from_db()
+        ) and not self.task.predictions.all():
+            if warm_predictions(project, [self.task.id]):
+                self.task.refresh_from_db()
 
         serializer = self.get_serializer_class()(
             self.task, many=False, context=context, expand=['annotations.completed_by']
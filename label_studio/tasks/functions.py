@@ -3,21 +3,35 @@ import logging
 import os
 import shutil
 import sys
+import threading
+from contextlib import contextmanager
 
 from core.bulk_update_utils import bulk_update
 from core.models import AsyncMigrationStatus
-from core.redis import start_job_async_or_sync
+from core.redis import redis_connected, start_job_async_or_sync
 from core.utils.common import batch
+from core.utils.db import SQCount
 from data_export.mixins import ExportMixin
 from data_export.models import DataExport
 from data_export.serializers import ExportDataSerializer
 from data_manager.managers import TaskQuerySet
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, F, OuterRef, Q
+from django.db.models.lookups import GreaterThanOrEqual
+from django.utils.timezone import now
 from organizations.models import Organization
-from projects.models import Project
-from tasks.models import Annotation, Prediction, Task
+from projects.models import Project, ProjectCounters
+from tasks.mixins import TaskMixin as BaseTaskMixin
+from tasks.models import (
+    Annotation,
+    Prediction,
+    Q_finished_annotations,
+    Task,
+    TaskAggregates,
+    TaskLock,
+    refresh_task_derived_data,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -198,6 +212,9 @@ def update_tasks_counters(queryset, from_scratch=True):
             Q(total_annotations__gt=0) | Q(cancelled_annotations__gt=0) | Q(total_predictions__gt=0)
         )
 
+    # bulk imports create annotations and predictions without signals, so search documents and aggregates are built here
+    refresh_task_derived_data(queryset.values_list('id', flat=True))
+
     # filter our tasks with 0 annotations and 0 predictions and update them with 0
     queryset.filter(annotations__isnull=True, predictions__isnull=True).update(
         total_annotations=0, cancelled_annotations=0, total_predictions=0
@@ -223,3 +240,166 @@ def update_tasks_counters(queryset, from_scratch=True):
             batch_size=settings.BATCH_SIZE,
         )
     return len(objs)
+
+
+_task_counters_state = threading.local()
+
+
+@contextmanager
+def coalesce_task_counters():
+    """
+    Collect tasks marked by annotation and prediction signals inside the block
+    and recount their counters once, when the outermost block exits
+    """
+    depth = getattr(_task_counters_state, 'depth', 0)
+    if depth == 0:
+        _task_counters_state.dirty = {}
+        _task_counters_state.aggregates = set()
+    _task_counters_state.depth = depth + 1
+    try:
+        yield
+    finally:
+        _task_counters_state.depth = depth
+    if depth == 0:
+        dirty, _task_counters_state.dirty = _task_counters_state.dirty, {}
+        aggregates, _task_counters_state.aggregates = _task_counters_state.aggregates, set()
+        if dirty:
+            update_task_counters(dirty, track_finished=settings.PROJECT_COUNTERS_ENABLED)
+        # tasks with changed drafts only, recounted tasks have their aggregates refreshed already
+        TaskAggregates.refresh(aggregates.difference(dirty))
+
+
+def mark_task_counters_dirty(task_ids, project_id=None):
+    """
+    Recount counters of the tasks at the end of the current coalesce_task_counters() block,
+    otherwise once when the current transaction is committed, or right away in autocommit mode
+    :param task_ids: Task ids with changed annotations or predictions
+    :param project_id: Project of the tasks, it's used to keep ProjectCounters.finished_task_number in sync
+    :return: True if counters are updated right away
+    """
+    if getattr(_task_counters_state, 'depth', 0):
+        _task_counters_state.dirty.update(dict.fromkeys(task_ids, project_id))
+        return False
+    if settings.TASK_COUNTERS_FLUSH_ON_COMMIT and transaction.get_connection().in_atomic_block:
+        if not getattr(_task_counters_state, 'pending', None):
+            _task_counters_state.pending = {}
+        _task_counters_state.pending.update(dict.fromkeys(task_ids, project_id))
+        # every save registers the flush, so ids left by a rolled back transaction are recounted with the next one,
+        # the first callback recounts all pending tasks and the rest find nothing to do
+        transaction.on_commit(flush_task_counters)
+        return False
+    update_task_counters(dict.fromkeys(task_ids, project_id), track_finished=settings.PROJECT_COUNTERS_ENABLED)
+    return True
+
+
+def flush_task_counters():
+    """Recount tasks marked dirty in the committed transaction with one UPDATE per batch"""
+    pending = getattr(_task_counters_state, 'pending', None)
+    if not pending:
+        return
+    _task_counters_state.pending = {}
+    update_task_counters(pending, track_finished=settings.PROJECT_COUNTERS_ENABLED)
+
+
+def mark_task_aggregates_dirty(task_ids):
+    """
+    Refresh data manager aggregates of the tasks at the end of the current coalesce_task_counters() block,
+    or right away outside of a block. It's used for changes that don't touch task counters, like drafts
+    :param task_ids: Task ids with changed drafts
+    """
+    if getattr(_task_counters_state, 'depth', 0):
+        _task_counters_state.aggregates.update(task_ids)
+        return
+    TaskAggregates.refresh(task_ids)
+
+
+def is_labeled_computed_in_sql():
+    """TASK_MIXIN can override the is_labeled rule, then it's applied per task with Task.update_is_labeled()"""
+    return (
+        Task.update_is_labeled is BaseTaskMixin.update_is_labeled
+        and Task._get_is_labeled_value is BaseTaskMixin._get_is_labeled_value
+    )
+
+
+def update_task_counters(task_ids, track_finished=False):
+    """
+    Recount total_annotations, cancelled_annotations, total_predictions and is_labeled
+    with a single UPDATE per batch of tasks and rebuild their search documents and aggregates.
+    is_labeled is a part of the UPDATE for the default rule only, see is_labeled_computed_in_sql()
+    :param task_ids: Task ids to update, a dict {task_id: project_id} is accepted too
+    :param track_finished: Apply is_labeled changes to ProjectCounters.finished_task_number
+    :return: Count of updated tasks
+    """
+    annotations = Annotation.objects.filter(task=OuterRef('id'))
+    counters = dict(
+        total_annotations=SQCount(annotations.filter(was_cancelled=False).values('id')),
+        cancelled_annotations=SQCount(annotations.filter(was_cancelled=True).values('id')),
+        total_predictions=SQCount(Prediction.objects.filter(task=OuterRef('id')).values('id')),
+    )
+    is_labeled_in_sql = is_labeled_computed_in_sql()
+    if is_labeled_in_sql:
+        # the same as Task.completed_annotations, skipped annotations count as completed with IGNORE_SKIPPED
+        completed = annotations.filter(
+            Q_finished_annotations | Q(project__skip_queue=Project.SkipQueue.IGNORE_SKIPPED)
+        )
+        counters['is_labeled'] = GreaterThanOrEqual(SQCount(completed.values('id')), F('overlap'))
+
+    updated = 0
+    for ids in batch(sorted(task_ids), settings.BATCH_SIZE):
+        queryset = Task.objects.filter(id__in=ids)
+        finished_before = set(queryset.filter(is_labeled=True).values_list('id', flat=True)) if track_finished else ()
+        updated += queryset.update(**counters)
+        if not is_labeled_in_sql:
+            tasks = list(queryset.select_related('project'))
+            for task in tasks:
+                task.update_is_labeled()
+            bulk_update(tasks, update_fields=['is_labeled'], batch_size=settings.BATCH_SIZE)
+        Task.post_process_bulk_update_stats(queryset)
+        refresh_task_derived_data(ids)
+        if track_finished:
+            finished_after = set(queryset.filter(is_labeled=True).values_list('id', flat=True))
+            finished_deltas = {}
+            for task_id in finished_after ^ finished_before:
+                project_id = task_ids[task_id]
+                finished_deltas[project_id] = finished_deltas.get(project_id, 0) + (
+                    1 if task_id in finished_after else -1
+                )
+            for project_id, delta in finished_deltas.items():
+                ProjectCounters.increment(project_id, finished_task_number=delta)
+    return updated
+
+
+def sweep_expired_task_locks(batch_size=None):
+    """
+    Delete expired task locks in batches, so the request path doesn't need to clean them up
+    :param batch_size: Number of locks deleted in one query, TASK_LOCK_SWEEP_BATCH_SIZE by default
+    :return: Dict with number of swept locks and lock table size after the sweep
+    """
+    batch_size = batch_size or settings.TASK_LOCK_SWEEP_BATCH_SIZE
+    swept = 0
+    while True:
+        lock_ids = list(TaskLock.objects.filter(expire_at__lt=now()).values_list('id', flat=True)[:batch_size])
+        if not lock_ids:
+            break
+        swept += TaskLock.objects.filter(id__in=lock_ids).delete()[0]
+        if len(lock_ids) < batch_size:
+            break
+
+    total = TaskLock.objects.count()
+    logger.info(
+        f'Task lock sweeper deleted {swept} expired locks, {total} locks left',
+        extra={'task_locks_swept': swept, 'task_locks_total': total},
+    )
+    return {'swept': swept, 'total': total}
+
+
+def sweep_expired_task_locks_job():
+    """Periodic rq job: sweep expired task locks and schedule the next run in TASK_LOCK_SWEEP_INTERVAL seconds"""
+    try:
+        sweep_expired_task_locks()
+    finally:
+        # without redis start_job_async_or_sync runs the job inline, so don't reschedule
+        if settings.TASK_LOCK_SWEEP_INTERVAL and redis_connected():
+            start_job_async_or_sync(
+                sweep_expired_task_locks_job, in_seconds=settings.TASK_LOCK_SWEEP_INTERVAL, queue_name='low'
+            )
@@ -0,0 +1,30 @@
+from core.redis import redis_connected, start_job_async_or_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from tasks.functions import sweep_expired_task_locks, sweep_expired_task_locks_job
+
+
+class Command(BaseCommand):
+    help = 'Delete expired task locks in batches (run it by cron or use --schedule to start the periodic rq job)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='number of locks deleted in one query')
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='schedule the periodic rq job every TASK_LOCK_SWEEP_INTERVAL seconds '
+            '(rq worker must run with --with-scheduler)',
+        )
+
+    def handle(self, *args, **options):
+        if options['schedule']:
+            if not settings.TASK_LOCK_SWEEP_INTERVAL:
+                raise CommandError('TASK_LOCK_SWEEP_INTERVAL must be set to schedule the sweeper')
+            if not redis_connected():
+                raise CommandError('Redis is not connected, run this command by cron instead')
+            start_job_async_or_sync(sweep_expired_task_locks_job, queue_name='low')
+            self.stdout.write(f'Task lock sweeper is scheduled every {settings.TASK_LOCK_SWEEP_INTERVAL} seconds')
+            return
+
+        stats = sweep_expired_task_locks(options['batch_size'])
+        self.stdout.write(f"Swept {stats['swept']} expired task locks, {stats['total']} locks left")
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 21:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0050_alter_predictionmeta_failed_prediction_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tasklock',
+            index=models.Index(fields=['task', 'expire_at'], name='tasks_taskl_task_id_377dd4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tasklock',
+            index=models.Index(fields=['expire_at'], name='tasks_taskl_expire__9122ba_idx'),
+        ),
+    ]
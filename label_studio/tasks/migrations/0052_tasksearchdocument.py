@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0030_projectsummary_data_column_types'),
+        ('tasks', '0051_tasklock_expire_at_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskSearchDocument',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='tasks.task')),
+                ('annotations_text', models.TextField(default='', help_text='Label values, choices and texts of task annotations', verbose_name='annotations text')),
+                ('predictions_text', models.TextField(default='', help_text='Label values, choices and texts of task predictions', verbose_name='predictions text')),
+                ('project', models.ForeignKey(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, related_name='task_search_documents', to='projects.project')),
+            ],
+            options={
+                'db_table': 'task_search_document',
+            },
+        ),
+    ]
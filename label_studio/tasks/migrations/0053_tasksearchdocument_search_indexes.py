@@ -0,0 +1,70 @@
+import logging
+
+from core.redis import start_job_async_or_sync
+from core.utils.common import btree_gin_migration_operations
+from django.db import migrations
+from django.db.utils import OperationalError
+
+logger = logging.getLogger(__name__)
+
+SQLITE_FTS_OPERATIONS = [
+    "create virtual table if not exists task_search_document_fts using fts5("
+    "annotations_text, predictions_text, content='task_search_document', content_rowid='task_id', "
+    "tokenize='trigram');",
+    "create trigger if not exists task_search_document_fts_insert after insert on task_search_document begin "
+    "insert into task_search_document_fts(rowid, annotations_text, predictions_text) "
+    "values (new.task_id, new.annotations_text, new.predictions_text); end;",
+    "create trigger if not exists task_search_document_fts_delete after delete on task_search_document begin "
+    "insert into task_search_document_fts(task_search_document_fts, rowid, annotations_text, predictions_text) "
+    "values ('delete', old.task_id, old.annotations_text, old.predictions_text); end;",
+    "create trigger if not exists task_search_document_fts_update after update on task_search_document begin "
+    "insert into task_search_document_fts(task_search_document_fts, rowid, annotations_text, predictions_text) "
+    "values ('delete', old.task_id, old.annotations_text, old.predictions_text); "
+    "insert into task_search_document_fts(rowid, annotations_text, predictions_text) "
+    "values (new.task_id, new.annotations_text, new.predictions_text); end;",
+]
+
+
+def async_index_creation():
+    from django.db import connection
+    with connection.schema_editor(atomic=False) as schema_editor:
+        for field in ('annotations_text', 'predictions_text'):
+            schema_editor.execute(
+                f'create index concurrently if not exists task_search_document_{field}_gin '
+                f'on task_search_document using gin (project_id, {field} gin_trgm_ops);'
+            )
+
+
+def forwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor.startswith('postgres'):
+        start_job_async_or_sync(async_index_creation)
+    elif vendor == 'sqlite':
+        try:
+            for sql in SQLITE_FTS_OPERATIONS:
+                schema_editor.execute(sql)
+        except OperationalError as exc:
+            # FTS5 with trigram tokenizer requires SQLite 3.34+, filters search the documents table without it
+            logger.warning(f'Skipping task search documents FTS table: {exc}')
+    else:
+        logger.info('Database vendor: {}'.format(vendor))
+        logger.info('Skipping task search documents indexes')
+
+
+def backwards(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor.startswith('postgres'):
+        for field in ('annotations_text', 'predictions_text'):
+            schema_editor.execute(f'drop index if exists task_search_document_{field}_gin;')
+    elif vendor == 'sqlite':
+        for action in ('insert', 'delete', 'update'):
+            schema_editor.execute(f'drop trigger if exists task_search_document_fts_{action};')
+        schema_editor.execute('drop table if exists task_search_document_fts;')
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [('tasks', '0052_tasksearchdocument')]
+
+    operations = btree_gin_migration_operations(migrations.RunPython(forwards, backwards))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0031_projectsummary_search_documents_ready'),
+        ('tasks', '0053_tasksearchdocument_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAggregates',
+            fields=[
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aggregates', serialize=False, to='tasks.task')),
+                ('annotators', models.JSONField(default=list, help_text='Users who annotated or skipped the task', verbose_name='annotators')),
+                ('annotations_ids', models.JSONField(default=list, help_text='Annotation ids of the task', verbose_name='annotations ids')),
+                ('predictions_model_versions', models.JSONField(default=list, help_text='Model versions of task predictions', verbose_name='predictions model versions')),
+                ('avg_lead_time', models.FloatField(help_text='Average lead time of task annotations', null=True, verbose_name='average lead time')),
+                ('last_annotation_created_at', models.DateTimeField(help_text='Creation time of the newest task annotation', null=True, verbose_name='last annotation created at')),
+                ('draft_exists', models.BooleanField(default=False, help_text='Task has annotation drafts', verbose_name='draft exists')),
+                ('project', models.ForeignKey(help_text='Project ID', on_delete=django.db.models.deletion.CASCADE, related_name='task_aggregates', to='projects.project')),
+            ],
+            options={
+                'db_table': 'task_aggregates',
+            },
+        ),
+    ]
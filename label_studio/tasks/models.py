@@ -8,6 +8,7 @@ import os
 import random
 import traceback
 import uuid
+from collections import defaultdict
 from typing import Any, Mapping, Optional, Union, cast
 from urllib.parse import urljoin
 
@@ -18,6 +19,7 @@ from core.feature_flags import flag_set
 from core.label_config import SINGLE_VALUED_TAGS
 from core.redis import start_job_async_or_sync
 from core.utils.common import (
+    batch,
     find_first_one_to_one_related_field_by_prefix,
     load_func,
     string_is_url,
@@ -31,7 +33,7 @@ from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.files.storage import default_storage
 from django.db import OperationalError, models, transaction
-from django.db.models import CheckConstraint, JSONField, Q
+from django.db.models import CheckConstraint, Exists, JSONField, OuterRef, Q
 from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import Signal, receiver
 from django.urls import reverse
@@ -349,6 +351,9 @@ class Task(TaskMixin, models.Model):
         return mixin_has_permission and self.project.has_permission(user)
 
     def clear_expired_locks(self):
+        # the background sweeper deletes expired locks when it's enabled, keep the request path clean
+        if settings.TASK_LOCK_SWEEP_INTERVAL:
+            return
         self.locks.filter(expire_at__lt=now()).delete()
 
     def set_lock(self, user):
@@ -415,9 +420,11 @@ class Task(TaskMixin, models.Model):
             storage = get_storage_by_url(url, storage_objects)
 
         if storage:
+            http_url, max_age = storage.generate_http_url_cached(url)
             return {
-                'url': storage.generate_http_url(url),
+                'url': http_url,
                 'presign_ttl': storage.presign_ttl,
+                'max_age': max_age,
             }
 
     def resolve_uri(self, task_data, project):
@@ -519,6 +526,8 @@ class Task(TaskMixin, models.Model):
         self.annotations.exclude(id=annotation_id).update(ground_truth=False)
 
     def save(self, *args, update_fields=None, **kwargs):
+        from projects.models import ProjectCounters
+
         if flag_set('ff_back_2070_inner_id_12052022_short', AnonymousUser):
             if self.inner_id == 0:
                 task = Task.objects.filter(project=self.project).order_by('-inner_id').first()
@@ -531,7 +540,10 @@ class Task(TaskMixin, models.Model):
                 if update_fields is not None:
                     update_fields = {'inner_id'}.union(update_fields)
 
+        created = self._state.adding
         super().save(*args, update_fields=update_fields, **kwargs)
+        if created:
+            ProjectCounters.increment(self.project_id, task_number=1, finished_task_number=int(self.is_labeled))
 
     @staticmethod
     def delete_tasks_without_signals(queryset):
@@ -543,7 +555,9 @@ class Task(TaskMixin, models.Model):
             (post_delete, update_all_task_states_after_deleting_task, Task),
             (pre_delete, remove_data_columns, Task),
         ]
-        with temporary_disconnect_list_signal(signals):
+        from tasks.functions import coalesce_task_counters
+
+        with temporary_disconnect_list_signal(signals), coalesce_task_counters():
             queryset.delete()
 
     @staticmethod
@@ -552,8 +566,13 @@ class Task(TaskMixin, models.Model):
         Task.delete_tasks_without_signals(queryset)
 
     def delete(self, *args, **kwargs):
+        from projects.models import ProjectCounters
+        from tasks.functions import coalesce_task_counters
+
         self.before_delete_actions()
-        result = super().delete(*args, **kwargs)
+        # derived task data is refreshed after the cascade, so it isn't recreated for the deleted task
+        with ProjectCounters.track_task(self.id, self.project_id), coalesce_task_counters():
+            result = super().delete(*args, **kwargs)
         # set updated_at field of task to now()
         return result
 
@@ -747,36 +766,32 @@ class Annotation(AnnotationMixin, models.Model):
         self.task.save(update_fields=update_fields)
 
     def save(self, *args, update_fields=None, **kwargs):
+        from projects.models import ProjectCounters
+
         request = get_current_request()
         if request:
             self.updated_by = request.user
             if update_fields is not None:
                 update_fields = {'updated_by'}.union(update_fields)
-        result = super().save(*args, update_fields=update_fields, **kwargs)
+        with ProjectCounters.track_annotation(self):
+            result = super().save(*args, update_fields=update_fields, **kwargs)
         self.update_task()
         return result
 
     def delete(self, *args, **kwargs):
-        result = super().delete(*args, **kwargs)
-        self.update_task()
-        self.on_delete_update_counters()
+        from data_manager.functions import bump_project_data_version
+        from projects.models import ProjectCounters
+
+        with ProjectCounters.track_annotation(self, deleted=True):
+            result = super().delete(*args, **kwargs)
+            self.update_task()
+            self.on_delete_update_counters()
+        bump_project_data_version(self.project_id)
         return result
 
     def on_delete_update_counters(self):
-        task = self.task
-        logger.debug(f'Start updating counters for task {task.id}.')
-        if self.was_cancelled:
-            cancelled = task.annotations.all().filter(was_cancelled=True).count()
-            Task.objects.filter(id=task.id).update(cancelled_annotations=cancelled)
-            logger.debug(f'On delete updated cancelled_annotations for task {task.id}')
-        else:
-            total = task.annotations.all().filter(was_cancelled=False).count()
-            Task.objects.filter(id=task.id).update(total_annotations=total)
-            logger.debug(f'On delete updated total_annotations for task {task.id}')
-
-        logger.debug(f'Update task stats for task={task}')
-        task.update_is_labeled()
-        Task.objects.filter(id=task.id).update(is_labeled=task.is_labeled)
+        logger.debug(f'Start updating counters for task {self.task_id}.')
+        update_counters_of_task(self)
 
         # remove annotation counters in project summary followed by deleting an annotation
         logger.debug('Remove annotation counters in project summary followed by deleting an annotation')
@@ -799,6 +814,14 @@ class TaskLock(models.Model):
         help_text='User who locked this task',
     )
 
+    class Meta:
+        indexes = [
+            # lock checks filter task locks by expiration
+            models.Index(fields=['task', 'expire_at']),
+            # the sweeper looks for expired locks across all tasks
+            models.Index(fields=['expire_at']),
+        ]
+
 
 class AnnotationDraft(models.Model):
     result = JSONField(_('result'), help_text='Draft result in JSON format')
@@ -990,6 +1013,8 @@ class Prediction(models.Model):
         self.task.save(update_fields=update_fields)
 
     def save(self, *args, update_fields=None, **kwargs):
+        from projects.models import ProjectCounters
+
         if self.project_id is None and self.task_id:
             logger.warning('project_id is not set for prediction, project_id being set in save method')
             self.project_id = Task.objects.only('project_id').get(pk=self.task_id).project_id
@@ -1008,12 +1033,21 @@ class Prediction(models.Model):
             update_fields = {'result'}.union(update_fields)
         # set updated_at field of task to now()
         self.update_task()
-        return super(Prediction, self).save(*args, update_fields=update_fields, **kwargs)
+        created = self._state.adding
+        result = super(Prediction, self).save(*args, update_fields=update_fields, **kwargs)
+        if created:
+            ProjectCounters.increment(self.project_id, total_predictions_number=1)
+        return result
 
     def delete(self, *args, **kwargs):
+        from data_manager.functions import bump_project_data_version
+        from projects.models import ProjectCounters
+
         result = super().delete(*args, **kwargs)
         # set updated_at field of task to now()
         self.update_task()
+        ProjectCounters.increment(self.project_id, total_predictions_number=-1)
+        bump_project_data_version(self.project_id)
         return result
 
     @classmethod
@@ -1206,12 +1240,242 @@ class PredictionMeta(models.Model):
         ]
 
 
+class TaskSearchDocument(models.Model):
+    """Label values of task annotations and predictions flattened into normalized text,
+    data manager filters on annotation and prediction results search them instead of raw result JSON
+    """
+
+    # value keys with searchable strings, besides all *labels keys (labels, rectanglelabels, etc.)
+    SEARCH_VALUE_KEYS = ('choices', 'text', 'taxonomy', 'datetime')
+    # SQLite FTS5 table with trigram index over the document texts, it's created by migrations when available
+    SQLITE_FTS_TABLE = 'task_search_document_fts'
+
+    task = models.OneToOneField(
+        'tasks.Task', on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    project = models.ForeignKey(
+        'projects.Project', on_delete=models.CASCADE, related_name='task_search_documents', help_text='Project ID'
+    )
+    annotations_text = models.TextField(
+        _('annotations text'), default='', help_text='Label values, choices and texts of task annotations'
+    )
+    predictions_text = models.TextField(
+        _('predictions text'), default='', help_text='Label values, choices and texts of task predictions'
+    )
+
+    @classmethod
+    def normalize(cls, text: str) -> str:
+        return text.strip().lower()
+
+    @classmethod
+    def _collect_strings(cls, value, strings):
+        if isinstance(value, str):
+            text = cls.normalize(value)
+            if text:
+                strings.append(text)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                cls._collect_strings(item, strings)
+
+    @classmethod
+    def flatten(cls, results) -> str:
+        """Searchable strings from the annotation or prediction results, one per line
+
+        :param results: list of results, each one is a list of regions like annotation.result
+        :return: normalized text without ids, names and coordinates
+        """
+        strings = []
+        for result in results:
+            if not isinstance(result, list):
+                continue
+            for region in result:
+                value = region.get('value') if isinstance(region, dict) else None
+                if not isinstance(value, dict):
+                    continue
+                for key, item in value.items():
+                    if key in cls.SEARCH_VALUE_KEYS or key.endswith('labels'):
+                        cls._collect_strings(item, strings)
+        return '\n'.join(dict.fromkeys(strings))
+
+    @classmethod
+    def refresh(cls, task_ids):
+        """Rebuild search documents of the tasks from their current annotations and predictions
+
+        :param task_ids: Task ids with changed annotations or predictions
+        """
+        for ids in batch(sorted(task_ids), settings.BATCH_SIZE):
+            cls.refresh_rows(*load_task_derived_rows(ids))
+
+    @classmethod
+    def refresh_rows(cls, tasks, annotations, predictions):
+        """Rebuild search documents from rows loaded by load_task_derived_rows()"""
+        documents, empty = [], []
+        for task in tasks:
+            document = cls(
+                task_id=task['id'],
+                project_id=task['project_id'],
+                annotations_text=cls.flatten(row['result'] for row in annotations[task['id']]),
+                predictions_text=cls.flatten(row['result'] for row in predictions[task['id']]),
+            )
+            if document.annotations_text or document.predictions_text:
+                documents.append(document)
+            else:
+                empty.append(task['id'])
+
+        # tasks without searchable results don't need documents, filters treat them as not matching
+        if empty:
+            cls.objects.filter(task_id__in=empty).delete()
+        cls.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['task'],
+            update_fields=['annotations_text', 'predictions_text'],
+        )
+
+    @classmethod
+    def search(cls, project, field, value):
+        """Subquery with ids of the project tasks whose annotations_text or predictions_text contains the value"""
+        from django.db.models.expressions import RawSQL
+
+        value = cls.normalize(str(value))
+        # trigram index needs 3 characters at least, shorter values are searched in the documents table
+        if settings.DJANGO_DB == settings.DJANGO_DB_SQLITE and len(value) >= 3 and cls.has_sqlite_fts():
+            phrase = '"' + value.replace('"', '""') + '"'
+            return RawSQL(
+                f'SELECT rowid FROM {cls.SQLITE_FTS_TABLE} WHERE {cls.SQLITE_FTS_TABLE} MATCH %s',
+                [f'{field}: {phrase}'],
+            )
+        return cls.objects.filter(project=project, **{f'{field}__contains': value}).values('task_id')
+
+    @classmethod
+    def has_sqlite_fts(cls):
+        if not hasattr(cls, '_has_sqlite_fts'):
+            from django.db import connection
+
+            cls._has_sqlite_fts = cls.SQLITE_FTS_TABLE in connection.introspection.table_names()
+        return cls._has_sqlite_fts
+
+    class Meta:
+        db_table = 'task_search_document'
+
+
+class TaskAggregates(models.Model):
+    """Data manager columns aggregated over task annotations, predictions and drafts,
+    they are refreshed with task counters, so data manager reads them instead of grouping joins on every request
+    """
+
+    task = models.OneToOneField('tasks.Task', on_delete=models.CASCADE, primary_key=True, related_name='aggregates')
+    project = models.ForeignKey(
+        'projects.Project', on_delete=models.CASCADE, related_name='task_aggregates', help_text='Project ID'
+    )
+    annotators = JSONField(_('annotators'), default=list, help_text='Users who annotated or skipped the task')
+    annotations_ids = JSONField(_('annotations ids'), default=list, help_text='Annotation ids of the task')
+    predictions_model_versions = JSONField(
+        _('predictions model versions'), default=list, help_text='Model versions of task predictions'
+    )
+    avg_lead_time = models.FloatField(
+        _('average lead time'), null=True, help_text='Average lead time of task annotations'
+    )
+    last_annotation_created_at = models.DateTimeField(
+        _('last annotation created at'), null=True, help_text='Creation time of the newest task annotation'
+    )
+    draft_exists = models.BooleanField(_('draft exists'), default=False, help_text='Task has annotation drafts')
+
+    @classmethod
+    def refresh(cls, task_ids):
+        """Recalculate aggregates of the tasks from their current annotations, predictions and drafts
+
+        :param task_ids: Task ids with changed annotations, predictions or drafts
+        """
+        for ids in batch(sorted(task_ids), settings.BATCH_SIZE):
+            cls.refresh_rows(*load_task_derived_rows(ids))
+
+    @classmethod
+    def refresh_rows(cls, tasks, annotations, predictions):
+        """Recalculate aggregates from rows loaded by load_task_derived_rows()"""
+        objs, empty = [], []
+        for task in tasks:
+            task_annotations, task_predictions = annotations[task['id']], predictions[task['id']]
+            if not task_annotations and not task_predictions and not task['draft_exists']:
+                empty.append(task['id'])
+                continue
+
+            lead_times = [row['lead_time'] for row in task_annotations if row['lead_time'] is not None]
+            newest = max(task_annotations, key=lambda row: row['id'], default=None)
+            objs.append(
+                cls(
+                    task_id=task['id'],
+                    project_id=task['project_id'],
+                    annotators=sorted({row['completed_by_id'] for row in task_annotations} - {None}),
+                    annotations_ids=sorted(row['id'] for row in task_annotations),
+                    predictions_model_versions=sorted({row['model_version'] for row in task_predictions}, key=str),
+                    avg_lead_time=sum(lead_times) / len(lead_times) if lead_times else None,
+                    last_annotation_created_at=newest['created_at'] if newest else None,
+                    draft_exists=task['draft_exists'],
+                )
+            )
+
+        # tasks without annotations, predictions and drafts don't need aggregates, missing rows read as empty
+        if empty:
+            cls.objects.filter(task_id__in=empty).delete()
+        cls.objects.bulk_create(
+            objs,
+            update_conflicts=True,
+            unique_fields=['task'],
+            update_fields=[
+                'annotators',
+                'annotations_ids',
+                'predictions_model_versions',
+                'avg_lead_time',
+                'last_annotation_created_at',
+                'draft_exists',
+            ],
+        )
+
+    class Meta:
+        db_table = 'task_aggregates'
+
+
+def load_task_derived_rows(ids):
+    """Tasks with their annotations and predictions, derived task data is built from them
+
+    :param ids: Task ids of one batch
+    :return: task rows with project_id and draft_exists, annotation and prediction rows grouped by task id
+    """
+    annotations, predictions = defaultdict(list), defaultdict(list)
+    for row in Annotation.objects.filter(task_id__in=ids).values(
+        'task_id', 'id', 'completed_by_id', 'lead_time', 'created_at', 'result'
+    ):
+        annotations[row['task_id']].append(row)
+    for row in Prediction.objects.filter(task_id__in=ids).values('task_id', 'model_version', 'result'):
+        predictions[row['task_id']].append(row)
+    tasks = list(
+        Task.objects.filter(id__in=ids)
+        .annotate(draft_exists=Exists(AnnotationDraft.objects.filter(task=OuterRef('pk'))))
+        .values('id', 'project_id', 'draft_exists')
+    )
+    return tasks, annotations, predictions
+
+
+def refresh_task_derived_data(task_ids):
+    """Rebuild search documents and aggregates of the tasks after their annotations or predictions are changed,
+    task rows are loaded once per batch for both of them
+    """
+    for ids in batch(sorted(set(task_ids)), settings.BATCH_SIZE):
+        rows = load_task_derived_rows(ids)
+        TaskSearchDocument.refresh_rows(*rows)
+        TaskAggregates.refresh_rows(*rows)
+
+
 @receiver(post_delete, sender=Task)
 def update_all_task_states_after_deleting_task(sender, instance, **kwargs):
     """after deleting_task
     use update_tasks_states for all project
     but call only tasks_number_changed section
     """
+    from data_manager.functions import bump_project_data_version
+
+    bump_project_data_version(instance.project_id)
     try:
         instance.project.update_tasks_states(
             maximum_annotations_changed=False,
@@ -1268,23 +1532,23 @@ def delete_project_summary_annotations_before_updating_annotation(sender, instan
         # annotation just created - do nothing
         return
     old_annotation.decrease_project_summary_counters()
+    # task counters are recounted after saving, including changes of was_cancelled status
 
-    # update task counters if annotation changes it's was_cancelled status
-    task = instance.task
-    if old_annotation.was_cancelled != instance.was_cancelled:
-        if instance.was_cancelled:
-            task.cancelled_annotations = task.cancelled_annotations + 1
-            task.total_annotations = task.total_annotations - 1
-        else:
-            task.cancelled_annotations = task.cancelled_annotations - 1
-            task.total_annotations = task.total_annotations + 1
-        task.update_is_labeled()
-
-        Task.objects.filter(id=instance.task.id).update(
-            is_labeled=task.is_labeled,
-            total_annotations=task.total_annotations,
-            cancelled_annotations=task.cancelled_annotations,
+
+def update_counters_of_task(instance, refresh=True):
+    """Recount counters and is_labeled of the annotation or prediction task,
+    inside tasks.functions.coalesce_task_counters() it's postponed to the end of the block,
+    inside a transaction to its commit
+    """
+    from tasks.functions import mark_task_counters_dirty
+
+    applied = mark_task_counters_dirty([instance.task_id], instance.project_id)
+    if applied and refresh and type(instance).task.is_cached(instance):
+        # keep the loaded task in sync, callers read its counters after saving
+        instance.task.refresh_from_db(
+            fields=['is_labeled', 'total_annotations', 'cancelled_annotations', 'total_predictions']
         )
+    logger.debug(f'Updated counters for task {instance.task_id}.')
 
 
 @receiver(post_save, sender=Annotation)
@@ -1292,67 +1556,92 @@ def update_project_summary_annotations_and_is_labeled(sender, instance, created,
     """Update annotation counters in project summary"""
     instance.increase_project_summary_counters()
 
-    # If annotation is changed, update task.is_labeled state
-    logger.debug(f'Update task stats for task={instance.task}')
-    if instance.was_cancelled:
-        instance.task.cancelled_annotations = instance.task.annotations.all().filter(was_cancelled=True).count()
-    else:
-        instance.task.total_annotations = instance.task.annotations.all().filter(was_cancelled=False).count()
-    instance.task.update_is_labeled()
-    instance.task.save(update_fields=['is_labeled', 'total_annotations', 'cancelled_annotations'])
-    logger.debug(f'Updated total_annotations and cancelled_annotations for {instance.task.id}.')
+    # If annotation is changed, update task counters and is_labeled state
+    logger.debug(f'Update task stats for task={instance.task_id}')
+    update_counters_of_task(instance)
 
 
-@receiver(pre_delete, sender=Prediction)
+@receiver(post_delete, sender=Prediction)
 def remove_predictions_from_project(sender, instance, **kwargs):
     """Remove predictions counters"""
-    instance.task.total_predictions = instance.task.predictions.all().count() - 1
-    instance.task.save(update_fields=['total_predictions'])
-    logger.debug(f'Updated total_predictions for {instance.task.id}.')
+    # the task can be deleted in the same cascade, so it isn't refreshed
+    update_counters_of_task(instance, refresh=False)
 
 
 @receiver(post_save, sender=Prediction)
 def save_predictions_to_project(sender, instance, **kwargs):
     """Add predictions counters"""
-    instance.task.total_predictions = instance.task.predictions.all().count()
-    instance.task.save(update_fields=['total_predictions'])
-    logger.debug(f'Updated total_predictions for {instance.task.id}.')
+    update_counters_of_task(instance)
 
 
 # =========== END OF PROJECT SUMMARY UPDATES ===========
 
 
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Annotation)
+@receiver(post_save, sender=Prediction)
+def invalidate_task_totals(sender, instance, **kwargs):
+    """Data manager task totals are cached per project data version"""
+    from data_manager.functions import bump_project_data_version
+
+    bump_project_data_version(instance.project_id)
+
+
+@receiver(post_bulk_create, sender=Annotation)
+def invalidate_task_totals_after_bulk_create(sender, objs, **kwargs):
+    from data_manager.functions import bump_project_data_version
+
+    for project_id in {obj.project_id for obj in objs}:
+        bump_project_data_version(project_id)
+
+
 @receiver(post_save, sender=Annotation)
 def delete_draft(sender, instance, **kwargs):
+    from tasks.functions import coalesce_task_counters
+
     task = instance.task
     query_args = {'task': task, 'annotation': instance}
     drafts = AnnotationDraft.objects.filter(**query_args)
     num_drafts = 0
-    for draft in drafts:
-        # Delete each draft individually because deleting
-        # the whole queryset won't update `created_labels_drafts`
-        try:
-            draft.delete()
-            num_drafts += 1
-        except AnnotationDraft.DoesNotExist:
-            continue
+    # task aggregates are refreshed once for all deleted drafts
+    with coalesce_task_counters():
+        for draft in drafts:
+            # Delete each draft individually because deleting
+            # the whole queryset won't update `created_labels_drafts`
+            try:
+                draft.delete()
+                num_drafts += 1
+            except AnnotationDraft.DoesNotExist:
+                continue
     logger.debug(f'{num_drafts} drafts removed from task {task} after saving annotation {instance}')
 
 
+@receiver(post_save, sender=AnnotationDraft)
+def refresh_aggregates_after_saving_draft(sender, instance, created, **kwargs):
+    """Data manager shows if the task has drafts"""
+    from tasks.functions import mark_task_aggregates_dirty
+
+    if created and instance.task_id:
+        mark_task_aggregates_dirty([instance.task_id])
+
+
+@receiver(post_delete, sender=AnnotationDraft)
+def refresh_aggregates_after_deleting_draft(sender, instance, **kwargs):
+    from tasks.functions import mark_task_aggregates_dirty
+
+    if instance.task_id:
+        mark_task_aggregates_dirty([instance.task_id])
+
+
 @receiver(post_save, sender=Annotation)
 def update_ml_backend(sender, instance, **kwargs):
     if instance.ground_truth:
         return
 
-    project = instance.project
-
-    if hasattr(project, 'ml_backends') and project.min_annotations_to_start_training:
-        annotation_count = Annotation.objects.filter(project=project).count()
+    from ml.models import MLTrainingTrigger
 
-        # start training every N annotation
-        if annotation_count % project.min_annotations_to_start_training == 0:
-            for ml_backend in project.ml_backends.all():
-                ml_backend.train()
+    # start training every N annotation
+    MLTrainingTrigger.register_annotation(instance.project)
 
 
 def update_task_stats(task, stats=('is_labeled',), save=True):
@@ -65,6 +65,28 @@ def disable_sentry():
     settings.SENTRY_DSN = None
 
 
+@pytest.fixture(autouse=True)
+def clear_presigned_url_cache():
+    """Storage ids are reused between tests, so cached presigned URLs must not leak"""
+    from io_storages.utils import presigned_url_cache
+
+    presigned_url_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_next_task_queues():
+    """In-memory next task buffers are keyed by user and query, and ids are reused between tests"""
+    from projects.functions.task_queue import reset_task_queues
+
+    reset_task_queues()
+
+
+@pytest.fixture(autouse=True)
+def flush_task_counters_right_away():
+    """Test transactions are never committed, so task counters are recounted right after each save"""
+    settings.TASK_COUNTERS_FLUSH_ON_COMMIT = False
+
+
 @pytest.fixture()
 def debug_modal_exceptions_false(settings):
     settings.DEBUG_MODAL_EXCEPTIONS = False
@@ -274,6 +296,17 @@ def mock_put(*args, **kwargs):
         raise client_error
 
 
+def mock_client_put_object(mocker):
+    create_client = boto3.Session.client
+
+    def client(self, *args, **kwargs):
+        s3_client = create_client(self, *args, **kwargs)
+        s3_client.put_object = mock_put
+        return s3_client
+
+    mocker.patch('boto3.Session.client', client)
+
+
 @pytest.fixture()
 def mock_s3_resource_aes(mocker):
     mock_object = MagicMock()
@@ -287,6 +320,8 @@ def mock_s3_resource_aes(mocker):
 
     # Patch boto3.Session.resource to return the mock s3 resource
     mocker.patch('boto3.Session.resource', return_value=mock_s3_resource)
+    # Objects are uploaded with the s3 client, patch its put_object
+    mock_client_put_object(mocker)
 
 
 @pytest.fixture()
@@ -302,6 +337,8 @@ def mock_s3_resource_kms(mocker):
 
     # Patch boto3.Session.resource to return the mock s3 resource
     mocker.patch('boto3.Session.resource', return_value=mock_s3_resource)
+    # Objects are uploaded with the s3 client, patch its put_object
+    mock_client_put_object(mocker)
 
 
 @pytest.fixture(autouse=True)
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from data_import.functions import async_import_background
+from data_import.models import FileUpload
+from django.core.files.uploadedfile import SimpleUploadedFile
+from projects.models import ProjectImport
+from tasks.models import Annotation, Task
+
+pytestmark = pytest.mark.django_db
+
+
+def _file_upload(project, name, body):
+    return FileUpload.objects.create(
+        user=project.created_by, project=project, file=SimpleUploadedFile(name, body.encode())
+    )
+
+
+def test_iter_tasks_matches_read_tasks(configured_project):
+    json_tasks = [{'text': 'text 1', 'meta_info': 'a'}, {'data': {'text': 'text 2', 'meta_info': 1.5}}]
+    uploads = [
+        _file_upload(configured_project, 'tasks.json', json.dumps(json_tasks)),
+        _file_upload(configured_project, 'task.json', json.dumps({'text': 'single', 'meta_info': 'b'})),
+        _file_upload(configured_project, 'tasks.csv', 'text,meta_info\ncsv 1,a\ncsv 2,\n'),
+        _file_upload(configured_project, 'tasks.tsv', 'text\tmeta_info\ntsv 1\ta\n'),
+        _file_upload(configured_project, 'tasks.txt', 'line 1\nline 2\n'),
+    ]
+    for upload in uploads:
+        assert list(upload.iter_tasks()) == FileUpload.objects.get(id=upload.id).read_tasks()
+
+
+def test_iter_tasks_keeps_csv_types_across_batches(configured_project, settings):
+    settings.IMPORT_BATCH_SIZE = 2
+    body = 'text,number,code\nt1,1,1\nt2,2,2\nt3,3.5,a\nt4,,b\n'
+    for name, body in [('tasks.csv', body), ('tasks.tsv', body.replace(',', '\t'))]:
+        upload = _file_upload(configured_project, name, body)
+        tasks = list(upload.iter_tasks())
+        assert tasks == FileUpload.objects.get(id=upload.id).read_tasks()
+        assert [task['data']['number'] for task in tasks] == [1.0, 2.0, 3.5, '']
+        assert [task['data']['code'] for task in tasks] == ['1', '2', 'a', 'b']
+
+
+def test_iter_tasks_closes_json_file(configured_project):
+    upload = _file_upload(configured_project, 'tasks.json', json.dumps([{'text': 'text 1'}, {'text': 'text 2'}]))
+    tasks = upload.iter_tasks()
+    assert next(tasks) == {'data': {'text': 'text 1'}}
+    tasks.close()
+    assert upload.file.closed
+
+
+def test_streaming_import_in_batches(configured_project, settings):
+    settings.IMPORT_STREAMING = True
+    settings.IMPORT_BATCH_SIZE = 2
+    tasks = [
+        {'data': {'text': f'text {i}', 'meta_info': 'info'}, 'annotations': [{'result': []}] if i % 2 else []}
+        for i in range(5)
+    ]
+    uploads = [
+        _file_upload(configured_project, 'tasks.json', json.dumps(tasks)),
+        _file_upload(configured_project, 'tasks.csv', 'text,meta_info\ncsv 1,a\ncsv 2,b\n'),
+    ]
+    project_import = ProjectImport.objects.create(
+        project=configured_project,
+        commit_to_project=True,
+        return_task_ids=True,
+        file_upload_ids=[upload.id for upload in uploads],
+    )
+
+    async_import_background(project_import.id, configured_project.created_by.id)
+
+    project_import.refresh_from_db()
+    assert project_import.status == ProjectImport.Status.COMPLETED
+    assert project_import.task_count == 7
+    assert project_import.annotation_count == 2
+    assert project_import.found_formats == {'.json': 1, '.csv': 1}
+    assert sorted(project_import.data_columns) == ['meta_info', 'text']
+    assert len(project_import.task_ids) == 7
+
+    imported = Task.objects.filter(id__in=project_import.task_ids)
+    assert imported.count() == 7
+    assert imported.filter(is_labeled=True).count() == 2
+    assert Annotation.objects.filter(task__in=imported).count() == 2
+
+
+def test_streaming_import_fails_on_inconsistent_data_keys(configured_project, settings):
+    settings.IMPORT_STREAMING = True
+    settings.IMPORT_BATCH_SIZE = 1
+    tasks_before = configured_project.tasks.count()
+    data_columns_before = dict(configured_project.summary.all_data_columns or {})
+    uploads = [
+        _file_upload(configured_project, 'tasks.csv', 'text,meta_info\ncsv 1,a\n'),
+        _file_upload(configured_project, 'other.csv', 'another\nvalue\n'),
+    ]
+    project_import = ProjectImport.objects.create(
+        project=configured_project, commit_to_project=True, file_upload_ids=[upload.id for upload in uploads]
+    )
+
+    with pytest.raises(Exception, match='inconsistent data'):
+        async_import_background(project_import.id, configured_project.created_by.id)
+
+    # the batch of the first file is committed before the second file fails, it's removed
+    project_import.refresh_from_db()
+    assert project_import.task_count == 0
+    assert configured_project.tasks.count() == tasks_before
+    configured_project.summary.refresh_from_db()
+    assert (configured_project.summary.all_data_columns or {}) == data_columns_before
@@ -1,11 +1,14 @@
 """This file and its contents are licensed under the Apache License 2.0. Please see the included NOTICE for copyright information and LICENSE for a copy of the license.
 """
 import json
+from unittest import mock
 
 import pytest
+from data_manager import functions
+from fakeredis import FakeRedis
 from projects.models import Project
 
-from ..utils import make_annotation, make_prediction, make_task, project_id  # noqa
+from ..utils import make_annotation, make_prediction, make_project, make_task, project_id  # noqa
 
 
 @pytest.mark.django_db
@@ -128,3 +131,180 @@ def test_views_total_counters(tasks_count, annotations_count, predictions_count,
     assert response_data['total'] == tasks_count, response_data
     assert response_data['total_annotations'] == tasks_count * annotations_count, response_data
     assert response_data['total_predictions'] == tasks_count * predictions_count, response_data
+
+
+@pytest.mark.parametrize(
+    'ordering',
+    [
+        [],
+        ['tasks:-id'],
+        ['tasks:data.text'],
+        ['tasks:-data.text'],
+        ['tasks:completed_at'],
+        ['tasks:-total_annotations'],
+    ],
+)
+@pytest.mark.django_db
+def test_views_tasks_cursor_pagination(ordering, business_client, project_id):
+    payload = dict(project=project_id, data={'test': 1, 'ordering': ordering})
+    response = business_client.post(
+        '/api/dm/views/',
+        data=json.dumps(payload),
+        content_type='application/json',
+    )
+    assert response.status_code == 201, response.content
+    view_id = response.json()['id']
+
+    project = Project.objects.get(pk=project_id)
+    task_ids = []
+    # duplicated and missing ordering values check the id tie-breaker and nulls
+    for i, text in enumerate(['b', 'a', 'b', None, 'c', 'a', None]):
+        task_id = make_task({'data': {'text': text} if text else {}}, project).id
+        task_ids.append(task_id)
+        for _ in range(i % 3):
+            make_annotation({'result': []}, task_id)
+
+    response = business_client.get(f'/api/tasks?view={view_id}&page_size=100')
+    expected = response.json()['tasks']
+    assert sorted(task['id'] for task in expected) == sorted(task_ids)
+
+    received = []
+    cursor = ''
+    for _ in range(len(task_ids)):
+        response = business_client.get(f'/api/tasks?view={view_id}&page_size=2&cursor={cursor}')
+        assert response.status_code == 200, response.content
+        response_data = response.json()
+        assert 'total' not in response_data
+        received += response_data['tasks']
+        cursor = response_data['cursor']
+        if cursor is None:
+            assert response_data['next'] is None
+            break
+
+    assert len(received) == len(task_ids)
+    assert set(task['id'] for task in received) == set(task_ids)
+    if not ordering or ordering[0].endswith('id'):
+        assert [task['id'] for task in received] == [task['id'] for task in expected]
+    elif ordering[0].endswith('text'):
+        # ties may come in a different order, but ordering values must match page pagination
+        assert [task['data'].get('text') for task in received] == [task['data'].get('text') for task in expected]
+
+    response = business_client.get(f'/api/dm/totals/?view={view_id}')
+    assert response.status_code == 200, response.content
+    assert response.json() == {'total': 7, 'total_annotations': 6, 'total_predictions': 0}
+
+
+@pytest.mark.django_db
+def test_views_tasks_invalid_cursor(business_client, project_id):
+    response = business_client.get(f'/api/tasks?project={project_id}&cursor=broken')
+    assert response.status_code == 404, response.content
+
+
+@pytest.mark.django_db
+def test_views_tasks_totals_cache(business_client, project_id):
+    project = Project.objects.get(pk=project_id)
+    task_id = make_task({'data': {'text': 'a'}}, project).id
+    make_task({'data': {'text': 'b'}}, project)
+    make_annotation({'result': []}, task_id)
+
+    with mock.patch('core.redis._redis', FakeRedis()), mock.patch.object(
+        functions.transaction, 'on_commit', side_effect=lambda func: func()
+    ), mock.patch.object(functions, 'get_task_totals', wraps=functions.get_task_totals) as get_task_totals:
+        for _ in range(3):
+            response = business_client.get(f'/api/tasks?project={project_id}&page_size=1')
+            assert response.status_code == 200, response.content
+            assert response.json()['total'] == 2
+            assert response.json()['total_annotations'] == 1
+        # totals are counted once while scrolling
+        assert get_task_totals.call_count == 1
+
+        # new annotation invalidates cached totals
+        make_annotation({'result': []}, task_id)
+        response = business_client.get(f'/api/tasks?project={project_id}&page_size=1&page=2')
+        assert response.json()['total'] == 2
+        assert response.json()['total_annotations'] == 2
+        assert get_task_totals.call_count == 2
+
+        # other filters are cached separately
+        query = json.dumps(
+            {
+                'filters': {
+                    'conjunction': 'and',
+                    'items': [{'filter': 'filter:tasks:id', 'operator': 'equal', 'type': 'Number', 'value': task_id}],
+                }
+            }
+        )
+        response = business_client.get(f'/api/tasks?project={project_id}&query={query}')
+        assert response.json()['total'] == 1
+        assert get_task_totals.call_count == 3
+
+
+@pytest.mark.django_db
+def test_views_tasks_query_budget(business_client, project_id):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from tasks.models import AnnotationDraft
+
+    project = Project.objects.get(pk=project_id)
+    result = [{'from_name': 'my_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['pos']}}]
+    for i in range(6):
+        task = make_task({'data': {'text': f'text {i}'}}, project)
+        make_annotation({'result': result, 'completed_by': business_client.user}, task.id)
+        make_prediction({'result': result}, task.id)
+        AnnotationDraft.objects.create(task=task, user=business_client.user, result=result)
+
+    def page_queries(page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = business_client.get(f'/api/tasks?fields=all&project={project_id}&page_size={page_size}')
+        assert response.status_code == 200, response.content
+        tasks = response.json()['tasks']
+        assert len(tasks) == page_size
+        assert all(len(task['drafts']) == 1 for task in tasks)
+        return len(context.captured_queries)
+
+    # drafts and other task relations are loaded once per page
+    assert page_queries(2) == page_queries(6)
+
+
+@pytest.mark.django_db
+def test_views_tasks_warm_predictions(business_client, ml_backend_for_test_predict):
+    from ml.models import MLBackend
+
+    project = make_project(
+        config=dict(
+            is_published=True,
+            label_config="""
+                <View>
+                  <Text name="text" value="$text"></Text>
+                  <Choices name="label" choice="single">
+                    <Choice value="label_A"></Choice>
+                    <Choice value="label_B"></Choice>
+                  </Choices>
+                </View>""",
+            title='test_views_tasks_warm_predictions',
+            evaluate_predictions_automatically=True,
+        ),
+        user=business_client.user,
+        use_ml_backend=False,
+    )
+    MLBackend.objects.create(project=project, title='ModelSingle', url='http://test.ml.backend.for.sdk.com:9092')
+    queued, ready = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(2)]
+
+    # with redis missing predictions are queued and the page is returned without waiting for them
+    with mock.patch('core.redis._redis', FakeRedis()), mock.patch.object(
+        functions, 'start_job_async_or_sync'
+    ) as start_job:
+        for _ in range(2):
+            response = business_client.get(f'/api/tasks?fields=all&project={project.id}&page_size=1')
+            assert response.status_code == 200, response.content
+            assert response.json()['tasks'][0]['predictions'] == []
+        # the same tasks are queued once while the job is pending
+        start_job.assert_called_once()
+        assert start_job.call_args.args[2] == [queued.id]
+
+    # without redis predictions are retrieved right away and returned with the page
+    response = business_client.get(f'/api/tasks?fields=all&project={project.id}')
+    assert response.status_code == 200, response.content
+    tasks = response.json()['tasks']
+    assert [len(task['predictions']) for task in tasks] == [1, 1]
+    assert tasks[1]['predictions'][0]['model_version'] == 'ModelSingle'
@@ -337,23 +337,26 @@ def test_views_filters(filters, ids, business_client, project_id):
     task_data_field_name = settings.DATA_UNDEFINED_NAME
 
     task_id_1 = make_task({'data': {task_data_field_name: 'some text1'}}, project).id
-    make_annotation(
-        {'result': [{'from_name': '1_first', 'to_name': '', 'value': {}}], 'completed_by': ann1}, task_id_1
-    )
-    make_prediction({'result': [{'from_name': '1_first', 'to_name': '', 'value': {}}], 'score': 1}, task_id_1)
+    # results filters search label values, not from_name
+    first_result = [{'from_name': '1_first', 'to_name': '', 'value': {'choices': ['1_first']}}]
+    make_annotation({'result': first_result, 'completed_by': ann1}, task_id_1)
+    make_prediction({'result': first_result, 'score': 1}, task_id_1)
 
     task_id_2 = make_task({'data': {task_data_field_name: 'some text2'}}, project).id
     for ann in (ann1, ann2):
         make_annotation(
             {
-                'result': [{'from_name': '2_second', 'to_name': '', 'value': {}}],
+                'result': [{'from_name': '2_second', 'to_name': '', 'value': {'choices': ['2_second']}}],
                 'was_cancelled': True,
                 'completed_by': ann,
             },
             task_id_2,
         )
     for _ in range(0, 2):
-        make_prediction({'result': [{'from_name': '2_second', 'to_name': '', 'value': {}}], 'score': 2}, task_id_2)
+        make_prediction(
+            {'result': [{'from_name': '2_second', 'to_name': '', 'value': {'choices': ['2_second']}}], 'score': 2},
+            task_id_2,
+        )
 
     task_ids = [0, task_id_1, task_id_2]
 
@@ -386,3 +389,258 @@ def test_views_filters(filters, ids, business_client, project_id):
     response_ids = [task['id'] for task in response_data['tasks']]
     correct_ids = [task_ids[i] for i in ids]
     assert response_ids == correct_ids, (response_ids, correct_ids, filters)
+
+
+@pytest.mark.django_db
+def test_data_column_types_skip_probing_queries(business_client, project_id):
+    from data_manager.managers import apply_filters, apply_ordering
+    from data_manager.prepare_params import Filters
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from projects.models import ProjectSummary
+    from tasks.models import Task
+
+    project = Project.objects.get(pk=project_id)
+    for i in range(3):
+        make_task({'data': {'text': f'text {i}', 'number': i, 'mixed': i if i else 'zero'}}, project)
+
+    summary = ProjectSummary.objects.get(project=project)
+    assert summary.data_column_types == {'text': 'str', 'number': 'int', 'mixed': 'mixed'}
+
+    filters = Filters(
+        conjunction='and',
+        items=[
+            {'filter': 'filter:tasks:data.text', 'operator': 'empty', 'type': 'String', 'value': False},
+            {'filter': 'filter:tasks:data.number', 'operator': 'greater', 'type': 'Number', 'value': 0},
+        ],
+    )
+    view_data = {'columnsDisplayType': {'tasks:data.number': 'Number'}}
+    queryset = Task.objects.filter(project=project)
+
+    def selects(context):
+        return [query for query in context.captured_queries if query['sql'].startswith('SELECT')]
+
+    # only the registry is loaded, no exists() / first row probes are made
+    with CaptureQueriesContext(connection) as context:
+        queryset = apply_filters(queryset, filters, project, None)
+        queryset = apply_ordering(queryset, ['-tasks:data.number'], project, None, view_data=view_data)
+    assert len(selects(context)) == 1
+    assert [task.data['number'] for task in queryset] == [2, 1]
+
+    # mixed columns are resampled from the queryset
+    filters.items[0].filter = 'filter:tasks:data.mixed'
+    with CaptureQueriesContext(connection) as context:
+        apply_filters(Task.objects.filter(project=project), filters, project, None)
+    assert len(selects(context)) == 2
+
+
+@pytest.mark.django_db
+def test_data_column_types_follow_task_edits_and_fill_job(business_client, project_id):
+    from importlib import import_module
+
+    from data_manager.managers import apply_ordering
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from projects.models import ProjectSummary
+    from tasks.models import Task
+
+    project = Project.objects.get(pk=project_id)
+    tasks = [make_task({'data': {'text': f'text {i}', 'number': i}}, project) for i in range(3)]
+    view_data = {'columnsDisplayType': {'tasks:data.number': 'Number'}}
+
+    def ordering_selects(project):
+        with CaptureQueriesContext(connection) as context:
+            queryset = apply_ordering(
+                Task.objects.filter(project=project), ['tasks:data.number'], project, None, view_data=view_data
+            )
+        return len([query for query in context.captured_queries if query['sql'].startswith('SELECT')]), queryset
+
+    # registered numeric column is cast without the trial query
+    assert ordering_selects(Project.objects.get(pk=project_id))[0] == 1
+
+    # projects not filled by the migration job yet keep the trial query
+    ProjectSummary.objects.filter(project=project).update(data_column_types_ready=False)
+    assert ordering_selects(Project.objects.get(pk=project_id))[0] == 2
+
+    fill_job = import_module('projects.migrations.0033_projectsummary_data_column_types_ready')
+    ProjectSummary.objects.filter(project=project).update(data_column_types={})
+    fill_job._fill_data_column_types('0033_projectsummary_data_column_types_ready')
+    summary = ProjectSummary.objects.get(project=project)
+    assert summary.data_column_types_ready
+    assert summary.data_column_types == {'text': 'str', 'number': 'int'}
+
+    # edited task data is registered, the string value makes the column mixed
+    response = business_client.patch(
+        f'/api/tasks/{tasks[0].id}/',
+        data=json.dumps({'data': {'text': 'text 0', 'number': 'none'}}),
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.content
+    assert ProjectSummary.objects.get(project=project).data_column_types['number'] == 'mixed'
+    selects, queryset = ordering_selects(Project.objects.get(pk=project_id))
+    assert selects == 2
+    assert len(queryset) == 3
+
+
+@pytest.mark.django_db
+def test_results_filters_use_search_documents(business_client, project_id):
+    from data_manager.managers import apply_filters
+    from data_manager.prepare_params import Filters
+    from labels_manager.functions import bulk_update_label
+    from tasks.models import Task, TaskSearchDocument
+
+    project = Project.objects.get(pk=project_id)
+    car, bus, empty = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(3)]
+
+    def region(from_name, value):
+        return {'from_name': from_name, 'to_name': 'text', 'type': 'choices', 'value': value}
+
+    annotation = make_annotation(
+        {'result': [region('vehicle', {'choices': ['Car']})], 'completed_by': business_client.user}, car.id
+    )
+    # "car" in names and coordinates isn't searchable
+    make_annotation(
+        {'result': [region('car_type', {'choices': ['Bus'], 'start': 3})], 'completed_by': business_client.user},
+        bus.id,
+    )
+    make_prediction({'result': [region('vehicle', {'labels': ['Big Truck'], 'text': 'a truck'})]}, bus.id)
+
+    assert TaskSearchDocument.objects.get(task=car).annotations_text == 'car'
+    assert TaskSearchDocument.objects.get(task=bus).predictions_text == 'big truck\na truck'
+    assert not TaskSearchDocument.objects.filter(task=empty).exists()
+
+    def filtered(field, operator, value):
+        filters = Filters(
+            conjunction='and',
+            items=[{'filter': f'filter:tasks:{field}', 'operator': operator, 'type': 'String', 'value': value}],
+        )
+        return set(apply_filters(Task.objects.filter(project=project), filters, project, None))
+
+    assert filtered('annotations_results', 'contains', 'Car') == {car}
+    assert filtered('annotations_results', 'not_contains', 'car') == {bus, empty}
+    assert filtered('predictions_results', 'contains', 'TRUCK') == {bus}
+    assert filtered('predictions_results', 'contains', 'tr') == {bus}
+
+    # documents follow annotation changes
+    annotation.result = [region('vehicle', {'choices': ['Bike']})]
+    annotation.save()
+    assert filtered('annotations_results', 'contains', 'car') == set()
+    assert filtered('annotations_results', 'contains', 'bike') == {car}
+    bulk_update_label(['Bike'], ['Scooter'], project.organization, project)
+    assert filtered('annotations_results', 'contains', 'bike') == set()
+    assert filtered('annotations_results', 'contains', 'scooter') == {car}
+    annotation.delete()
+    assert filtered('annotations_results', 'contains', 'scooter') == set()
+
+
+@pytest.mark.django_db
+def test_task_aggregates(business_client, project_id):
+    from data_manager.managers import PreparedTaskManager
+    from tasks.models import AnnotationDraft, Task, TaskAggregates
+
+    project = Project.objects.get(pk=project_id)
+    labeled, drafted, empty = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(3)]
+    annotator = make_annotator({'email': 'aggregates@testheartex.com'}, project)
+
+    result = [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}}]
+    first = make_annotation({'result': result, 'completed_by': business_client.user, 'lead_time': 2}, labeled.id)
+    second = make_annotation({'result': result, 'completed_by': annotator, 'lead_time': 4}, labeled.id)
+    make_prediction({'result': result, 'model_version': 'v1'}, labeled.id)
+    draft = AnnotationDraft.objects.create(task=drafted, user=business_client.user, result=result)
+
+    aggregates = TaskAggregates.objects.get(task=labeled)
+    assert aggregates.annotators == sorted([business_client.user.id, annotator.id])
+    assert aggregates.annotations_ids == [first.id, second.id]
+    assert aggregates.predictions_model_versions == ['v1']
+    assert aggregates.avg_lead_time == 3
+    assert aggregates.last_annotation_created_at == second.created_at
+    assert not aggregates.draft_exists
+    assert TaskAggregates.objects.get(task=drafted).draft_exists
+    assert not TaskAggregates.objects.filter(task=empty).exists()
+
+    # data manager columns read from aggregates match the columns calculated from annotations
+    def values(value):
+        # sqlite concatenates values into strings, joins repeat them, serializer shows unique ones
+        values = value.split(',') if isinstance(value, str) else value or []
+        return sorted({str(v) for v in values if v not in (None, '')})
+
+    def columns(ready):
+        project._task_aggregates_ready = ready
+        queryset = PreparedTaskManager.annotate_queryset(
+            Task.objects.filter(project=project).order_by('id'), all_fields=True, project=project
+        )
+        return [
+            {
+                'completed_at': task.completed_at,
+                'avg_lead_time': task.avg_lead_time,
+                'draft_exists': task.draft_exists,
+                'annotators': values(task.annotators),
+                'annotations_ids': values(task.annotations_ids),
+                'predictions_model_versions': values(task.predictions_model_versions),
+            }
+            for task in queryset
+        ]
+
+    aggregated = columns(True)
+    assert aggregated == columns(False)
+    assert aggregated[0]['completed_at'] == second.created_at
+    assert aggregated[0]['avg_lead_time'] == 3
+    assert [task['draft_exists'] for task in aggregated] == [False, True, False]
+
+    # drafts and deleted tasks keep aggregates in sync
+    draft.delete()
+    assert not TaskAggregates.objects.filter(task=drafted).exists()
+    labeled.delete()
+    assert not TaskAggregates.objects.filter(project=project).exists()
+
+
+@pytest.mark.django_db
+def test_annotators_filter_returns_task_once(business_client, project_id):
+    from data_manager.managers import PreparedTaskManager, apply_filters
+    from data_manager.prepare_params import Filters
+    from tasks.models import Task
+
+    project = Project.objects.get(pk=project_id)
+    labeled, empty = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(2)]
+    annotator = make_annotator({'email': 'annotators-filter@testheartex.com'}, project)
+    for user in [business_client.user, business_client.user, annotator]:
+        make_annotation({'result': [], 'completed_by': user}, labeled.id)
+
+    def filtered(operator, value):
+        filters = Filters(
+            conjunction='and',
+            items=[{'filter': 'filter:tasks:annotators', 'operator': operator, 'type': 'List', 'value': value}],
+        )
+        queryset = PreparedTaskManager.annotate_queryset(
+            Task.objects.filter(project=project).order_by('id'), fields_for_evaluation=['annotators'], project=project
+        )
+        return [task.id for task in apply_filters(queryset, filters, project, None)]
+
+    for ready in [True, False]:
+        project._task_aggregates_ready = ready
+        assert filtered('contains', business_client.user.id) == [labeled.id]
+        assert filtered('not_contains', annotator.id) == [empty.id]
+        assert filtered('empty', True) == [empty.id]
+        assert filtered('empty', False) == [labeled.id]
+
+
+@pytest.mark.django_db
+def test_delete_tasks_annotations_refreshes_aggregates_once(business_client, project_id, mocker):
+    from tasks.models import AnnotationDraft, TaskAggregates
+
+    project = Project.objects.get(pk=project_id)
+    task = make_task({'data': {'text': 'text'}}, project)
+    for _ in range(3):
+        AnnotationDraft.objects.create(task=task, user=business_client.user, result=[])
+    assert TaskAggregates.objects.get(task=task).draft_exists
+
+    # drafts deleted by the bulk action are flushed once per task, not once per draft
+    refresh = mocker.patch.object(TaskAggregates, 'refresh', wraps=TaskAggregates.refresh)
+    r = business_client.post(
+        f'/api/dm/actions?project={project.id}&id=delete_tasks_annotations',
+        data=json.dumps({'selectedItems': {'all': True, 'excluded': []}}),
+        content_type='application/json',
+    )
+    assert r.status_code == 200, r.content
+    assert refresh.call_count == 1
+    assert not TaskAggregates.objects.filter(task=task, draft_exists=True).exists()
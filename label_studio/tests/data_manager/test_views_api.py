@@ -241,3 +241,46 @@ def test_update_views_order(business_client, project_id):
 
     returned_ids = [view['id'] for view in data]
     assert returned_ids == new_order['ids']
+
+
+def test_view_plan_cache(business_client, project_id):
+    from data_manager.plan_cache import view_plan_cache
+    from projects.models import Project
+
+    from ..utils import make_annotation, make_task
+
+    project = Project.objects.get(pk=project_id)
+    tasks = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(3)]
+    make_annotation({'result': [], 'completed_by': business_client.user}, tasks[0].id)
+
+    def view_filters(operator):
+        items = [{'filter': 'filter:tasks:total_annotations', 'operator': operator, 'type': 'Number', 'value': 0}]
+        return {'filters': {'conjunction': 'and', 'items': items}}
+
+    response = business_client.post(
+        '/api/dm/views/',
+        data=json.dumps(dict(project=project_id, data=view_filters('equal'))),
+        content_type='application/json',
+    )
+    assert response.status_code == 201, response.content
+    view_id = response.json()['id']
+
+    def task_ids():
+        response = business_client.get(f'/api/tasks?view={view_id}')
+        assert response.status_code == 200, response.content
+        return sorted(task['id'] for task in response.json()['tasks'])
+
+    # the second request reuses the compiled query
+    assert task_ids() == [tasks[1].id, tasks[2].id]
+    hits = view_plan_cache.hits
+    assert task_ids() == [tasks[1].id, tasks[2].id]
+    assert view_plan_cache.hits > hits
+
+    # edited view gets a new plan
+    response = business_client.patch(
+        f'/api/dm/views/{view_id}/',
+        data=json.dumps(dict(project=project_id, data=view_filters('greater'))),
+        content_type='application/json',
+    )
+    assert response.status_code == 200, response.content
+    assert task_ids() == [tasks[0].id]
@@ -1,8 +1,15 @@
 import json
+import threading
+from datetime import timedelta
 
 import pytest
+import requests
+from django.conf import settings
+from django.test import TestCase
+from django.utils.timezone import now
 from projects.models import Task
 from rest_framework import status
+from rq.job import JobStatus
 
 from label_studio.tests.utils import make_project, register_ml_backend_mock
 
@@ -305,3 +312,346 @@ def test_ml_backend_predict_test_api_post_random_true(business_client):
     r = response.json()
     assert r['url'] == 'http://localhost:8999/predict'
     assert r['status'] == 200
+
+
+@pytest.mark.django_db
+def test_training_triggered_every_n_annotations(configured_project, mocker):
+    from ml.models import MLBackend, MLTrainingTrigger
+    from tasks.models import Annotation
+
+    train = mocker.patch.object(MLBackend, 'train')
+    MLBackend.objects.create(project=configured_project, url='http://localhost:8999')
+    configured_project.min_annotations_to_start_training = 2
+    configured_project.save()
+    task = configured_project.tasks.first()
+
+    for _ in range(5):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            Annotation.objects.create(task=task, project=configured_project, result=[])
+    Annotation.objects.create(task=task, project=configured_project, result=[], ground_truth=True)
+
+    # training is dispatched after the 2nd and the 4th annotation for every project ML backend
+    assert train.call_count == 2 * configured_project.ml_backends.count()
+    trigger = MLTrainingTrigger.objects.get(project=configured_project)
+    assert trigger.annotations_since_training == 1
+    assert trigger.training_scheduled is False
+
+    # the flag is reset if the job can't be queued, so the next threshold dispatches training again
+    mocker.patch('ml.models.start_job_async_or_sync', side_effect=ConnectionError)
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        Annotation.objects.create(task=task, project=configured_project, result=[])
+    assert MLTrainingTrigger.objects.get(project=configured_project).training_scheduled is False
+
+    # a flag scheduled long ago is expired, e.g. the delayed job was dropped
+    MLTrainingTrigger.objects.filter(project=configured_project).update(
+        training_scheduled=True, updated_at=now() - timedelta(seconds=60 + 1)
+    )
+    queued = mocker.patch('ml.models.start_job_async_or_sync')
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        MLTrainingTrigger.dispatch_training(configured_project.id)
+    queued.assert_called_once()
+
+    # a flag of the job still waiting in the queue isn't lost however old it is, a finished job is
+    job_status = mocker.patch('ml.models.get_job_status', return_value=JobStatus.SCHEDULED)
+    MLTrainingTrigger.objects.filter(project=configured_project).update(
+        training_scheduled=True, training_job_id='training-job', updated_at=now() - timedelta(days=1)
+    )
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        MLTrainingTrigger.dispatch_training(configured_project.id)
+    queued.assert_called_once()
+    job_status.assert_called_once_with('training-job')
+    job_status.return_value = JobStatus.FINISHED
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        MLTrainingTrigger.dispatch_training(configured_project.id)
+    assert queued.call_count == 2
+
+
+@pytest.mark.django_db
+def test_training_counted_in_redis(configured_project, mocker):
+    from fakeredis import FakeRedis
+    from ml.models import MLTrainingTrigger
+    from tasks.models import Annotation
+
+    configured_project.min_annotations_to_start_training = 2
+    configured_project.save()
+    configured_project.annotations.all().delete()
+    Annotation.objects.create(task=configured_project.tasks.first(), project=configured_project, result=[])
+    mocker.patch('core.redis._redis', FakeRedis())
+    queued = mocker.patch('ml.models.start_job_async_or_sync')
+
+    dispatched = []
+    for _ in range(5):
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            dispatched.append(MLTrainingTrigger.register_annotation(configured_project))
+        # the started training job resets the flag
+        MLTrainingTrigger.objects.filter(project=configured_project).update(training_scheduled=False)
+
+    assert dispatched == [False, True, False, True, False]
+    assert queued.call_count == 2
+    # annotation saves are counted in redis, the count of the trigger row is left as is
+    assert MLTrainingTrigger.objects.get(project=configured_project).annotations_since_training == 1
+
+
+@pytest.mark.django_db
+def test_ml_backend_state_cache(configured_project, ml_backend_for_test_api):
+    from ml.models import MLBackend, MLBackendState
+
+    ml_backend = MLBackend.objects.create(project=configured_project, url='https://ml_backend_for_test_api')
+    # clients are shared by backends with the same url, auth and timeout
+    assert ml_backend.api is MLBackend.objects.get(id=ml_backend.id).api
+
+    def health_requests():
+        return sum(request.path == '/health' for request in ml_backend_for_test_api.request_history)
+
+    assert ml_backend.update_state() == '1.0.0'
+    assert health_requests() == 1
+
+    # predictions reuse the connected state
+    assert ml_backend.update_state(cache=True) == '1.0.0'
+    assert MLBackend.objects.get(id=ml_backend.id).update_state(cache=True) == '1.0.0'
+    assert health_requests() == 1
+
+    # changed config checks the backend again
+    ml_backend.extra_params = {'param': 1}
+    ml_backend.save()
+    assert ml_backend.update_state(cache=True) == '1.0.0'
+    assert health_requests() == 2
+    assert ml_backend.state == MLBackendState.CONNECTED
+
+
+def test_pooled_ml_api_closes_evicted_clients(settings, mocker):
+    from ml import api_connector
+
+    settings.ML_API_CLIENT_POOL_SIZE = 1
+    mocker.patch.object(api_connector, '_ml_api_pool', api_connector.OrderedDict())
+    first = api_connector.get_pooled_ml_api('http://first.ml.backend')
+    close = mocker.patch.object(first.http, 'close')
+    assert api_connector.get_pooled_ml_api('http://first.ml.backend') is first
+    close.assert_not_called()
+
+    second = api_connector.get_pooled_ml_api('http://second.ml.backend')
+    close.assert_called_once()
+    assert api_connector.get_pooled_ml_api('http://second.ml.backend') is second
+
+
+def test_pooled_ml_api_sessions_per_thread(settings, mocker):
+    from ml import api_connector
+
+    settings.ML_API_CLIENT_POOL_SIZE = 1
+    mocker.patch.object(api_connector, '_ml_api_pool', api_connector.OrderedDict())
+    api = api_connector.get_pooled_ml_api('http://first.ml.backend')
+    main_session = api.http
+    sessions = []
+    worker = threading.Thread(target=lambda: sessions.append(api.http))
+    worker.start()
+    worker.join()
+    assert sessions[0] is not main_session
+    assert api.http is main_session
+
+    # the session of the finished worker is closed when a new session is created
+    close = mocker.patch.object(sessions[0], 'close')
+    api._sessions.pop(api._session_key())
+    assert api.http is not main_session
+    close.assert_called_once()
+    assert sessions[0] not in api._sessions.values()
+
+
+@pytest.mark.django_db
+def test_predict_tasks_in_chunks(business_client, ml_backend, settings):
+    from ml.models import MLBackend
+    from tasks.models import Prediction
+
+    settings.ML_PREDICT_CHUNK_SIZE = 2
+    settings.ML_PREDICT_CONCURRENCY = 2
+    settings.ML_PREDICT_RETRY_BACKOFF = 0
+    url = 'http://ml_backend_for_test_chunks'
+    register_ml_backend_mock(ml_backend, url=url)
+
+    def predict(request, context):
+        tasks = request.json()['tasks']
+        # the backend fails for any request with the broken task
+        if any(task['data']['image_url'] == 'broken' for task in tasks):
+            context.status_code = 500
+            return {'error': 'broken task'}
+        return {'results': [{'result': [], 'score': 0.5} for _ in tasks]}
+
+    ml_backend.post(f'{url}/predict', json=predict)
+    project = make_project(
+        config=dict(title='test_predict_tasks_in_chunks', label_config=PROJECT_CONFIG),
+        user=business_client.user,
+        use_ml_backend=False,
+    )
+    images = ['a', 'b', 'broken', 'c', 'd']
+    tasks = [Task.objects.create(project=project, data={'image_url': image}) for image in images]
+    backend = MLBackend.objects.create(project=project, url=url)
+
+    chunks = []
+    predictions = backend.predict_tasks(Task.objects.filter(project=project), on_chunk=chunks.append)
+
+    # the failed chunk is split and only the broken task is left without predictions
+    assert sorted(prediction.task_id for prediction in predictions) == [
+        task.id for task in tasks if task.data['image_url'] != 'broken'
+    ]
+    assert Prediction.objects.filter(project=project).count() == 4
+    assert len(chunks) == 3
+    assert chunks[-1]['done'] == 5 and chunks[-1]['failed'] == 1 and chunks[-1]['total'] == 5
+    assert sorted(Task.objects.filter(project=project).values_list('total_predictions', flat=True)) == [0, 1, 1, 1, 1]
+    broken_requests = [r for r in ml_backend.request_history if r.path == '/predict' and 'broken' in r.text]
+    # 2 tasks chunk and the broken task alone: first request and 2 retries each
+    assert len(broken_requests) == 6
+
+
+@pytest.mark.django_db
+def test_predict_tasks_splits_timed_out_chunks(business_client, ml_backend, settings):
+    from ml.models import MLBackend
+    from tasks.models import Prediction
+
+    settings.ML_PREDICT_CHUNK_SIZE = 4
+    settings.ML_PREDICT_RETRIES = 0
+    url = 'http://ml_backend_for_test_timeouts'
+    register_ml_backend_mock(ml_backend, url=url)
+
+    def predict(request, context):
+        tasks = request.json()['tasks']
+        # the backend doesn't answer in time for more than 2 tasks at once
+        if len(tasks) > 2:
+            raise requests.exceptions.ReadTimeout('read timed out')
+        return {'results': [{'result': [], 'score': 0.5} for _ in tasks]}
+
+    ml_backend.post(f'{url}/predict', json=predict)
+    project = make_project(
+        config=dict(title='test_predict_tasks_splits_timed_out_chunks', label_config=PROJECT_CONFIG),
+        user=business_client.user,
+        use_ml_backend=False,
+    )
+    for i in range(4):
+        Task.objects.create(project=project, data={'image_url': str(i)})
+    backend = MLBackend.objects.create(project=project, url=url)
+
+    backend.predict_tasks(Task.objects.filter(project=project))
+    assert Prediction.objects.filter(project=project).count() == 4
+    predict_requests = [len(r.json()['tasks']) for r in ml_backend.request_history if r.path == '/predict']
+    assert predict_requests == [4, 2, 2]
+
+    # connection errors don't depend on the chunk size, the chunk isn't split
+    ml_backend.post(f'{url}/predict', exc=requests.exceptions.ConnectionError)
+    Prediction.objects.filter(project=project).delete()
+    requests_before = len(ml_backend.request_history)
+    backend.predict_tasks(Task.objects.filter(project=project))
+    assert not Prediction.objects.filter(project=project).exists()
+    assert [r.path for r in ml_backend.request_history[requests_before:]].count('/predict') == 1
+
+
+@pytest.mark.django_db
+def test_prediction_jobs(business_client, ml_backend):
+    from ml.models import MLBackend, MLBackendPredictionJob, MLBackendPredictionJobStatus, run_prediction_job
+    from tasks.models import Prediction
+
+    url = 'http://ml_backend_for_test_prediction_jobs'
+    register_ml_backend_mock(ml_backend, url=url)
+    ml_backend.post(
+        f'{url}/predict',
+        json=lambda request, context: {'results': [{'result': [], 'score': 0.5} for _ in request.json()['tasks']]},
+    )
+    project = make_project(
+        config=dict(title='test_prediction_jobs', label_config=PROJECT_CONFIG),
+        user=business_client.user,
+        use_ml_backend=False,
+    )
+    for image in ['a', 'b', 'c']:
+        Task.objects.create(project=project, data={'image_url': image})
+    backend = MLBackend.objects.create(project=project, url=url)
+    # the project runs the maximum number of jobs already
+    running = MLBackendPredictionJob.objects.create(ml_backend=backend, status=MLBackendPredictionJobStatus.RUNNING)
+
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        r = business_client.post(
+            f'/api/dm/actions?project={project.id}&id=retrieve_tasks_predictions',
+            data=json.dumps({'selectedItems': {'all': True, 'excluded': []}}),
+            content_type='application/json',
+        )
+    assert r.status_code == 200, r.content
+    assert r.json()['processed_items'] == 3
+    job_id = r.json()['prediction_job']
+    job_url = f'/api/ml/{backend.id}/prediction-jobs/{job_id}'
+    job = business_client.get(job_url).json()
+    assert job['status'] == 'queued' and job['total'] == 3 and job['done'] == 0
+    assert not Prediction.objects.filter(project=project).exists()
+
+    # the next queued job starts when the running one is canceled
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        r = business_client.post(f'/api/ml/{backend.id}/prediction-jobs/{running.id}/cancel')
+    assert r.status_code == 200, r.content
+    job = business_client.get(job_url).json()
+    assert job['status'] == 'completed' and job['done'] == 3 and job['failed'] == 0
+    assert job['started_at'] and job['finished_at']
+    assert Prediction.objects.filter(project=project).count() == 3
+
+    r = business_client.post(f'{job_url}/cancel')
+    assert r.status_code == 409
+
+    # a running job without progress for too long is lost, it doesn't hold the slot
+    stale = MLBackendPredictionJob.objects.create(ml_backend=backend, status=MLBackendPredictionJobStatus.RUNNING)
+    MLBackendPredictionJob.objects.filter(id=stale.id).update(
+        updated_at=now() - timedelta(seconds=settings.ML_PREDICTION_JOB_STALE_TIMEOUT + 1)
+    )
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        started = MLBackendPredictionJob.create(
+            backend, Task.objects.filter(project=project).values_list('id', flat=True)
+        )
+    assert MLBackendPredictionJob.objects.get(id=stale.id).status == MLBackendPredictionJobStatus.FAILED
+    assert MLBackendPredictionJob.objects.get(id=started.id).status == MLBackendPredictionJobStatus.COMPLETED
+
+    # queued job is canceled before it starts
+    queued = MLBackendPredictionJob.objects.create(ml_backend=backend, task_ids=[1], total=1)
+    r = business_client.post(f'/api/ml/{backend.id}/prediction-jobs/{queued.id}/cancel')
+    assert r.status_code == 200, r.content
+    assert r.json()['status'] == 'canceled'
+    run_prediction_job(queued.id)
+    assert MLBackendPredictionJob.objects.get(id=queued.id).started_at is None
+
+    jobs = business_client.get(f'/api/ml/{backend.id}/prediction-jobs').json()
+    assert [job['id'] for job in jobs] == [queued.id, started.id, stale.id, job_id, running.id]
+
+
+@pytest.mark.django_db
+def test_prediction_jobs_stale_check(business_client, mocker):
+    from ml.models import MLBackend, MLBackendPredictionJob, MLBackendPredictionJobStatus
+
+    project = make_project(
+        config=dict(title='test_prediction_jobs_stale_check', label_config=PROJECT_CONFIG),
+        user=business_client.user,
+        use_ml_backend=False,
+    )
+    task = Task.objects.create(project=project, data={'image_url': 'a'})
+    backend = MLBackend.objects.create(project=project, url='http://ml_backend_for_test_prediction_jobs_stale_check')
+    long_ago = now() - timedelta(seconds=settings.ML_PREDICTION_JOB_STALE_TIMEOUT + 1)
+    waiting = MLBackendPredictionJob.objects.create(ml_backend=backend, task_ids=[task.id], job_id='rq-waiting')
+    lost = MLBackendPredictionJob.objects.create(
+        ml_backend=backend, task_ids=[task.id], status=MLBackendPredictionJobStatus.RUNNING, job_id='rq-lost'
+    )
+    MLBackendPredictionJob.objects.filter(id__in=[waiting.id, lost.id]).update(
+        dispatched_at=long_ago, updated_at=long_ago
+    )
+
+    # a job waiting in a backed up queue isn't failed, a job whose rq job is gone is
+    statuses = {'rq-waiting': JobStatus.QUEUED, 'rq-lost': JobStatus.FAILED}
+    mocker.patch('ml.models.get_job_status', side_effect=statuses.get)
+    MLBackendPredictionJob.start_queued(project.id)
+    assert MLBackendPredictionJob.objects.get(id=waiting.id).status == MLBackendPredictionJobStatus.QUEUED
+    lost.refresh_from_db()
+    assert lost.status == MLBackendPredictionJobStatus.FAILED
+
+    # the worker of the failed job stops after the chunk, it isn't reported as canceled
+    mocker.patch.object(
+        MLBackend, 'predict_tasks', side_effect=lambda tasks, on_chunk: on_chunk({'total': 1, 'done': 1, 'failed': 0})
+    )
+    finish = mocker.patch.object(MLBackendPredictionJob, '_finish')
+    lost.run()
+    finish.assert_not_called()
+    lost.refresh_from_db()
+    assert (lost.status, lost.error_message, lost.done) == (
+        MLBackendPredictionJobStatus.FAILED,
+        'Prediction job stopped without finishing',
+        0,
+    )
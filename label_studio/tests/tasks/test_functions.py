@@ -1,11 +1,17 @@
 import io
 import os
+from datetime import timedelta
 
 import psutil
 import pytest
 from data_export.serializers import ExportDataSerializer
 from django.conf import settings
-from tasks.functions import export_project
+from django.core.management import call_command
+from django.utils.timezone import now
+from projects.models import Project, ProjectCounters
+from tasks.functions import coalesce_task_counters, export_project, sweep_expired_task_locks
+from tasks.models import Annotation, Prediction, Task, TaskLock
+from users.models import User
 
 pytestmark = pytest.mark.django_db
 
@@ -66,3 +72,109 @@ class TestExportProject:
                 export_project(1, 'JSON', settings.EXPORT_DIR)
 
         generate_export_file.assert_not_called()
+
+
+class TestSweepExpiredTaskLocks:
+    @pytest.fixture
+    def locks(self, configured_project):
+        task = configured_project.tasks.first()
+        other_user = User.objects.create(email='other@testsweeptasklocks.com')
+        expired = [
+            TaskLock.objects.create(task=task, user=other_user, expire_at=now() - timedelta(minutes=i + 1))
+            for i in range(3)
+        ]
+        active = TaskLock.objects.create(
+            task=task, user=configured_project.created_by, expire_at=now() + timedelta(minutes=1)
+        )
+        return expired, active
+
+    def test_sweep_in_batches(self, locks):
+        _, active = locks
+        assert sweep_expired_task_locks(batch_size=2) == {'swept': 3, 'total': 1}
+        assert list(TaskLock.objects.values_list('id', flat=True)) == [active.id]
+
+    def test_command(self, locks):
+        out = io.StringIO()
+        call_command('sweep_task_locks', stdout=out)
+        assert 'Swept 3 expired task locks, 1 locks left' in out.getvalue()
+
+    def test_request_path_skips_cleanup_with_sweeper(self, locks, settings):
+        settings.TASK_LOCK_SWEEP_INTERVAL = 60
+        expired, active = locks
+        active.task.release_lock(active.user)
+        assert TaskLock.objects.count() == len(expired)
+
+        settings.TASK_LOCK_SWEEP_INTERVAL = 0
+        expired[0].task.clear_expired_locks()
+        assert not TaskLock.objects.exists()
+
+
+def finished_task_number(project):
+    projects = ProjectCounters.annotate_projects(
+        Project.objects.filter(id=project.id), fields=['finished_task_number']
+    )
+    return projects.values_list('finished_task_number', flat=True).get()
+
+
+class TestCoalesceTaskCounters:
+    def test_single_save_updates_counters(self, configured_project):
+        task = configured_project.tasks.first()
+        annotation = Annotation.objects.create(
+            task=task, project=configured_project, result=[], completed_by=configured_project.created_by
+        )
+        assert (annotation.task.total_annotations, annotation.task.is_labeled) == (1, True)
+
+        annotation.was_cancelled = True
+        annotation.save()
+        task.refresh_from_db()
+        assert (task.total_annotations, task.cancelled_annotations, task.is_labeled) == (0, 1, False)
+
+    def test_counters_are_updated_once_per_block(self, configured_project, django_assert_max_num_queries):
+        tasks = list(configured_project.tasks.all())
+        with coalesce_task_counters():
+            for task in tasks:
+                Prediction.objects.create(task=task, project=configured_project, result=[])
+                Annotation.objects.create(task=task, project=configured_project, result=[])
+            # nothing is recounted inside the block
+            assert not Task.objects.filter(project=configured_project, total_predictions__gt=0).exists()
+
+        for task in Task.objects.filter(project=configured_project):
+            assert (task.total_predictions, task.total_annotations, task.is_labeled) == (1, 1, True)
+        assert finished_task_number(configured_project) == len(tasks)
+
+        with django_assert_max_num_queries(len(tasks) + 10):
+            with coalesce_task_counters():
+                Prediction.objects.filter(project=configured_project).delete()
+        assert not Task.objects.filter(project=configured_project, total_predictions__gt=0).exists()
+
+    def test_counters_are_updated_once_per_transaction(self, configured_project, settings, mocker):
+        from django.db import transaction
+        from django.test import TestCase
+        from tasks import functions
+
+        settings.TASK_COUNTERS_FLUSH_ON_COMMIT = True
+        update_task_counters = mocker.spy(functions, 'update_task_counters')
+        tasks = list(configured_project.tasks.all())
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for task in tasks:
+                    Prediction.objects.create(task=task, project=configured_project, result=[])
+                    Annotation.objects.create(task=task, project=configured_project, result=[])
+                # nothing is recounted before the commit
+                assert not Task.objects.filter(project=configured_project, total_predictions__gt=0).exists()
+
+        assert update_task_counters.call_count == 1
+        for task in Task.objects.filter(project=configured_project):
+            assert (task.total_predictions, task.total_annotations, task.is_labeled) == (1, 1, True)
+        assert finished_task_number(configured_project) == len(tasks)
+
+    def test_is_labeled_rule_of_task_mixin_is_applied(self, configured_project, mocker):
+        def update_is_labeled(task, *args, **kwargs):
+            task.is_labeled = task.total_annotations >= 2
+
+        mocker.patch.object(Task, 'update_is_labeled', update_is_labeled)
+        task = configured_project.tasks.first()
+        for total_annotations, is_labeled in [(1, False), (2, True)]:
+            Annotation.objects.create(task=task, project=configured_project, result=[])
+            task.refresh_from_db()
+            assert (task.total_annotations, task.is_labeled) == (total_annotations, is_labeled)
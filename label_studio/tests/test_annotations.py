@@ -5,6 +5,7 @@ import json
 import pytest
 import requests_mock
 from django.apps import apps
+from django.test import TestCase
 from django.urls import reverse
 from projects.models import Project
 from tasks.models import Annotation, Task
@@ -112,7 +113,8 @@ def test_create_annotation_with_ground_truth(caplog, any_client, configured_proj
         assert m.called == webhook_called
 
         # real annotation triggers uploading to ML backend and recalculating accuracy
-        r = any_client.post('/api/tasks/{}/annotations/'.format(task.id), data=annotation)
+        with TestCase.captureOnCommitCallbacks(execute=True):
+            r = any_client.post('/api/tasks/{}/annotations/'.format(task.id), data=annotation)
         assert r.status_code == 201
         assert m.called
         task = Task.objects.get(id=task.id)
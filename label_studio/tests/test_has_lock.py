@@ -1,7 +1,14 @@
 import json
+import sys
+from datetime import timedelta
+from types import ModuleType, SimpleNamespace
 
 import pytest
+from django.utils.timezone import now
+from projects.models import Project
+from tasks.models import Annotation, Task, TaskLock
 from tests.utils import make_project
+from users.models import User
 
 
 @pytest.mark.django_db
@@ -40,3 +47,73 @@ def test_has_lock(business_client):
     task.refresh_from_db()
 
     assert task.is_labeled is True
+
+
+@pytest.mark.parametrize(
+    'skip_queue',
+    [Project.SkipQueue.REQUEUE_FOR_ME, Project.SkipQueue.REQUEUE_FOR_OTHERS, Project.SkipQueue.IGNORE_SKIPPED],
+)
+@pytest.mark.django_db
+def test_exclude_locked_matches_has_lock(business_client, skip_queue):
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    project.skip_queue = skip_queue
+    project.save()
+    user = business_client.user
+    other = User.objects.create(email='other@testexcludelocked.com')
+    expire_at = now() + timedelta(hours=1)
+
+    free = Task.objects.create(project=project, data={'text': 'free'}, overlap=2)
+    locked = Task.objects.create(project=project, data={'text': 'locked'}, overlap=1)
+    TaskLock.objects.create(task=locked, user=other, expire_at=expire_at)
+    expired_lock = Task.objects.create(project=project, data={'text': 'expired lock'}, overlap=1)
+    TaskLock.objects.create(task=expired_lock, user=other, expire_at=now() - timedelta(hours=1))
+    own_lock = Task.objects.create(project=project, data={'text': 'own lock'}, overlap=1)
+    TaskLock.objects.create(task=own_lock, user=user, expire_at=expire_at)
+    annotated = Task.objects.create(project=project, data={'text': 'annotated'}, overlap=2)
+    Annotation.objects.create(task=annotated, project=project, completed_by=other, result=[])
+    TaskLock.objects.create(task=annotated, user=other, expire_at=expire_at)
+    skipped_by_me = Task.objects.create(project=project, data={'text': 'skipped by me'}, overlap=1)
+    Annotation.objects.create(task=skipped_by_me, project=project, completed_by=user, was_cancelled=True)
+    skipped_by_other = Task.objects.create(project=project, data={'text': 'skipped by other'}, overlap=1)
+    Annotation.objects.create(task=skipped_by_other, project=project, completed_by=other, was_cancelled=True)
+    ground_truth = Task.objects.create(project=project, data={'text': 'ground truth'}, overlap=1)
+    Annotation.objects.create(task=ground_truth, project=project, completed_by=other, ground_truth=True)
+
+    tasks = [free, locked, expired_lock, own_lock, annotated, skipped_by_me, skipped_by_other, ground_truth]
+    unlocked = set(Task.objects.filter(project=project).exclude_locked(user, project).values_list('id', flat=True))
+    assert unlocked == {task.id for task in tasks if not Task.objects.get(id=task.id).has_lock(user)}
+    assert {free.id, expired_lock.id, own_lock.id, ground_truth.id} <= unlocked
+    assert locked.id not in unlocked and annotated.id not in unlocked
+
+
+@pytest.mark.parametrize('agreement', [0.5, 0.9, None])
+@pytest.mark.django_db
+def test_exclude_locked_with_agreement_threshold(business_client, mocker, agreement):
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    project.lse_project = SimpleNamespace(agreement_threshold=0.8, max_additional_annotators_assignable=1)
+    stats_models = ModuleType('stats.models')
+    stats_models.get_task_agreement = lambda task: agreement
+    mocker.patch.dict(sys.modules, {'stats': ModuleType('stats'), 'stats.models': stats_models})
+    user = business_client.user
+    other = User.objects.create(email='other@testexcludelockedagreement.com')
+    expire_at = now() + timedelta(hours=1)
+
+    free = Task.objects.create(project=project, data={'text': 'free'}, overlap=1)
+    # locked or not depending on the agreement
+    annotated = Task.objects.create(project=project, data={'text': 'annotated'}, overlap=1)
+    Annotation.objects.create(task=annotated, project=project, completed_by=other, result=[])
+    # locked for any agreement
+    annotated_twice = Task.objects.create(project=project, data={'text': 'annotated twice'}, overlap=1)
+    for _ in range(2):
+        Annotation.objects.create(task=annotated_twice, project=project, completed_by=other, result=[])
+    locked = Task.objects.create(project=project, data={'text': 'locked'}, overlap=1)
+    TaskLock.objects.create(task=locked, user=other, expire_at=expire_at)
+
+    tasks = [free, annotated, annotated_twice, locked]
+    unlocked = set(Task.objects.filter(project=project).exclude_locked(user, project).values_list('id', flat=True))
+    assert unlocked == {free.id, annotated.id}
+    for task in tasks:
+        task = Task.objects.get(id=task.id)
+        task.project = project
+        if not task.has_lock(user):
+            assert task.id in unlocked
@@ -1,4 +1,6 @@
 import json
+import time
+from unittest import mock
 
 import pytest
 from tests.utils import make_project
@@ -30,3 +32,242 @@ def test_gcs_storage_credentials_validation(business_client):
         'Google Application Credentials must be valid JSON string.'
         in r.json()['validation_errors']['non_field_errors'][0]
     )
+
+
+@pytest.mark.django_db
+def test_s3_import_sync_in_batches(configured_project, s3, settings):
+    from io_storages.s3.models import S3ImportStorage, S3ImportStorageLink
+    from tasks.models import Annotation, Prediction
+
+    settings.STORAGE_SYNC_BATCH_SIZE = 2
+    settings.STORAGE_SYNC_MAX_WORKERS = 4
+    bucket_name = 'pytest-s3-batched-sync'
+    s3.create_bucket(Bucket=bucket_name)
+    for i in range(5):
+        task = {'data': {'text': f'text {i}'}, 'predictions': [{'result': [], 'score': 0.5}]}
+        if i % 2:
+            task['annotations'] = [{'result': [], 'completed_by': configured_project.created_by.id}]
+        s3.put_object(Bucket=bucket_name, Key=f'task{i}.json', Body=json.dumps(task))
+
+    tasks_before = configured_project.tasks.count()
+    max_inner_id = configured_project.tasks.order_by('-inner_id').first().inner_id
+    storage = S3ImportStorage.objects.create(project=configured_project, bucket=bucket_name, use_blob_urls=False)
+    # links saved with the legacy key format are recognized as existing
+    S3ImportStorageLink.objects.create(task=configured_project.tasks.first(), key='None/task0.json', storage=storage)
+
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED, storage.traceback
+    assert storage.last_sync_count == 4
+    assert storage.meta['tasks_existed'] == 1
+
+    tasks = configured_project.tasks.filter(inner_id__gt=max_inner_id).order_by('inner_id')
+    assert [task.data['text'] for task in tasks] == ['text 1', 'text 2', 'text 3', 'text 4']
+    assert [task.inner_id for task in tasks] == list(range(max_inner_id + 1, max_inner_id + 5))
+    assert [task.is_labeled for task in tasks] == [True, False, True, False]
+    assert S3ImportStorageLink.objects.filter(storage=storage, task__in=tasks).count() == 4
+    assert Prediction.objects.filter(task__in=tasks).count() == 4
+    assert Annotation.objects.filter(task__in=tasks).count() == 2
+
+    # resync doesn't create duplicates
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.last_sync_count == 0
+    assert storage.meta['tasks_existed'] == 5
+    assert configured_project.tasks.count() == tasks_before + 4
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('merged', [True, False])
+def test_import_storage_link_key_index(configured_project, merged):
+    from io_storages.base_models import ImportStorageLinkKeyIndex
+    from io_storages.s3.models import S3ImportStorage, S3ImportStorageLink
+    from tasks.models import Task
+
+    storage = S3ImportStorage.objects.create(project=configured_project, bucket='test', prefix='data')
+    tasks = [Task.objects.create(project=configured_project, data={'text': str(i)}) for i in range(4)]
+    S3ImportStorageLink.objects.create(task=tasks[0], key='a.json', storage=storage)
+    S3ImportStorageLink.objects.create(task=tasks[1], key='datab.json', storage=storage)
+    S3ImportStorageLink.objects.create(task=tasks[2], key='data/c.json', storage=storage)
+    S3ImportStorageLink.objects.create(task=tasks[3], key='e.json', storage=storage)
+
+    index = ImportStorageLinkKeyIndex(S3ImportStorageLink, storage)
+    index.merged = merged
+    keys = ['a.json', 'b.json', 'c.json', 'd.json']
+    assert index.existing_keys(keys) == {'a.json', 'b.json', 'c.json'}
+    assert index.existing_keys(['e.json', 'f.json']) == {'e.json'}
+    assert S3ImportStorageLink.existing_keys(keys, storage) == {'a.json', 'b.json', 'c.json'}
+    assert S3ImportStorageLink.exists('c.json', storage)
+    assert not S3ImportStorageLink.exists('d.json', storage)
+
+    # the full listing finds links to deleted objects, links under old key variants are kept
+    S3ImportStorageLink.objects.filter(key='e.json').update(object_exists=False)
+    index = ImportStorageLinkKeyIndex(S3ImportStorageLink, storage)
+    index.merged = merged
+    assert index.reconcile() == merged
+    assert index.existing_keys(['b.json', 'c.json', 'e.json']) == {'b.json', 'c.json', 'e.json'}
+    if merged:
+        assert index.finish() == 1
+        links = S3ImportStorageLink.objects.filter(storage=storage)
+        assert list(links.filter(object_exists=False).values_list('key', flat=True)) == ['a.json']
+    else:
+        assert index.finish() is None
+
+    # keys listed out of order switch the index to queries
+    index = ImportStorageLinkKeyIndex(S3ImportStorageLink, storage)
+    index.merged = merged
+    assert index.existing_keys(['b.json']) == {'b.json'}
+    assert index.existing_keys(['a.json']) == {'a.json'}
+    assert not index.merged
+    index.close()
+
+
+@pytest.mark.django_db
+def test_s3_incremental_sync(configured_project, s3, settings):
+    from io_storages.s3.models import S3ImportStorage, S3ImportStorageLink
+
+    settings.STORAGE_INCREMENTAL_SYNC = True
+    bucket_name = 'pytest-s3-incremental-sync'
+    s3.create_bucket(Bucket=bucket_name)
+    for key in ['b.jpg', 'c.jpg']:
+        s3.put_object(Bucket=bucket_name, Key=key, Body='123')
+    storage = S3ImportStorage.objects.create(project=configured_project, bucket=bucket_name, use_blob_urls=True)
+
+    def sync():
+        storage.sync()
+        storage.refresh_from_db()
+        assert storage.status == storage.Status.COMPLETED, storage.traceback
+        return sorted(S3ImportStorageLink.objects.filter(storage=storage).values_list('key', flat=True))
+
+    assert sync() == ['b.jpg', 'c.jpg']
+    assert storage.meta['full_sync']
+    assert storage.meta['sync_watermark']['key'] == 'c.jpg'
+
+    # keys sorted before the watermark are skipped until the next full sync
+    s3.put_object(Bucket=bucket_name, Key='a.jpg', Body='123')
+    s3.put_object(Bucket=bucket_name, Key='d.jpg', Body='123')
+    assert sync() == ['b.jpg', 'c.jpg', 'd.jpg']
+    assert not storage.meta['full_sync']
+    assert storage.last_sync_count == 1
+    assert storage.meta['tasks_existed'] == 0
+    assert storage.meta['sync_watermark']['key'] == 'd.jpg'
+
+    # full sync is done periodically, it finds deleted objects too
+    settings.STORAGE_FULL_SYNC_INTERVAL = 0
+    s3.delete_object(Bucket=bucket_name, Key='b.jpg')
+    assert sync() == ['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg']
+    assert storage.meta['full_sync']
+    assert storage.meta['links_missing'] == 1
+    assert not S3ImportStorageLink.objects.get(storage=storage, key='b.jpg').object_exists
+
+    # restored objects are found again
+    s3.put_object(Bucket=bucket_name, Key='b.jpg', Body='123')
+    assert sync() == ['a.jpg', 'b.jpg', 'c.jpg', 'd.jpg']
+    assert storage.meta['links_missing'] == 0
+    assert S3ImportStorageLink.objects.get(storage=storage, key='b.jpg').object_exists
+
+    # changed storage settings reset the watermark
+    settings.STORAGE_FULL_SYNC_INTERVAL = 3600
+    storage.prefix = 'subdir'
+    storage.save()
+    assert storage.get_sync_start_after() is None
+
+
+@pytest.mark.django_db
+def test_redis_import_sync_with_scan_and_mget(configured_project, settings):
+    from fakeredis import FakeRedis
+    from io_storages.redis.models import RedisImportStorage, RedisImportStorageLink, RedisStorageMixin
+
+    settings.STORAGE_SYNC_BATCH_SIZE = 2
+    settings.REDIS_STORAGE_SCAN_COUNT = 1
+    redis = FakeRedis(decode_responses=True)
+    for i in range(3):
+        redis.set(f'task:{i}', json.dumps({'text': f'text {i}'}))
+    redis.set('other', json.dumps({'text': 'skipped'}))
+    storage = RedisImportStorage.objects.create(project=configured_project, path='task:', db=1)
+
+    with mock.patch.object(RedisStorageMixin, 'get_redis_connection', return_value=redis), mock.patch.object(
+        FakeRedis, 'keys', side_effect=AssertionError('KEYS must not be used')
+    ), mock.patch.object(FakeRedis, 'get', side_effect=AssertionError('GET must not be used')):
+        storage.sync()
+
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED, storage.traceback
+    assert storage.last_sync_count == 3
+    links = RedisImportStorageLink.objects.filter(storage=storage).select_related('task')
+    assert sorted((link.key, link.task.data['text']) for link in links) == [
+        ('task:0', 'text 0'),
+        ('task:1', 'text 1'),
+        ('task:2', 'text 2'),
+    ]
+
+
+@pytest.mark.django_db
+def test_s3_export_sync_in_chunks(configured_project, s3, settings):
+    from io_storages.s3.models import S3ExportStorage, S3ExportStorageLink
+    from tasks.models import Annotation
+
+    settings.FUTURE_SAVE_TASK_TO_STORAGE = True
+    settings.FUTURE_SAVE_TASK_TO_STORAGE_JSON_EXT = False
+    settings.STORAGE_EXPORT_CHUNK_SIZE = 1
+    settings.STORAGE_EXPORT_MAX_WORKERS = 4
+    bucket_name = 'pytest-s3-export-sync'
+    s3.create_bucket(Bucket=bucket_name)
+    task = configured_project.tasks.first()
+    for _i in range(2):
+        Annotation.objects.create(task=task, project=configured_project, result=[])
+    annotated_tasks = configured_project.tasks.filter(annotations__isnull=False).distinct().count()
+    storage = S3ExportStorage.objects.create(project=configured_project, bucket=bucket_name, prefix='export')
+
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.status == storage.Status.COMPLETED, storage.traceback
+    assert storage.meta['objects_saved'] == annotated_tasks
+    assert storage.meta['objects_skipped'] == 0
+    keys = [obj['Key'] for obj in s3.list_objects(Bucket=bucket_name)['Contents']]
+    assert len(keys) == annotated_tasks
+    # the task is saved once for all its annotations
+    body = json.loads(s3.get_object(Bucket=bucket_name, Key=f'export/{task.id}')['Body'].read())
+    assert len(body['annotations']) == task.annotations.count()
+    links = S3ExportStorageLink.objects.filter(storage=storage)
+    assert links.count() == Annotation.objects.filter(project=configured_project).count()
+    assert not links.filter(content_hash__isnull=True).exists()
+
+    # unchanged tasks are not uploaded again
+    storage.sync()
+    storage.refresh_from_db()
+    assert storage.meta['objects_saved'] == 0
+    assert storage.meta['objects_skipped'] == annotated_tasks
+
+
+@pytest.mark.django_db
+def test_presigned_url_cache(configured_project, settings):
+    from io_storages.s3.models import S3ImportStorage
+
+    settings.STORAGE_PRESIGNED_URL_CACHE_MARGIN = 10
+    storage = S3ImportStorage.objects.create(project=configured_project, bucket='pytest-s3-images', presign_ttl=1)
+    other_storage = S3ImportStorage.objects.create(project=configured_project, bucket='pytest-s3-images')
+
+    with mock.patch.object(S3ImportStorage, 'generate_http_url', side_effect=lambda url: url + '?signed') as generate:
+        assert storage.generate_http_url_cached('s3://pytest-s3-images/1.jpg') == (
+            's3://pytest-s3-images/1.jpg?signed',
+            50,
+        )
+        url, max_age = storage.generate_http_url_cached('s3://pytest-s3-images/1.jpg')
+        assert url == 's3://pytest-s3-images/1.jpg?signed'
+        assert 0 < max_age <= 50
+        assert generate.call_count == 1
+
+        # cache is keyed by storage and object URI
+        storage.generate_http_url_cached('s3://pytest-s3-images/2.jpg')
+        other_storage.generate_http_url_cached('s3://pytest-s3-images/1.jpg')
+        assert generate.call_count == 3
+
+        # expired URLs are generated again
+        with mock.patch('io_storages.utils.time.time', return_value=time.time() + 60):
+            storage.generate_http_url_cached('s3://pytest-s3-images/1.jpg')
+        assert generate.call_count == 4
+
+        settings.STORAGE_PRESIGNED_URL_CACHE = False
+        storage.generate_http_url_cached('s3://pytest-s3-images/2.jpg')
+        assert generate.call_count == 5
@@ -8,6 +8,7 @@ import pytest
 from core.redis import redis_healthcheck
 from django.apps import apps
 from django.db.models import Q
+from projects.functions.task_queue import MemoryTaskQueue
 from projects.models import Project
 from tasks.models import Annotation, Prediction, Task
 
@@ -1327,3 +1328,91 @@ def test_overlap_first(business_client, setup_before_upload, show_overlap_first)
     else:
         assert not all_tasks_with_overlap_are_labeled
         assert not all_tasks_without_overlap_are_not_labeled
+
+
+@pytest.mark.parametrize('sampling', (Project.SEQUENCE, Project.UNIFORM))
+@pytest.mark.django_db
+def test_next_task_queue_engine(business_client, settings, sampling):
+    settings.NEXT_TASK_QUEUE_ENGINE = 'projects.functions.task_queue.MemoryTaskQueue'
+    settings.NEXT_TASK_QUEUE_SIZE = 10
+    config = dict(
+        title='test_next_task_queue_engine',
+        is_published=True,
+        sampling=sampling,
+        label_config="""
+            <View>
+              <Text name="text" value="$text"></Text>
+              <Choices name="text_class" choice="single" toName="text">
+                <Choice value="class_A"></Choice>
+                <Choice value="class_B"></Choice>
+              </Choices>
+            </View>""",
+    )
+    annotation_result = json.dumps(
+        [{'from_name': 'text_class', 'to_name': 'text', 'type': 'choices', 'value': {'choices': ['class_A']}}]
+    )
+    project = make_project(config, business_client.user)
+    task_ids = [make_task({'data': {'text': str(i)}}, project).id for i in range(3)]
+    ann1 = make_annotator({'email': 'ann1@testnexttaskqueue.com'}, project, True)
+    ann2 = make_annotator({'email': 'ann2@testnexttaskqueue.com'}, project, True)
+
+    refills = []
+    original_push = MemoryTaskQueue.push
+
+    def push(self, key, ids):
+        refills.append(list(ids))
+        return original_push(self, key, ids)
+
+    with mock.patch.object(MemoryTaskQueue, 'push', push):
+        # annotators get different tasks from their buffers because of task locks
+        r = ann1.get(f'/api/projects/{project.id}/next')
+        assert r.status_code == 200
+        id1 = json.loads(r.content)['id']
+        r = ann2.get(f'/api/projects/{project.id}/next')
+        assert r.status_code == 200
+        id2 = json.loads(r.content)['id']
+        assert id1 != id2
+        assert len(refills) == 2
+        if sampling == Project.SEQUENCE:
+            assert [id1, id2] == task_ids[:2]
+
+        # labeled tasks are skipped, the buffer isn't refilled
+        r = ann1.post(f'/api/tasks/{id1}/annotations/', data={'task': id1, 'result': annotation_result})
+        assert r.status_code == 201
+        r = ann1.get(f'/api/projects/{project.id}/next')
+        assert r.status_code == 200
+        assert json.loads(r.content)['id'] not in (id1, id2)
+        assert len(refills) == 2
+
+
+@pytest.mark.django_db
+def test_next_task_queue_engine_pages_through_locked_tasks(business_client, settings):
+    settings.NEXT_TASK_QUEUE_ENGINE = 'projects.functions.task_queue.MemoryTaskQueue'
+    settings.NEXT_TASK_QUEUE_SIZE = 2
+    settings.NEXT_TASK_LOCK_CHECK_WINDOW = 2
+    config = dict(
+        title='test_next_task_queue_engine_pages_through_locked_tasks',
+        is_published=True,
+        sampling=Project.SEQUENCE,
+        label_config="""
+            <View>
+              <Text name="text" value="$text"></Text>
+              <Choices name="text_class" choice="single" toName="text">
+                <Choice value="class_A"></Choice>
+                <Choice value="class_B"></Choice>
+              </Choices>
+            </View>""",
+    )
+    project = make_project(config, business_client.user)
+    task_ids = [make_task({'data': {'text': str(i)}}, project).id for i in range(4)]
+    annotators = [make_annotator({'email': f'ann{i}@testnexttaskqueuepaging.com'}, project, True) for i in range(3)]
+
+    # the first two annotators lock the whole first window of candidates
+    received = []
+    for ann in annotators:
+        r = ann.get(f'/api/projects/{project.id}/next')
+        assert r.status_code == 200
+        received.append(json.loads(r.content)['id'])
+
+    # the third annotator gets a task from the next window instead of "no more tasks"
+    assert received == task_ids[:3]
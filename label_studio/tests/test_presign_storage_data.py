@@ -140,6 +140,33 @@ class TestTaskPresignStorageData:
         assert response.status_code == status.HTTP_303_SEE_OTHER
         assert response.url == 'https://presigned-url.com/fileuri'
 
+    def test_cache_control_header(self, view, task, project, user, monkeypatch):
+        task.resolve_storage_uri.return_value = dict(
+            url='https://presigned-url.com/fileuri',
+            presign_ttl=1,
+            max_age=42,
+        )
+        task.has_permission.return_value = True
+        task.project = project
+
+        obj = MagicMock()
+        obj.get = MagicMock(return_value=task)
+        monkeypatch.setattr('tasks.models.Task.objects', obj)
+
+        request = APIRequestFactory().get(
+            reverse('data_import:task-storage-data-presign', kwargs={'task_id': 1}) + '?fileuri=fileuri'
+        )
+        request.user = user
+        force_authenticate(request, user)
+
+        response = view(request, task_id=1)
+        assert response.status_code == status.HTTP_303_SEE_OTHER
+        assert response.headers['Cache-Control'] == 'private, max-age=42'
+
+        task.resolve_storage_uri.return_value['max_age'] = 0
+        response = view(request, task_id=1)
+        assert response.headers['Cache-Control'] == 'no-store'
+
     def test_successful_request_with_long_fileuri(self, view, task, project, user, monkeypatch):
         task.resolve_storage_uri.return_value = dict(
             url='https://presigned-url.com/fileuri',
@@ -2,7 +2,9 @@ import json
 
 import pytest
 from django.db.models.query import QuerySet
-from tests.utils import make_project
+from django.test import TestCase
+from projects.models import Project
+from tests.utils import make_annotation, make_prediction, make_project, make_task
 from users.models import User
 
 
@@ -40,3 +42,99 @@ def test_project_all_members(business_client):
 
     assert isinstance(members, QuerySet)
     assert isinstance(members.first(), User)
+
+
+def _assert_project_counters_match_live_counts(project):
+    from projects.models import ProjectCounters, ProjectManager
+
+    fields = ProjectManager.COUNTER_FIELDS
+    stored = ProjectCounters.annotate_projects(Project.objects.filter(id=project.id)).values(*fields).get()
+    live = ProjectManager.with_counts_annotate(Project.objects.filter(id=project.id), live=True).values(*fields).get()
+    assert stored == live
+    return stored
+
+
+@pytest.mark.django_db
+def test_project_counters_follow_changes(business_client):
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    assert _assert_project_counters_match_live_counts(project)['task_number'] == 0
+
+    tasks = [make_task({'data': {'text': f'text {i}'}}, project) for i in range(3)]
+    make_prediction({'result': []}, tasks[0].id)
+    prediction = make_prediction({'result': []}, tasks[1].id)
+    annotation = make_annotation({'result': [{'r': 1}]}, tasks[0].id)
+    make_annotation({'result': [{'r': 2}], 'ground_truth': True}, tasks[0].id)
+    make_annotation({'result': [], 'was_cancelled': True}, tasks[1].id)
+    counters = _assert_project_counters_match_live_counts(project)
+    assert counters['task_number'] == 3
+    assert counters['total_predictions_number'] == 2
+    assert counters['total_annotations_number'] == 2
+    assert counters['skipped_annotations_number'] == 1
+    assert counters['num_tasks_with_annotations'] == 1
+
+    # skip an annotation, then delete annotation, prediction and task
+    annotation.was_cancelled = True
+    annotation.save()
+    _assert_project_counters_match_live_counts(project)
+    annotation.delete()
+    prediction.delete()
+    tasks[0].delete()
+    counters = _assert_project_counters_match_live_counts(project)
+    assert counters['task_number'] == 2
+    assert counters['total_predictions_number'] == 0
+
+    # bulk import is recalculated as a whole
+    with TestCase.captureOnCommitCallbacks(execute=True):
+        r = business_client.post(
+            f'/api/projects/{project.id}/import',
+            data=json.dumps([{'data': {'text': 'imported'}, 'annotations': [{'result': []}]}]),
+            content_type='application/json',
+        )
+    assert r.status_code == 201
+    assert _assert_project_counters_match_live_counts(project)['task_number'] == 3
+
+    response = business_client.get('/api/projects/')
+    assert response.json()['results'][0]['task_number'] == 3
+
+
+@pytest.mark.django_db
+def test_project_counters_deltas_are_compacted(business_client, settings):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from projects.models import ProjectCounters, ProjectCountersDelta
+
+    settings.PROJECT_COUNTERS_COMPACT_THRESHOLD = 4
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    task = make_task({'data': {'text': 'text'}}, project)
+    assert ProjectCountersDelta.objects.filter(project=project).count() == 1
+
+    # annotation deltas come from its fields without locking the task, then pending deltas are compacted
+    with CaptureQueriesContext(connection) as context:
+        annotation = make_annotation({'result': [{'r': 1}]}, task.id)
+    assert not [
+        query for query in context.captured_queries if 'FOR UPDATE' in query['sql'] and '"task"' in query['sql']
+    ]
+    assert ProjectCounters.objects.get(project=project).task_number == 1
+    assert not ProjectCountersDelta.objects.filter(project=project).exists()
+
+    annotation.ground_truth = True
+    annotation.save()
+    assert ProjectCountersDelta.objects.filter(project=project).exists()
+    counters = _assert_project_counters_match_live_counts(project)
+    assert (counters['ground_truth_number'], counters['num_tasks_with_annotations']) == (1, 0)
+
+
+@pytest.mark.django_db
+def test_reconcile_project_counters(business_client):
+    from django.core.management import call_command
+    from projects.models import ProjectCounters
+
+    project = make_project({}, business_client.user, use_ml_backend=False)
+    make_task({'data': {'text': 'text'}}, project)
+    ProjectCounters.objects.filter(project=project).update(task_number=10)
+
+    call_command('reconcile_project_counters', '--dry-run')
+    assert ProjectCounters.objects.get(project=project).task_number == 10
+
+    call_command('reconcile_project_counters', '--project', project.id)
+    assert _assert_project_counters_match_live_counts(project)['task_number'] == 1
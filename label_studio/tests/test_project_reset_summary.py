@@ -1,7 +1,8 @@
 import json
 
 import pytest
-from tasks.models import Task
+from projects.models import ProjectSummary
+from tasks.models import Annotation, Task
 from tests.conftest import project_choices
 from tests.utils import make_project
 
@@ -146,3 +147,46 @@ def test_logged_out_user_cannot_reset_summary(business_client):
     assert r.status_code == 401
     assert 'detail' in (r_json := r.json())
     assert r_json['detail'] == 'Authentication credentials were not provided.'
+
+
+def test_summary_label_counters_are_deltas(business_client, settings):
+    settings.PROJECT_SUMMARY_COMPACT_THRESHOLD = 100
+    project = make_project(project_choices(), business_client.user, use_ml_backend=False)
+    task = Task.objects.create(project=project, data={'image': 'kittens.jpg'})
+
+    def result(label):
+        return [{'from_name': 'some', 'to_name': 'x', 'type': 'none', 'value': {'none': [label]}}]
+
+    # two stale summary instances write concurrently, no update is lost
+    first, second = ProjectSummary.objects.get(pk=project.id), ProjectSummary.objects.get(pk=project.id)
+    first.update_created_annotations_and_labels([{'result': result('Opossum')}])
+    second.update_created_annotations_and_labels([{'result': result('Opossum')}, {'result': result('Cat')}])
+    second.remove_created_annotations_and_labels([{'result': result('Cat')}, {'result': result('Missing')}])
+    first.update_created_labels_drafts([{'result': result('Mouse')}])
+
+    summary = ProjectSummary.objects.get(pk=project.id)
+    assert summary.deltas.exists()
+    # loading the summary doesn't fold deltas, readers fold them without writing
+    assert summary.created_labels == {}
+    summary.fold_pending_deltas()
+    summary.fold_pending_deltas()
+    assert summary.created_annotations == {'some|x|none': 1}
+    assert summary.created_labels == {'some': {'Opossum': 2}}
+    assert summary.created_labels_drafts == {'some': {'Mouse': 1}}
+    assert summary.deltas.exists()
+
+    summary.compact()
+    assert not summary.deltas.exists()
+    summary = ProjectSummary.objects.get(pk=project.id)
+    assert summary.created_labels == {'some': {'Opossum': 2}}
+    assert summary.created_labels_drafts == {'some': {'Mouse': 1}}
+
+    # pending deltas are compacted by the write reaching the threshold
+    settings.PROJECT_SUMMARY_COMPACT_THRESHOLD = 4
+    Annotation.objects.create(task=task, project=project, result=result('Dog'))
+    assert summary.deltas.count() == 3
+    Annotation.objects.create(task=task, project=project, result=result('Dog'))
+    assert not summary.deltas.exists()
+    summary.refresh_from_db()
+    assert summary.created_labels == {'some': {'Opossum': 2, 'Dog': 2}}
+    assert summary.created_annotations == {'some|x|none': 3}